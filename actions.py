@@ -0,0 +1,94 @@
+"""Privileged actions run off the Tk thread.
+
+Service and power-profile actions can sit in a polkit prompt for as long
+as the user takes to answer it. The ActionQueue runs them one at a time on
+a worker thread; the GUI drains finished actions from its snapshot poll
+and reports their exit status without blocking.
+"""
+import queue
+import threading
+import time
+
+# Meaning of the pkexec exit statuses that are not the command's own
+PKEXEC_STATUS = {126: "authorization dismissed", 127: "not authorized"}
+
+
+class Action:
+    """One queued action and, once finished, its outcome"""
+
+    def __init__(self, group, description, function):
+        self.group = group  # actions of one group (e.g. a service) never overlap
+        self.description = description
+        self.function = function  # returns an exit status, or raises
+        self.status = None
+        self.error = None
+        self.seconds = None
+
+    @property
+    def ok(self):
+        return self.error is None and not self.status
+
+    def outcome(self):
+        """Short human-readable result"""
+        if self.error is not None:
+            return f"{self.description} failed: {self.error}"
+        if self.status:
+            reason = PKEXEC_STATUS.get(self.status, f"exit status {self.status}")
+            return f"{self.description} failed: {reason}"
+        return f"{self.description}: done in {self.seconds:.1f} s"
+
+
+class ActionQueue(threading.Thread):
+    """FIFO of Actions executed by one worker thread"""
+
+    def __init__(self, on_done=None):
+        super().__init__(name="action-queue", daemon=True)
+        self.pending = queue.Queue()
+        self.finished = queue.Queue()
+        self.on_done = on_done  # called from the worker after each action
+        self.in_flight = {}  # group -> Action, queued or running
+        self.lock = threading.Lock()
+
+    def submit(self, action):
+        """Queue an action; returns False if its group already has one in flight"""
+        with self.lock:
+            if action.group in self.in_flight:
+                return False
+            self.in_flight[action.group] = action
+        self.pending.put(action)
+        return True
+
+    def busy(self, group):
+        with self.lock:
+            return group in self.in_flight
+
+    def run(self):
+        while True:
+            action = self.pending.get()
+            if action is None:
+                return
+            started = time.perf_counter()
+            try:
+                action.status = action.function()
+            except Exception as e:
+                action.error = str(e) or type(e).__name__
+            action.seconds = time.perf_counter() - started
+            self.finished.put(action)
+            if self.on_done is not None:
+                self.on_done()
+
+    def completed(self):
+        """Actions finished since the last call, oldest first"""
+        actions = []
+        while True:
+            try:
+                action = self.finished.get_nowait()
+            except queue.Empty:
+                break
+            with self.lock:
+                self.in_flight.pop(action.group, None)
+            actions.append(action)
+        return actions
+
+    def stop(self):
+        self.pending.put(None)
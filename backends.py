@@ -0,0 +1,337 @@
+"""Sensor backends feeding the SensorCollector.
+
+sample() returns a complete snapshot; read(sources) returns only the fields
+of the given scheduler sources, or a whole snapshot from backends that cannot
+read sources separately:
+
+- LiveSensorBackend reads the real machine (helper, EC, sysfs, subprocesses)
+- SyntheticSensorBackend simulates a laptop under a configurable load profile
+- ReplaySensorBackend plays back a trace recorded with TraceRecorder, each
+  record at its own time, at up to MAX_REPLAY_SPEED times real time
+"""
+import json
+import random
+import statistics
+import time
+
+import sensors
+from controller import FanCurve, ThermalPlant, load_at
+from fancontrol_helper import HelperError
+from profiler import timed
+from scheduler import SOURCES
+
+# Fastest supported replay speed (multiple of real time)
+MAX_REPLAY_SPEED = 100.0
+
+# Synthetic load profiles: (start second, package watts), repeated every period
+SYNTHETIC_PROFILES = {
+    "idle": ((0, 6),),
+    "build": ((0, 8), (20, 35), (260, 10), (300, 8)),
+    "gaming": ((0, 28), (60, 32), (120, 26)),
+    "spiky": ((0, 8), (5, 40), (7, 8), (15, 38), (16, 8)),
+}
+
+# Profile lengths in seconds
+SYNTHETIC_PERIODS = {"idle": 60, "build": 320, "gaming": 180, "spiky": 20}
+
+# Fan RPM at 100% duty in the synthetic model
+SYNTHETIC_MAX_RPM = 5000
+
+# Simulated cores, their frequency range in MHz, and the package watts at full load
+SYNTHETIC_CORES = 16
+SYNTHETIC_MHZ = (1400, 4700)
+SYNTHETIC_FULL_LOAD = 40.0
+
+# Helper requests answering each privileged scheduler source
+HELPER_REQUESTS = {
+    "ec": (("sensors", {}),),
+    "ryzenadj": (("ryzenadj_info", {}),),
+    "services": (("service_status", {"service": "clevo-fancontrol"}),
+                 ("service_status", {"service": "auto-cpufreq"})),
+}
+
+
+def make_snapshot(timestamp, temp, rpm, duty, power, battery_status,
+                  clevo_active=None, cpufreq_active=None, ppt_limits=None, hwmon=None, cpus=None):
+    return {
+        "time": timestamp,
+        "temp": temp,
+        "rpm": rpm,
+        "duty": duty,
+        "power": power,
+        "battery_status": battery_status,
+        "clevo_active": clevo_active,
+        "cpufreq_active": cpufreq_active,
+        "ppt_limits": ppt_limits,
+        "hwmon": hwmon or {},
+        "cpus": cpus,
+    }
+
+
+class SensorBackend:
+    """Interface of a snapshot source"""
+
+    # Preferred seconds between samples, or None for the collector default
+    interval = None
+
+    # Whether samples come from this machine (and belong in the on-disk history)
+    live = False
+
+    # Profiler timing the individual reads, set by the SensorCollector
+    profiler = None
+
+    def sample(self):
+        raise NotImplementedError
+
+    def read(self, sources):
+        """Snapshot fields of the given scheduler sources, or None when exhausted.
+
+        Backends that cannot read sources separately return a whole snapshot.
+        """
+        return self.sample()
+
+    def next_due(self):
+        """time.perf_counter() of the next sample, or None to follow the collector's schedule"""
+        return None
+
+    def sensor_names(self):
+        """Names of the extra hwmon metrics this backend reports"""
+        return []
+
+    def close(self):
+        pass
+
+
+class LiveSensorBackend(SensorBackend):
+    """Reads the real hardware.
+
+    The due EC, RyzenAdj and service sources come from one batched
+    round-trip to the privileged helper when it is running, otherwise from
+    the EC reader or by spawning sudo/systemctl per value.
+    """
+
+    live = True
+
+    def __init__(self, helper=None, ec_reader=None, sysfs_reader=None, cpu_reader=None):
+        self.helper = helper
+        self.ec_reader = ec_reader
+        self.sysfs_reader = sysfs_reader
+        self.cpu_reader = cpu_reader
+
+    def read_privileged(self, sources):
+        """Fields of the ec, ryzenadj and services sources"""
+        sources = [source for source in sources if source in HELPER_REQUESTS]
+        if not sources:
+            return {}
+        if self.helper is not None:
+            requests = [request for source in sources for request in HELPER_REQUESTS[source]]
+            try:
+                with timed(self.profiler, "helper batch"):
+                    results = iter(self.helper.batch(*requests))
+            except HelperError:
+                pass
+            else:
+                fields = {}
+                for source in sources:
+                    if source == "ec":
+                        values = next(results) or {"temp": 0, "rpm": 0, "duty": 0}
+                        fields.update(temp=values["temp"], rpm=values["rpm"], duty=values["duty"])
+                    elif source == "ryzenadj":
+                        limits = next(results)
+                        fields["ppt_limits"] = tuple(limits) if limits else None
+                    else:
+                        fields["clevo_active"] = next(results)
+                        fields["cpufreq_active"] = next(results)
+                return fields
+
+        fields = {}
+        if "ec" in sources:
+            fields["temp"], fields["rpm"], fields["duty"] = self.read_ec()
+        if "ryzenadj" in sources:
+            with timed(self.profiler, "ryzenadj"):
+                fields["ppt_limits"] = sensors.get_ryzenadj_limits()
+        if "services" in sources:
+            with timed(self.profiler, "systemctl"):
+                fields["clevo_active"] = sensors.get_service_active("clevo-fancontrol")
+                fields["cpufreq_active"] = sensors.get_service_active("auto-cpufreq")
+        return fields
+
+    def read_ec(self):
+        """Read (temp, rpm, duty) in-process when an EC reader is set, else via clevo-fancontrol"""
+        if self.ec_reader is not None:
+            try:
+                with timed(self.profiler, "ec read"):
+                    return self.ec_reader.read()
+            except OSError:
+                pass
+        with timed(self.profiler, "clevo-fancontrol"):
+            return sensors.get_sensor_values()
+
+    def read_battery(self):
+        with timed(self.profiler, "battery"):
+            if self.sysfs_reader is not None:
+                return self.sysfs_reader.read_battery(), self.sysfs_reader.read_hwmon()
+            return sensors.get_battery_power(), {}
+
+    def read(self, sources):
+        fields = self.read_privileged(sources)
+        if "battery" in sources:
+            (fields["power"], fields["battery_status"]), fields["hwmon"] = self.read_battery()
+        if "cpus" in sources:
+            with timed(self.profiler, "cpus"):
+                fields["cpus"] = self.cpu_reader.read() if self.cpu_reader is not None else None
+        return fields
+
+    def sample(self):
+        return make_snapshot(time.time(), **self.read(SOURCES))
+
+    def sensor_names(self):
+        return self.sysfs_reader.sensor_names() if self.sysfs_reader is not None else []
+
+
+class SyntheticSensorBackend(SensorBackend):
+    """Simulated laptop: a ThermalPlant driven by a load profile and a fan curve.
+
+    time_scale > 1 advances the simulation faster than real time. seed makes
+    the measurement noise reproducible.
+    """
+
+    def __init__(self, profile="build", battery_status="Discharging", time_scale=1.0, seed=0):
+        self.load_profile = SYNTHETIC_PROFILES[profile]
+        self.period = SYNTHETIC_PERIODS[profile]
+        self.battery_status = battery_status
+        self.time_scale = time_scale
+        self.random = random.Random(seed)
+        self.plant = ThermalPlant()
+        self.curve = FanCurve()
+        self.elapsed = 0.0
+        self.last = None
+
+    def advance(self, seconds, step=0.1):
+        while seconds > 0:
+            dt = min(step, seconds)
+            self.plant.load = load_at(self.load_profile, self.elapsed % self.period)
+            self.plant.step(dt)
+            self.elapsed += dt
+            seconds -= dt
+
+    def sample(self):
+        now = time.time()
+        if self.last is not None:
+            self.advance((now - self.last) * self.time_scale)
+        self.last = now
+
+        temp = self.plant.read_temp()
+        duty = self.curve.update(temp, 0)
+        self.plant.write_duty(duty)
+        rpm = int(self.plant.fan * SYNTHETIC_MAX_RPM)
+        # Package power plus ~4 W for the rest of the platform
+        power = max(0.0, self.plant.load + 4 + self.random.gauss(0, 0.5))
+        return make_snapshot(now, temp, rpm, duty, power, self.battery_status,
+                             True, True, (30.0, 20.0),
+                             {"k10temp Tctl": self.plant.temp + 1.5}, self.sample_cpus())
+
+    def sample_cpus(self):
+        """Per-core utilization following the load, with one busier core"""
+        share = min(1.0, self.plant.load / SYNTHETIC_FULL_LOAD)
+        low, high = SYNTHETIC_MHZ
+        util = []
+        mhz = []
+        for core in range(SYNTHETIC_CORES):
+            busy = share if core else max(share, 0.3)
+            value = min(100.0, max(0.0, 100 * busy + self.random.gauss(0, 5)))
+            util.append(round(value, 1))
+            mhz.append(int(low + (high - low) * value / 100))
+        return {"util": util, "mhz": mhz, "governor": ["powersave"] * SYNTHETIC_CORES}
+
+    def sensor_names(self):
+        return ["k10temp Tctl"]
+
+
+class ReplaySensorBackend(SensorBackend):
+    """Plays back a JSON-lines trace of snapshots.
+
+    Sample times are remapped so that the trace appears to be happening
+    now, compressed by `speed`: record i is played (t_i - t_0) / speed
+    after the first one, so irregular spacing and gaps are kept. The
+    interval (the trace's median spacing divided by the speed) only paces
+    the wrap-around of a looping replay.
+    """
+
+    def __init__(self, path, speed=1.0, loop=True):
+        with open(path) as f:
+            self.records = [json.loads(line) for line in f if line.strip()]
+        if not self.records:
+            raise ValueError(f"empty trace: {path}")
+        self.speed = max(0.01, min(MAX_REPLAY_SPEED, speed))
+        self.loop = loop
+        self.index = 0
+        self.started = None  # (time.time(), time.perf_counter()) when the current pass began
+        self.trace_start = self.records[0]["time"]
+
+        spacing = [b["time"] - a["time"] for a, b in zip(self.records, self.records[1:])]
+        self.trace_interval = statistics.median(spacing) if spacing else 1.0
+        self.interval = self.trace_interval / self.speed
+
+    def offset(self, record):
+        """Seconds after the start of a pass at which a record is played"""
+        return (record["time"] - self.trace_start) / self.speed
+
+    def sample(self):
+        if self.index >= len(self.records):
+            if not self.loop:
+                return None
+            self.index = 0
+            self.started = None
+        record = dict(self.records[self.index])
+        self.index += 1
+
+        if self.started is None:
+            self.started = (time.time(), time.perf_counter())
+            self.trace_start = record["time"]
+        record["time"] = self.started[0] + self.offset(record)
+        return record
+
+    def next_due(self):
+        if self.started is None:
+            return None
+        if self.index >= len(self.records):
+            # The next pass (or the end) comes one median spacing after the last record
+            return self.started[1] + self.offset(self.records[-1]) + self.interval
+        return self.started[1] + self.offset(self.records[self.index])
+
+    def sensor_names(self):
+        return list(self.records[0].get("hwmon", {}))
+
+
+class TraceRecorder:
+    """Appends snapshots to a JSON-lines trace for ReplaySensorBackend"""
+
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def write(self, snapshot):
+        self.file.write(json.dumps(snapshot) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def add_backend_arguments(parser):
+    """Command-line options selecting a simulated backend or recording a trace"""
+    parser.add_argument("--synthetic", metavar="PROFILE", choices=sorted(SYNTHETIC_PROFILES),
+                        help="simulate sensors with a load profile instead of reading hardware")
+    parser.add_argument("--replay", metavar="TRACE", help="replay a recorded JSON-lines trace")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help=f"replay/simulation speed, up to {MAX_REPLAY_SPEED:.0f}x real time")
+    parser.add_argument("--record", metavar="TRACE", help="append every snapshot to a trace file")
+
+
+def simulated_backend_from_args(args):
+    """Backend chosen by add_backend_arguments options, or None for live sampling"""
+    if args.replay:
+        return ReplaySensorBackend(args.replay, speed=args.speed)
+    if args.synthetic:
+        return SyntheticSensorBackend(args.synthetic, time_scale=min(args.speed, MAX_REPLAY_SPEED))
+    return None
@@ -0,0 +1,324 @@
+"""Benchmarks for the monitor's own per-tick and per-frame cost.
+
+Runs against simulated sensors and writes machine-readable JSON:
+
+    python3 benchmark.py --output bench.json
+    python3 benchmark.py --compare bench.json   # exit 1 on >20% regressions
+
+Stages that need a Tk window (labels, services, fan animation, startup) only
+run when a display is available, e.g. under `xvfb-run python3 benchmark.py`;
+without one they are reported as skipped and the graphs are rendered
+off-screen.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from backends import LiveSensorBackend, SyntheticSensorBackend
+from fancontrol_helper import HelperClient
+from graphs import GRAPH_WINDOW, LiveGraph
+from history import METRICS, HistoryStore
+from historyview import HISTORY_RANGES, HistoryView
+from rolling import RingBuffer
+from sensors import CLEVO_FANCONTROL
+from sysfs import SysfsReader
+
+# Relative slowdown reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.2
+
+# Timings below this are too noisy to compare
+NOISE_FLOOR_MS = 0.05
+
+
+def summarize(samples):
+    """Summary statistics in milliseconds for a list of second durations"""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def measure(fn, repeat):
+    """Wall and thread-CPU time of repeated calls"""
+    wall = []
+    cpu = []
+    for _ in range(repeat):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        fn()
+        cpu.append(time.thread_time() - cpu_start)
+        wall.append(time.perf_counter() - wall_start)
+    return {"wall": summarize(wall), "cpu": summarize(cpu)}
+
+
+def filled_history(backend, seconds=GRAPH_WINDOW * 2):
+    history = HistoryStore()
+    now = time.time()
+    for i in range(seconds):
+        snapshot = backend.sample()
+        history.append(now - seconds + i, (snapshot["temp"], snapshot["rpm"],
+                                           snapshot["duty"], snapshot["power"]))
+    return history
+
+
+def bench_sampling(repeat):
+    results = {"synthetic": measure(SyntheticSensorBackend("build").sample, repeat)}
+
+    helper = HelperClient(fake=True)
+    helper.start()
+    try:
+        live = LiveSensorBackend(helper, sysfs_reader=SysfsReader())
+        results["fake_helper"] = measure(live.sample, repeat)
+    finally:
+        helper.close()
+    return results
+
+
+def bench_graphs_offscreen(repeat):
+    """update_graphs equivalent on off-screen Agg canvases"""
+    history = filled_history(SyntheticSensorBackend("build"))
+    recent = RingBuffer(2048, 1 + len(METRICS))
+    records = history.records(0)
+    for timestamp, values in zip(records["time"], records["mean"]):
+        recent.append([timestamp] + list(values))
+    graphs = [(LiveGraph(None, 'Temperature (°C)', '#ff6b6b', 100, 10), "temp"),
+              (LiveGraph(None, 'Fan Speed (RPM)', '#4ecdc4', 5000, 500), "rpm"),
+              (LiveGraph(None, 'Power (W)', '#f7b731', 50, 5), "power")]
+    for graph, _ in graphs:
+        graph.canvas.draw()
+
+    def update():
+        now = time.time()
+        view = recent.view()
+        times = view[:, 0]
+        for graph, metric in graphs:
+            start = np.searchsorted(times, now - graph.window)
+            graph.update(now - times[start:], view[start:, 1 + METRICS.index(metric)])
+
+    return measure(update, repeat)
+
+
+def bench_history_view(repeat):
+    """Redraw of the history viewer per range over a day of 5 s samples"""
+    history = HistoryStore()
+    now = time.time()
+    for ago in range(86400, 0, -5):
+        history.append(now - ago, (60 + 10 * np.sin(ago / 900), 3000, 50, 20 + 5 * np.sin(ago / 60)))
+    view = HistoryView(None, history)
+    results = {}
+    for label, seconds, _ in HISTORY_RANGES:
+        view.span = seconds
+        view.end = now
+        results[label.replace(" ", "")] = measure(view.redraw, repeat)
+    return results
+
+
+def bench_tk(repeat, animation_seconds):
+    """Per-stage cost of update_data and animate_fan in a real window"""
+    import customtkinter as ctk
+    import main
+
+    root = ctk.CTk()
+    backend = SyntheticSensorBackend("build", time_scale=20)
+    app = main.FanMonitorApp(root, backend=backend)
+    app.collector.stop()
+    while "graphs" not in app.startup:
+        root.update()
+        time.sleep(0.001)
+
+    snapshots = [backend.sample() for _ in range(repeat)]
+    stages = {"labels": app.update_labels,
+              "services": app.update_service_statuses,
+              "graphs": lambda snapshot: app.update_graphs(),
+              "tick": app.apply_snapshot}
+    results = {}
+    for name, stage in stages.items():
+        iterator = iter(snapshots)
+        results[name] = measure(lambda: (stage(next(iterator)), app.view.flush(),
+                                         root.update_idletasks()), repeat)
+
+    # An idle machine: the same readings every tick, so no widget should change
+    configured = []
+
+    def idle_tick():
+        app.update_labels(snapshots[-1])
+        app.update_service_statuses(snapshots[-1])
+        configured.append(app.view.flush())
+        root.update_idletasks()
+
+    results["idle_widgets"] = measure(idle_tick, repeat)
+    results["idle_widgets"]["configures_per_tick"] = statistics.fmean(configured[1:] or configured)
+
+    # Fan animation: time inside each frame and the spacing between frames
+    frame_times = []
+    frame_starts = []
+    animate = app.animate_fan
+
+    def timed_animate():
+        frame_starts.append(time.perf_counter())
+        animate()
+        frame_times.append(time.perf_counter() - frame_starts[-1])
+
+    app.animate_fan = timed_animate
+    app.stop_fan_animation()
+    app.current_rpm = 3000
+    app.start_fan_animation()
+    end = time.perf_counter() + animation_seconds
+    while time.perf_counter() < end:
+        root.update()
+        time.sleep(0.001)
+    intervals = [b - a for a, b in zip(frame_starts, frame_starts[1:])]
+    expected = main.FAN_ANIMATION_INTERVAL / 1000
+    results["animate_fan"] = {
+        "frame": summarize(frame_times),
+        "interval": summarize(intervals) if intervals else None,
+        "jitter_ms": statistics.pstdev(intervals) * 1000 if len(intervals) > 1 else None,
+        "late_ms": (statistics.fmean(intervals) - expected) * 1000 if intervals else None,
+    }
+    root.destroy()
+    return results
+
+
+def bench_startup(repeat):
+    """Milestones of a cold `main.py --startup-time` run, plus the total process time"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = subprocess.check_output([sys.executable, script, "--synthetic", "idle",
+                                          "--startup-time"], text=True)
+        milestones = json.loads(output.strip().splitlines()[-1])
+        milestones["process"] = time.perf_counter() - started
+        runs.append(milestones)
+    return {name: summarize([run[name] for run in runs]) for name in runs[0]}
+
+
+def bench_spawn(repeat):
+    """Process spawn latency of the external tools the live backend uses"""
+    # name -> (tool that must be installed, command); "true" is the bare fork/exec baseline
+    commands = {
+        "systemctl": ("systemctl", ["systemctl", "is-active", "clevo-fancontrol"]),
+        "clevo-fancontrol": (CLEVO_FANCONTROL, ["sudo", "-n", CLEVO_FANCONTROL]),
+        "ryzenadj": ("ryzenadj", ["sudo", "-n", "ryzenadj", "--info"]),
+        "true": ("true", ["true"]),
+    }
+    results = {}
+    for name, (tool, command) in commands.items():
+        if shutil.which(tool) is None or shutil.which(command[0]) is None:
+            results[name] = None
+            continue
+        results[name] = measure(lambda: subprocess.run(command, stdout=subprocess.DEVNULL,
+                                                       stderr=subprocess.DEVNULL), repeat)
+    return results
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(repeat, animation_seconds):
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "display": bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")),
+        },
+        "sampling": bench_sampling(repeat),
+        "graphs_offscreen": bench_graphs_offscreen(repeat),
+        "history_view": bench_history_view(min(repeat, 20)),
+        "spawn": bench_spawn(min(repeat, 20)),
+    }
+    if results["meta"]["display"]:
+        results["tk"] = bench_tk(repeat, animation_seconds)
+        results["startup"] = bench_startup(min(repeat, 5))
+    else:
+        results["tk"] = {"skipped": "no display"}
+        results["startup"] = {"skipped": "no display"}
+    results["rss_kb"] = rss_kb()
+    return results
+
+
+def flatten(results, path=()):
+    """Yield (dotted path, value) for every comparable number in a result tree"""
+    if isinstance(results, dict):
+        for key, value in results.items():
+            if key != "meta":
+                yield from flatten(value, path + (key,))
+    elif isinstance(results, (int, float)) and path and path[-1] in ("p50_ms", "mean_ms", "rss_kb"):
+        yield ".".join(path), results
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """Print per-metric ratios; return the list of regressed metrics"""
+    old_values = dict(flatten(old))
+    regressions = []
+    for path, value in flatten(new):
+        before = old_values.get(path)
+        if not before or (path.endswith("_ms") and max(before, value) < NOISE_FLOOR_MS):
+            continue
+        ratio = value / before
+        marker = "  REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{path:<50} {before:>10.3f} -> {value:>10.3f}  x{ratio:.2f}{marker}")
+        if marker:
+            regressions.append(path)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the monitor's hot paths")
+    parser.add_argument("--repeat", type=int, default=100, help="iterations per stage")
+    parser.add_argument("--animation-seconds", type=float, default=3.0)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with an earlier JSON result")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.animation_seconds)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {REGRESSION_THRESHOLD:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
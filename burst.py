@@ -0,0 +1,297 @@
+"""High-frequency burst capture of power and temperatures.
+
+The regular sampler reads power at most a few times a second, which hides
+the sub-second spikes that trip the PPT FAST limit. A BurstCapture samples
+the package energy counter, battery power and hwmon temperatures at
+50-200 Hz on its own thread into preallocated record blocks, and writes
+each full block to disk in one call:
+
+    python3 burst.py record --rate 200 --duration 10        # -> ~/.local/state/...
+    python3 burst.py info capture.p11b
+    python3 burst.py export capture.p11b --csv capture.csv --npz capture.npz
+
+A capture file is the magic b"P11BURST", a little-endian u32 header length,
+a JSON header (columns, NumPy dtype, rate, start time, energy counter
+range), then packed little-endian records. The package energy counter needs
+root; without it the power column falls back to battery power, which the
+battery firmware only updates about once a second.
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+from rolling import RingBuffer
+from sysfs import SysfsReader
+
+# Allowed and default sampling rates in Hz
+BURST_RATES = (50, 200)
+DEFAULT_BURST_RATE = 100
+
+# Records per preallocated block; a block is written to disk when full
+BURST_BLOCK_ROWS = 1024
+
+# Seconds of (time, watts) kept in memory for the power graph overlay
+BURST_OVERLAY_SECONDS = 120
+
+# File signature and format version
+BURST_MAGIC = b"P11BURST"
+BURST_VERSION = 1
+
+
+def default_capture_path():
+    state = os.environ.get("XDG_STATE_HOME", os.path.expanduser("~/.local/state"))
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(state, "pang11-fancontrol", f"burst-{stamp}.p11b")
+
+
+def package_watts(times, energy, energy_range):
+    """Per-record package power from the µJ counter (first record is 0)"""
+    watts = np.zeros(len(times))
+    if len(times) > 1:
+        delta = np.diff(energy.astype(np.float64))
+        delta[delta < 0] += energy_range or 0  # counter wrapped
+        dt = np.diff(times)
+        np.divide(delta / 1e6, dt, out=watts[1:], where=dt > 0)
+    return watts
+
+
+def envelope(x, y, buckets):
+    """Min/max of y in `buckets` equal slices, interleaved, so spikes survive decimation"""
+    if len(y) <= 2 * buckets:
+        return x, y
+    size = len(y) // buckets
+    count = size * buckets
+    start = len(y) - count
+    shaped = y[start:].reshape(buckets, size)
+    lows = shaped.argmin(axis=1) + np.arange(buckets) * size + start
+    highs = shaped.argmax(axis=1) + np.arange(buckets) * size + start
+    indices = np.sort(np.concatenate((lows, highs)))
+    return x[indices], y[indices]
+
+
+class BurstCapture(threading.Thread):
+    """Samples power and temperatures at `rate` Hz into a capture file"""
+
+    def __init__(self, path=None, rate=DEFAULT_BURST_RATE, duration=None, sysfs_reader=None):
+        super().__init__(name="burst-capture", daemon=True)
+        if not BURST_RATES[0] <= rate <= BURST_RATES[1]:
+            raise ValueError(f"rate must be {BURST_RATES[0]}-{BURST_RATES[1]} Hz")
+        self.path = path or default_capture_path()
+        self.rate = rate
+        self.duration = duration  # seconds, or None until stop()
+        self.owns_reader = sysfs_reader is None
+        self.reader = sysfs_reader or SysfsReader()
+        self.hwmon = list(self.reader.hwmon_fds)
+        self.package = self.reader.package_energy_fd is not None
+
+        self.dtype = np.dtype([("time", "<f8"), ("battery_w", "<f4"), ("package_uj", "<u8")] +
+                              [(f"hwmon.{name}", "<f4") for name in self.hwmon])
+        self.blocks = (np.zeros(BURST_BLOCK_ROWS, self.dtype), np.zeros(BURST_BLOCK_ROWS, self.dtype))
+        self.trace = RingBuffer(rate * BURST_OVERLAY_SECONDS, 2)  # unix time, watts
+        self.count = 0
+        self.late = 0  # samples taken after the following deadline had already passed
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def header(self):
+        return {
+            "version": BURST_VERSION,
+            "columns": list(self.dtype.names),
+            "dtype": [list(field) for field in self.dtype.descr],
+            "rate": self.rate,
+            "start": time.time(),
+            "package_energy": self.package,
+            "package_energy_range": self.reader.package_energy_range,
+        }
+
+    def run(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "wb") as f:
+                header = json.dumps(self.header()).encode()
+                f.write(BURST_MAGIC + struct.pack("<I", len(header)) + header)
+                self.capture(f)
+        except OSError as e:
+            self.error = str(e)
+        finally:
+            if self.owns_reader:
+                self.reader.close()
+
+    def capture(self, f):
+        reader = self.reader
+        hwmon_fds = [reader.hwmon_fds[name] for name in self.hwmon]
+        hwmon_columns = [f"hwmon.{name}" for name in self.hwmon]
+        energy_range = reader.package_energy_range or 0
+        period = 1.0 / self.rate
+        wall_start = time.time()
+        started = deadline = time.perf_counter()
+        end = started + self.duration if self.duration else None
+        block_index = 0
+        block = self.blocks[0]
+        row = 0
+        previous = None  # (time, energy) of the last record
+
+        while not self._stop_event.is_set() and (end is None or deadline < end):
+            now = time.perf_counter()
+            timestamp = wall_start + (now - started)
+            battery = reader.read_battery_power()
+            energy = reader.read_package_energy() if self.package else None
+            record = block[row]
+            record["time"] = timestamp
+            record["battery_w"] = battery
+            record["package_uj"] = energy or 0
+            for column, fd in zip(hwmon_columns, hwmon_fds):
+                value = reader.read_attribute(fd)
+                record[column] = int(value) / 1000.0 if value and value.lstrip("-").isdigit() else np.nan
+
+            watts = battery
+            if energy is not None:
+                if previous is not None and timestamp > previous[0]:
+                    delta = energy - previous[1]
+                    if delta < 0:
+                        delta += energy_range
+                    watts = delta / 1e6 / (timestamp - previous[0])
+                previous = (timestamp, energy)
+            self.trace.append((timestamp, watts))
+            self.count += 1
+
+            row += 1
+            if row == BURST_BLOCK_ROWS:
+                f.write(block.data)
+                block_index ^= 1
+                block = self.blocks[block_index]
+                row = 0
+
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                self.late += 1
+                deadline = time.perf_counter()
+        f.write(block[:row].data)
+
+    def overlay(self, now, window, buckets=600):
+        """(seconds ago, watts) of the captured samples inside the last `window` seconds"""
+        view = self.trace.view()
+        times = view[:, 0]
+        start = np.searchsorted(times, now - window)
+        return envelope(now - times[start:], view[start:, 1], buckets)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def read_capture(path):
+    """(header, records) of a capture file"""
+    with open(path, "rb") as f:
+        if f.read(len(BURST_MAGIC)) != BURST_MAGIC:
+            raise ValueError(f"{path}: not a burst capture")
+        length, = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+        dtype = np.dtype([tuple(field) for field in header["dtype"]])
+        records = np.fromfile(f, dtype=dtype)
+    return header, records
+
+
+def columns(header, records):
+    """Column name -> array, with package power derived from the energy counter"""
+    result = {name: records[name] for name in records.dtype.names}
+    if header["package_energy"]:
+        result["package_w"] = package_watts(records["time"], records["package_uj"],
+                                            header["package_energy_range"])
+    return result
+
+
+def export_csv(path, data):
+    names = list(data)
+    table = np.column_stack([data[name].astype(np.float64) for name in names])
+    np.savetxt(path, table, delimiter=",", header=",".join(names), comments="", fmt="%.6f")
+
+
+def export_npz(path, data):
+    """One compressed array per column"""
+    np.savez_compressed(path, **data)
+
+
+def export_parquet(path, data):
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Parquet export needs pyarrow: pip install pyarrow")
+    pyarrow.parquet.write_table(pyarrow.table(data), path)
+
+
+def summary(header, records):
+    data = columns(header, records)
+    duration = records["time"][-1] - records["time"][0] if len(records) > 1 else 0.0
+    lines = [f"{len(records)} records over {duration:.2f} s "
+             f"({len(records) / duration if duration else 0:.0f} Hz, nominal {header['rate']} Hz)"]
+    for name, values in data.items():
+        if name in ("time", "package_uj") or not len(values):
+            continue
+        lines.append(f"  {name:<28} min {np.nanmin(values):8.2f}  mean {np.nanmean(values):8.2f}"
+                     f"  max {np.nanmax(values):8.2f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="High-frequency power/temperature capture")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="capture to a file")
+    record.add_argument("--rate", type=int, default=DEFAULT_BURST_RATE,
+                        help=f"samples per second ({BURST_RATES[0]}-{BURST_RATES[1]})")
+    record.add_argument("--duration", type=float, default=10.0, help="seconds to capture")
+    record.add_argument("--output", help="capture file (default: a timestamped file in the state dir)")
+    info = commands.add_parser("info", help="summarize a capture")
+    info.add_argument("capture")
+    export = commands.add_parser("export", help="convert a capture for offline analysis")
+    export.add_argument("capture")
+    export.add_argument("--csv", help="write a CSV file")
+    export.add_argument("--npz", help="write columnar compressed NumPy arrays")
+    export.add_argument("--parquet", help="write a Parquet file (needs pyarrow)")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        try:
+            capture = BurstCapture(args.output, rate=args.rate, duration=args.duration)
+        except ValueError as e:
+            parser.error(str(e))
+        capture.start()
+        try:
+            capture.join()
+        except KeyboardInterrupt:
+            capture.stop()
+        if capture.error:
+            print(f"Capture failed: {capture.error}", file=sys.stderr)
+            return 1
+        print(f"{capture.count} samples ({capture.late} late) -> {capture.path}")
+        return 0
+
+    try:
+        header, records = read_capture(args.capture)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.command == "info":
+        print(summary(header, records))
+        return 0
+
+    data = columns(header, records)
+    for path, writer in ((args.csv, export_csv), (args.npz, export_npz), (args.parquet, export_parquet)):
+        if path:
+            writer(path, data)
+            print(f"wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""Closed-loop software fan controller.
+
+A FanController thread reads the CPU temperature on its own timer, maps it
+to a fan duty with a FanCurve (with hysteresis) or a PIDPolicy and writes
+the duty only when it changes. Its reaction latency runs from the
+previous sample (the last time the old temperature was seen) to the duty
+write completing, so it includes the sampling interval and any wait for the
+helper, not just the policy and the write. When reads or
+writes keep failing, and when the controller stops, the fan is set to
+FAILSAFE_DUTY so it is never left spinning slowly with nothing in control.
+
+ThermalPlant is a small first-order model of the laptop so curves can be
+tuned and regression-tested without hardware:
+
+    python3 controller.py --simulate
+    python3 controller.py --simulate --mode pid --setpoint 70
+"""
+import argparse
+import os
+import threading
+import time
+from collections import deque
+
+# Seconds between control iterations
+CONTROL_INTERVAL = 0.25
+
+# Default temperature (°C) -> duty (%) curve
+DEFAULT_CURVE = ((40, 0), (50, 25), (60, 40), (70, 60), (80, 80), (90, 100))
+
+# Degrees the temperature must fall before the duty is lowered again
+DEFAULT_HYSTERESIS = 3
+
+# Latency samples kept for statistics
+LATENCY_SAMPLES = 200
+
+# Consecutive failed iterations after which the fan is forced to FAILSAFE_DUTY
+FAILSAFE_FAILURES = 4
+
+# Duty (%) written on repeated failures and when the controller stops
+FAILSAFE_DUTY = 100
+
+
+class FanCurve:
+    """Piecewise-linear temperature -> duty curve with hysteresis"""
+
+    def __init__(self, points=DEFAULT_CURVE, hysteresis=DEFAULT_HYSTERESIS):
+        self.points = sorted(points)
+        self.hysteresis = hysteresis
+        self.duty = None
+
+    def interpolate(self, temp):
+        points = self.points
+        if temp <= points[0][0]:
+            return points[0][1]
+        for (t0, d0), (t1, d1) in zip(points, points[1:]):
+            if temp <= t1:
+                return d0 + (d1 - d0) * (temp - t0) / (t1 - t0)
+        return points[-1][1]
+
+    def update(self, temp, dt):
+        target = round(self.interpolate(temp))
+        # Only spin down once the temperature is hysteresis degrees below
+        # the point that would justify the current duty
+        if self.duty is not None and target < self.duty:
+            if round(self.interpolate(temp + self.hysteresis)) >= self.duty:
+                return self.duty
+        self.duty = target
+        return target
+
+
+class PIDPolicy:
+    """PID controller holding the temperature at a setpoint"""
+
+    def __init__(self, setpoint=70.0, kp=4.0, ki=0.2, kd=1.0, minimum=0, maximum=100):
+        self.setpoint = setpoint
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.minimum = minimum
+        self.maximum = maximum
+        self.integral = 0.0
+        self.last_error = None
+
+    def update(self, temp, dt):
+        error = temp - self.setpoint
+        derivative = 0.0 if self.last_error is None or dt <= 0 else (error - self.last_error) / dt
+        self.last_error = error
+
+        output = self.kp * error + self.ki * (self.integral + error * dt) + self.kd * derivative
+        # Anti-windup: only integrate while the output is not saturated
+        if self.minimum < output < self.maximum:
+            self.integral += error * dt
+        return round(max(self.minimum, min(self.maximum, output)))
+
+
+def make_policy(mode, curve=DEFAULT_CURVE, hysteresis=DEFAULT_HYSTERESIS, setpoint=70.0):
+    if mode == "pid":
+        return PIDPolicy(setpoint=setpoint)
+    return FanCurve(curve, hysteresis)
+
+
+class LatencyStats:
+    """Rolling reaction-latency samples"""
+
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        if not self.samples:
+            return {"count": 0}
+        ordered = sorted(self.samples)
+        return {
+            "count": len(ordered),
+            "last_ms": self.samples[-1] * 1000,
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+
+
+class FanController(threading.Thread):
+    """Runs a control policy on its own timer, independent of the GUI.
+
+    read_temp() returns the CPU temperature; write_duty(duty) sets the fan.
+    Both are plain callables so the controller can drive the helper, the EC
+    or a simulated plant.
+    """
+
+    def __init__(self, read_temp, write_duty, policy, interval=CONTROL_INTERVAL):
+        super().__init__(name="fan-controller", daemon=True)
+        self.read_temp = read_temp
+        self.write_duty = write_duty
+        self.policy = policy
+        self.interval = interval
+        self.latency = LatencyStats()
+        self.duty = None
+        self.temp = None
+        self.failures = 0  # consecutive failed iterations
+        self.sampled_at = None  # monotonic time the last temperature read was issued
+        self._stop_event = threading.Event()
+
+    def raise_priority(self):
+        """Renice this thread so control ticks are not starved by the load it is cooling"""
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -10)
+        except (OSError, AttributeError):
+            pass
+
+    def step(self, dt):
+        """One control iteration"""
+        sampled_at = time.monotonic()
+        temp = self.read_temp()
+        previous, self.sampled_at = self.sampled_at, sampled_at
+        temp_changed = temp != self.temp
+        self.temp = temp
+
+        duty = self.policy.update(temp, dt)
+        if duty != self.duty:
+            self.write_duty(duty)
+            self.duty = duty
+            if temp_changed and previous is not None:
+                # The change happened after the previous sample at the earliest
+                self.latency.add(time.monotonic() - previous)
+
+    def run(self):
+        self.raise_priority()
+        last = time.monotonic()
+        next_tick = last
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            try:
+                self.step(now - last)
+                self.failures = 0
+            except Exception as e:
+                self.failures += 1
+                if self.failures < FAILSAFE_FAILURES:
+                    print(f"Fan controller step failed: {e}")
+                else:
+                    if self.failures == FAILSAFE_FAILURES:
+                        print(f"Fan controller failed {self.failures} times in a row ({e}), "
+                              f"setting the fan to {FAILSAFE_DUTY}%")
+                    self.fail_safe()
+            last = now
+            # Fixed-rate schedule so a slow step does not shift later ticks
+            next_tick += self.interval
+            self._stop_event.wait(max(0.0, next_tick - time.monotonic()))
+
+    def stats(self):
+        summary = self.latency.summary()
+        summary.update(temp=self.temp, duty=self.duty)
+        return summary
+
+    def fail_safe(self):
+        """Set the fan to FAILSAFE_DUTY; returns whether the write succeeded"""
+        try:
+            self.write_duty(FAILSAFE_DUTY)
+        except Exception as e:
+            print(f"Cannot set the fan to {FAILSAFE_DUTY}%: {e}")
+            self.duty = None  # unknown; the next successful step writes again
+            return False
+        self.duty = FAILSAFE_DUTY
+        return True
+
+    def stop(self):
+        """Stop the control loop and leave the fan at FAILSAFE_DUTY"""
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=2)
+        if self.duty is not None:
+            self.fail_safe()
+
+
+class ThermalPlant:
+    """First-order thermal model of the laptop.
+
+    C dT/dt = P_load - (k_idle + k_fan * rpm_fraction) * (T - T_ambient)
+
+    The fan follows the commanded duty with a spin-up time constant, so
+    controllers see a realistic actuator lag.
+    """
+
+    def __init__(self, ambient=25.0, capacity=60.0, k_idle=0.4, k_fan=1.6,
+                 fan_time_constant=1.5, temp=45.0):
+        self.ambient = ambient
+        self.capacity = capacity
+        self.k_idle = k_idle
+        self.k_fan = k_fan
+        self.fan_time_constant = fan_time_constant
+        self.temp = temp
+        self.duty = 0.0
+        self.fan = 0.0  # actual fan speed as a fraction of maximum
+        self.load = 8.0  # watts
+
+    def read_temp(self):
+        return round(self.temp)
+
+    def write_duty(self, duty):
+        self.duty = duty
+
+    def step(self, dt):
+        self.fan += (self.duty / 100.0 - self.fan) * min(1.0, dt / self.fan_time_constant)
+        cooling = (self.k_idle + self.k_fan * self.fan) * (self.temp - self.ambient)
+        self.temp += (self.load - cooling) * dt / self.capacity
+
+
+# Load profile used by --simulate: (start second, watts)
+DEFAULT_LOAD_PROFILE = ((0, 8), (30, 35), (150, 12), (210, 45), (300, 8))
+
+
+def load_at(profile, t):
+    watts = profile[0][1]
+    for start, value in profile:
+        if t >= start:
+            watts = value
+    return watts
+
+
+def simulate(policy, plant=None, duration=360.0, dt=0.05, interval=CONTROL_INTERVAL,
+             profile=DEFAULT_LOAD_PROFILE):
+    """Run a policy against the plant in simulated time; returns a summary dict"""
+    plant = plant or ThermalPlant()
+    controller = FanController(plant.read_temp, plant.write_duty, policy, interval)
+    t = 0.0
+    next_control = 0.0
+    temps = []
+    duties = []
+    writes = 0
+    while t < duration:
+        plant.load = load_at(profile, t)
+        if t >= next_control:
+            before = controller.duty
+            controller.step(interval)
+            writes += controller.duty != before
+            next_control += interval
+        plant.step(dt)
+        temps.append(plant.temp)
+        duties.append(plant.duty)
+        t += dt
+
+    return {
+        "max_temp": max(temps),
+        "mean_temp": sum(temps) / len(temps),
+        "final_temp": temps[-1],
+        "mean_duty": sum(duties) / len(duties),
+        "duty_writes": writes,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fan controller simulation")
+    parser.add_argument("--simulate", action="store_true", help="run against the thermal model")
+    parser.add_argument("--mode", choices=("curve", "pid"), default="curve")
+    parser.add_argument("--setpoint", type=float, default=70.0, help="PID target temperature")
+    parser.add_argument("--hysteresis", type=float, default=DEFAULT_HYSTERESIS)
+    parser.add_argument("--duration", type=float, default=360.0, help="simulated seconds")
+    args = parser.parse_args(argv)
+
+    if not args.simulate:
+        parser.error("only --simulate is supported from the command line; "
+                     "use main.py or the daemon with --fan-control to drive real hardware")
+
+    policy = make_policy(args.mode, hysteresis=args.hysteresis, setpoint=args.setpoint)
+    result = simulate(policy, duration=args.duration)
+    for key, value in result.items():
+        print(f"{key:>12}: {value:.1f}" if isinstance(value, float) else f"{key:>12}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,588 @@
+"""Headless sampler daemon publishing snapshots over a Unix socket.
+
+One root-owned daemon samples the sensors and any number of unprivileged
+clients (GUI windows, scripts, status bars) subscribe to it. Messages are
+JSON objects, one per line:
+
+    <- {"type": "snapshot", "snapshot": {...}}            pushed every sample
+    -> {"id": 1, "cmd": "snapshot"}                       latest snapshot
+    -> {"id": 2, "cmd": "profile", "args": {"name": "quiet"}}
+    <- {"type": "response", "id": 2, "ok": true, "result": 0}
+
+Requests other than "snapshot", "controller" (fan controller stats),
+"timings" (sampling stage latencies) and "refresh" (re-read some sampling
+sources now) are the fancontrol_helper commands. Only the helper's read
+commands (and batches of them) are accepted from every user; service,
+profile, limits and set_duty actions are only accepted from root unless
+--allow-actions is given, and clients fall back to pkexec when they are
+refused.
+
+With --listen HOST:PORT snapshots are also served over TCP (for the fleet
+dashboard); TCP subscribers may only send snapshot, ping and sensors. With
+--rules the daemon runs a rules file (see rules.py), applies its profile
+switches itself and pushes every fired or released rule to subscribers:
+
+    <- {"type": "rule", "rule": "hot", "event": "fire", "message": "...", ...}
+"""
+import argparse
+import json
+import os
+import queue
+import selectors
+import signal
+import socket
+import struct
+import sys
+import threading
+
+from actions import Action, ActionQueue
+from backends import LiveSensorBackend, TraceRecorder, add_backend_arguments, simulated_backend_from_args
+from controller import FanController, make_policy
+from exporter import METRICS_PORT, MetricsExporter
+from fancontrol_helper import (LANES, READ_COMMANDS, FakeBackend, HelperError, LiveBackend, LocalHelper,
+                               check_batch, lane_of)
+from profiler import Profiler
+from rules import RuleEngine, load_rules
+from sampler import SAMPLE_INTERVAL, SNAPSHOT_QUEUE_SIZE, SensorCollector
+from scheduler import SOURCES
+from sensors import EC_IO_PATH
+from sysfs import CpuReader, SysfsReader
+
+# Default socket path, overridable with PANG11_SOCKET
+SOCKET_PATH = os.environ.get("PANG11_SOCKET", "/run/pang11-fancontrol.sock")
+
+# Client reconnect backoff bounds in seconds
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 30.0
+
+# Requests answered by the daemon itself
+DAEMON_COMMANDS = ("snapshot", "controller", "timings", "refresh")
+
+# The only requests accepted from TCP subscribers
+REMOTE_COMMANDS = ("snapshot", "ping", "sensors")
+
+# Requests that change system state
+ACTION_COMMANDS = ("service", "profile", "limits", "set_duty")
+
+# Sampling sources re-read after an action changed them
+ACTION_SOURCES = {"service": ("services",), "profile": ("ryzenadj",), "limits": ("ryzenadj",),
+                  "set_duty": ("ec",)}
+
+# Drop a subscriber whose unsent output grows past this many bytes
+MAX_CLIENT_BUFFER = 1 << 20
+
+# Helper requests one subscriber may have queued or running; more are refused
+MAX_IN_FLIGHT = 8
+
+
+def peer_uid(conn):
+    """uid of the process on the other end of a Unix socket"""
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+
+class Subscriber:
+    def __init__(self, conn):
+        self.conn = conn
+        self.inbuf = b""
+        self.outbuf = b""
+        # TCP peers have no credentials and may never run actions
+        self.remote = conn.family != socket.AF_UNIX
+        self.uid = None if self.remote else peer_uid(conn)
+        self.in_flight = 0  # helper requests queued or running
+
+
+class SnapshotServer:
+    """Single-threaded selector loop fanning snapshots out to subscribers.
+
+    Helper requests run on one worker per helper lane, with at most
+    MAX_IN_FLIGHT queued or running per subscriber, so no subscriber can
+    make the daemon grow threads or queues without bound.
+    """
+
+    def __init__(self, collector, helper, path=SOCKET_PATH, allow_actions=False, exporter=None,
+                 controller=None, tcp_address=None):
+        self.collector = collector
+        self.helper = helper
+        self.exporter = exporter
+        self.controller = controller
+        self.path = path
+        self.tcp_address = tcp_address  # optional (host, port) for read-only subscribers
+        self.allow_actions = allow_actions
+        self.selector = selectors.DefaultSelector()
+        self.subscribers = {}
+        self.latest = None
+        self.requests = {lane: queue.Queue() for lane in LANES}  # (subscriber, request, response)
+        self.workers = [threading.Thread(target=self.work, args=(lane,), name=f"daemon-{lane}",
+                                         daemon=True) for lane in LANES]
+        self.results = queue.Queue()
+        self.events = queue.Queue()  # rule events for the subscribers
+        self.actions = ActionQueue(on_done=self.wake)  # profile switches made by rules
+        self.wakeup_r, self.wakeup_w = socket.socketpair()
+        self.wakeup_r.setblocking(False)
+        self.wakeup_w.setblocking(False)
+        collector.on_snapshot = self.wake
+
+    def wake(self):
+        """Interrupt select() from another thread"""
+        try:
+            self.wakeup_w.send(b"\0")
+        except BlockingIOError:
+            pass
+
+    def listen(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        os.chmod(self.path, 0o666)
+        self.listener.listen(16)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, "accept")
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ, "wakeup")
+
+        self.tcp_listener = None
+        if self.tcp_address is not None:
+            self.tcp_listener = socket.create_server(self.tcp_address, reuse_port=False)
+            self.tcp_listener.setblocking(False)
+            self.selector.register(self.tcp_listener, selectors.EVENT_READ, "accept")
+
+    def serve_forever(self):
+        self.listen()
+        if self.exporter is not None:
+            self.exporter.start()
+        if self.controller is not None:
+            self.controller.start()
+        self.actions.start()
+        for worker in self.workers:
+            worker.start()
+        self.collector.start()
+        try:
+            while True:
+                for key, events in self.selector.select():
+                    if key.data == "accept":
+                        self.accept(key.fileobj)
+                    elif key.data == "wakeup":
+                        self.drain_wakeup()
+                    else:
+                        if events & selectors.EVENT_READ:
+                            self.read(key.data)
+                        if events & selectors.EVENT_WRITE and key.data.conn.fileno() in self.subscribers:
+                            self.flush(key.data)
+        finally:
+            if self.controller is not None:
+                self.controller.stop()
+            self.collector.stop()
+            self.listener.close()
+            if self.tcp_listener is not None:
+                self.tcp_listener.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def accept(self, listener):
+        conn, _ = listener.accept()
+        conn.setblocking(False)
+        subscriber = Subscriber(conn)
+        self.subscribers[conn.fileno()] = subscriber
+        self.selector.register(conn, selectors.EVENT_READ, subscriber)
+        if self.latest is not None:
+            self.send(subscriber, {"type": "snapshot", "snapshot": self.latest})
+
+    def drain_wakeup(self):
+        try:
+            while self.wakeup_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        snapshot = self.collector.latest()
+        if snapshot is not None:
+            self.latest = snapshot
+            if self.exporter is not None:
+                self.exporter.update(snapshot)
+            line = self.encode({"type": "snapshot", "snapshot": snapshot})
+            for subscriber in list(self.subscribers.values()):
+                self.send_line(subscriber, line)
+
+        while True:
+            try:
+                subscriber, response = self.results.get_nowait()
+            except queue.Empty:
+                break
+            subscriber.in_flight -= 1
+            if subscriber.conn.fileno() in self.subscribers:
+                self.send(subscriber, response)
+
+        while True:
+            try:
+                message = self.events.get_nowait()
+            except queue.Empty:
+                break
+            line = self.encode(dict(message, type="rule"))
+            for subscriber in list(self.subscribers.values()):
+                self.send_line(subscriber, line)
+
+        for action in self.actions.completed():
+            if not action.ok:
+                print(action.outcome(), file=sys.stderr)
+
+    def rule_event(self, message):
+        """RuleEngine callback (sampling thread): queue the action and tell the subscribers"""
+        print(message["message"], file=sys.stderr)
+        action = message["action"]
+        if action and "profile" in action:
+            self.actions.submit(Action("profile", message["message"],
+                                       lambda: self.apply_profile(action["profile"])))
+        self.events.put(message)
+        self.wake()
+
+    def apply_profile(self, name):
+        result = self.helper.request("profile", name=name)
+        self.collector.refresh(["ryzenadj"])
+        return result
+
+    def read(self, subscriber):
+        try:
+            data = subscriber.conn.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.drop(subscriber)
+            return
+
+        subscriber.inbuf += data
+        while b"\n" in subscriber.inbuf:
+            line, subscriber.inbuf = subscriber.inbuf.split(b"\n", 1)
+            if line.strip():
+                self.handle(subscriber, line)
+
+    def refusal(self, subscriber, request):
+        """Why a subscriber may not send this request, or None if it may"""
+        cmd = request.get("cmd")
+        if subscriber.remote:
+            return None if cmd in REMOTE_COMMANDS else f"{cmd} is not permitted over TCP"
+        if cmd in DAEMON_COMMANDS or cmd in READ_COMMANDS:
+            return None
+        if cmd == "batch":
+            try:
+                check_batch(request.get("args") or {})
+            except ValueError as e:
+                return str(e)
+            return None
+        if cmd not in ACTION_COMMANDS:
+            return f"unknown command: {cmd}"
+        if not (self.allow_actions or subscriber.uid == 0):
+            return "actions not permitted for this user"
+        return None
+
+    def handle(self, subscriber, line):
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            self.send(subscriber, {"type": "response", "id": None, "ok": False,
+                                   "error": f"bad request: {e}"})
+            return
+
+        cmd = request.get("cmd")
+        response = {"type": "response", "id": request.get("id")}
+        refusal = self.refusal(subscriber, request)
+        if refusal is not None:
+            response.update(ok=False, error=refusal)
+        elif cmd == "snapshot":
+            response.update(ok=True, result=self.latest)
+        elif cmd == "controller":
+            response.update(ok=True, result=self.controller.stats() if self.controller else None)
+        elif cmd == "timings":
+            profiler = self.collector.profiler
+            response.update(ok=True, result=profiler.summary() if profiler else None)
+        elif cmd == "refresh":
+            self.collector.refresh((request.get("args") or {}).get("sources") or SOURCES)
+            response.update(ok=True, result=None)
+        elif subscriber.in_flight >= MAX_IN_FLIGHT:
+            response.update(ok=False, error=f"too many requests in flight (at most {MAX_IN_FLIGHT})")
+        else:
+            # Helper commands can block on systemctl/ryzenadj; one worker per helper lane
+            # runs them off the loop
+            subscriber.in_flight += 1
+            self.requests[lane_of(request)].put((subscriber, request, response))
+            return
+        self.send(subscriber, response)
+
+    def work(self, lane):
+        while True:
+            self.run_request(*self.requests[lane].get())
+
+    def run_request(self, subscriber, request, response):
+        try:
+            response.update(ok=True, result=self.helper.request(request.get("cmd"), **(request.get("args") or {})))
+        except HelperError as e:
+            response.update(ok=False, error=str(e))
+        if request.get("cmd") in ACTION_SOURCES:
+            self.collector.refresh(ACTION_SOURCES[request.get("cmd")])
+        self.results.put((subscriber, response))
+        self.wake()
+
+    def encode(self, message):
+        return (json.dumps(message) + "\n").encode()
+
+    def send(self, subscriber, message):
+        self.send_line(subscriber, self.encode(message))
+
+    def send_line(self, subscriber, line):
+        if len(subscriber.outbuf) > MAX_CLIENT_BUFFER:
+            self.drop(subscriber)
+            return
+        subscriber.outbuf += line
+        self.flush(subscriber)
+
+    def flush(self, subscriber):
+        try:
+            sent = subscriber.conn.send(subscriber.outbuf)
+            subscriber.outbuf = subscriber.outbuf[sent:]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self.drop(subscriber)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if subscriber.outbuf else 0)
+        self.selector.modify(subscriber.conn, events, subscriber)
+
+    def drop(self, subscriber):
+        fd = subscriber.conn.fileno()
+        if self.subscribers.pop(fd, None) is not None:
+            self.selector.unregister(subscriber.conn)
+            subscriber.conn.close()
+
+
+class DaemonClient:
+    """Subscriber side of the daemon socket.
+
+    Offers the SensorCollector interface (start/latest/stop) for snapshots
+    and the HelperClient interface (request) for commands, so the GUI can
+    use it in place of both. When the connection drops, `connected` turns
+    False, pending requests fail and the reader reconnects with backoff.
+    """
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self.snapshots = queue.Queue(maxsize=SNAPSHOT_QUEUE_SIZE)
+        self.rule_events = queue.Queue()  # rule messages pushed by the daemon
+        self.recorder = None  # optional TraceRecorder
+        self.responses = {}
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.sock = self.connect()
+        self.connected = True
+        self.error = None  # why the connection was lost
+        self.generation = 0  # bumped on every disconnect, fails the requests waiting on it
+        self.reader = threading.Thread(target=self.read_loop, name="daemon-client", daemon=True)
+        self.closed = False
+        self._stop_event = threading.Event()
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def start(self):
+        self.reader.start()
+
+    def read_loop(self):
+        delay = RECONNECT_MIN
+        while not self._stop_event.is_set():
+            try:
+                self.read_messages()
+                error = "connection closed"
+            except OSError as e:
+                error = str(e)
+            self.disconnect(error)
+            while not self._stop_event.wait(delay):
+                try:
+                    sock = self.connect()
+                except OSError as e:
+                    delay = min(delay * 2, RECONNECT_MAX)
+                    with self.condition:
+                        self.error = str(e)
+                    continue
+                with self.condition:
+                    self.sock = sock
+                    self.connected = True
+                    self.error = None
+                delay = RECONNECT_MIN
+                break
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def read_messages(self):
+        """Handle messages until the daemon closes the connection"""
+        with self.sock.makefile("r", encoding="utf-8") as lines:
+            for line in lines:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if message.get("type") == "snapshot":
+                    if self.recorder is not None:
+                        self.recorder.write(message["snapshot"])
+                    self.publish(message["snapshot"])
+                elif message.get("type") == "rule":
+                    self.rule_events.put(message)
+                else:
+                    with self.condition:
+                        self.responses[message.get("id")] = message
+                        self.condition.notify_all()
+
+    def disconnect(self, error):
+        with self.condition:
+            self.sock.close()
+            self.connected = False
+            self.error = error
+            self.generation += 1
+            self.responses.clear()
+            self.condition.notify_all()
+
+    def publish(self, snapshot):
+        try:
+            self.snapshots.put_nowait(snapshot)
+        except queue.Full:
+            try:
+                self.snapshots.get_nowait()
+            except queue.Empty:
+                pass
+            self.snapshots.put_nowait(snapshot)
+
+    def latest(self):
+        """Drain the queue and return the newest snapshot, or None"""
+        snapshot = None
+        while True:
+            try:
+                snapshot = self.snapshots.get_nowait()
+            except queue.Empty:
+                return snapshot
+
+    def request(self, cmd, **args):
+        """Send a request to the daemon and wait for its response"""
+        with self.condition:
+            if self.closed or not self.connected:
+                raise HelperError(f"daemon connection lost: {self.error or 'closed'}")
+            self.next_id += 1
+            request_id = self.next_id
+            generation = self.generation
+            try:
+                self.sock.sendall((json.dumps({"id": request_id, "cmd": cmd, "args": args}) + "\n").encode())
+            except OSError as e:
+                raise HelperError(f"daemon connection lost: {e}")
+            while request_id not in self.responses and self.generation == generation:
+                self.condition.wait()
+            response = self.responses.pop(request_id, None)
+        if response is None:
+            raise HelperError("daemon connection lost")
+        if not response.get("ok"):
+            raise HelperError(response.get("error", "request failed"))
+        return response["result"]
+
+    def stop(self):
+        self._stop_event.set()
+        with self.condition:
+            sock = self.sock
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    def batch(self, *requests):
+        """Send several (cmd, args) helper requests in one round-trip"""
+        result = self.request("batch", requests=[{"cmd": cmd, "args": args} for cmd, args in requests])
+        return [r.get("result") if r.get("ok") else None for r in result]
+
+    def refresh(self, sources=SOURCES):
+        """Ask the daemon to re-read these sampling sources now"""
+        try:
+            self.request("refresh", sources=list(sources))
+        except HelperError:
+            pass
+
+    def set_background(self, background):
+        """The daemon keeps its cadence for its other subscribers; only drawing stops"""
+
+    def close(self):
+        self.stop()
+
+
+def parse_address(text):
+    """"HOST:PORT" -> (host, port)"""
+    host, _, port = text.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected HOST:PORT, got {text!r}")
+
+
+def start_fan_controller(helper, mode):
+    """Build a FanController that reads and writes through a helper.
+
+    sensors and set_duty run on the helper's "control" lane, so they never
+    queue behind sampling batches or service/profile actions.
+    """
+    return FanController(lambda: helper.request("sensors")["temp"],
+                         lambda duty: helper.request("set_duty", duty=duty),
+                         make_policy(mode))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pangolin 11 sampler daemon")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("--interval", type=float, default=SAMPLE_INTERVAL,
+                        help="starting seconds between samples of each source")
+    parser.add_argument("--fixed-interval", action="store_true",
+                        help="sample every source every --interval seconds instead of adapting")
+    parser.add_argument("--fake", action="store_true", help="serve simulated hardware values")
+    parser.add_argument("--ec", action="store_true", help="read the EC in-process via ec_sys")
+    parser.add_argument("--allow-actions", action="store_true",
+                        help="accept service/profile actions from any local user")
+    parser.add_argument("--fan-control", choices=("curve", "pid"), default=None,
+                        help="drive the fan duty with the built-in controller "
+                             "(stop the clevo-fancontrol service first)")
+    parser.add_argument("--listen", metavar="HOST:PORT", type=parse_address, default=None,
+                        help="also serve read-only snapshots over TCP (e.g. 0.0.0.0:9878)")
+    parser.add_argument("--rules", metavar="PATH", help="evaluate a rules file (see rules.py)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help=f"serve OpenMetrics on 127.0.0.1:PORT (e.g. {METRICS_PORT})")
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+
+    hardware = FakeBackend() if args.fake else LiveBackend(EC_IO_PATH if args.ec else None)
+    helper = LocalHelper(hardware)
+    backend = simulated_backend_from_args(args) or LiveSensorBackend(helper, sysfs_reader=SysfsReader(),
+                                                                     cpu_reader=CpuReader())
+    recorder = TraceRecorder(args.record) if args.record else None
+    collector = SensorCollector(backend, interval=args.interval, recorder=recorder,
+                                profiler=Profiler(), adaptive=not args.fixed_interval)
+    exporter = MetricsExporter(args.metrics_port) if args.metrics_port else None
+    controller = start_fan_controller(helper, args.fan_control) if args.fan_control else None
+    server = SnapshotServer(collector, helper, args.socket, allow_actions=args.allow_actions,
+                            exporter=exporter, controller=controller, tcp_address=args.listen)
+    if args.rules:
+        try:
+            collector.rules = RuleEngine(load_rules(args.rules), server.rule_event)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot load rules: {e}")
+    # systemd stops the daemon with SIGTERM; exit through serve_forever's cleanup
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Local OpenMetrics/Prometheus endpoint for the monitored values.
+
+The exporter renders the text exposition once per snapshot and scrapes
+just return the cached bytes, so scraping never spawns clevo-fancontrol
+or ryzenadj and costs the same no matter how often it happens.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Default port of the metrics endpoint (bound to localhost only)
+METRICS_PORT = 9877
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+BATTERY_STATES = ("Charging", "Discharging", "Full", "Not charging", "Unknown")
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def render(snapshot):
+    """Render a snapshot in OpenMetrics text format"""
+    lines = []
+
+    def metric(name, kind, help_text, samples, unit=None):
+        lines.append(f"# TYPE {name} {kind}")
+        if unit:
+            lines.append(f"# UNIT {name} {unit}")
+        lines.append(f"# HELP {name} {help_text}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            label_text = ",".join(f'{k}="{escape(v)}"' for k, v in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    metric("pang11_cpu_temperature_celsius", "gauge", "CPU temperature reported by the EC.",
+           [((), snapshot["temp"])], unit="celsius")
+    metric("pang11_fan_rpm", "gauge", "Fan speed in revolutions per minute.",
+           [((), snapshot["rpm"])])
+    metric("pang11_fan_duty_percent", "gauge", "Fan duty cycle.",
+           [((), snapshot["duty"])], unit="percent")
+    metric("pang11_battery_power_watts", "gauge", "Battery charge or discharge power.",
+           [((), f"{snapshot['power']:.3f}")], unit="watts")
+
+    status = snapshot["battery_status"]
+    states = BATTERY_STATES if status in BATTERY_STATES else BATTERY_STATES + (status,)
+    metric("pang11_battery_status", "stateset", "Battery charging state.",
+           [((("pang11_battery_status", state),), int(state == status)) for state in states])
+
+    services = []
+    for service, key in (("clevo-fancontrol", "clevo_active"), ("auto-cpufreq", "cpufreq_active")):
+        if snapshot[key] is not None:
+            services.append(((("service", service),), int(snapshot[key])))
+    metric("pang11_service_active", "gauge", "Whether a managed systemd service is active.", services)
+
+    limits = snapshot["ppt_limits"]
+    if limits:
+        metric("pang11_ppt_limit_watts", "gauge", "RyzenAdj PPT power limits.",
+               [((("limit", "fast"),), limits[0]), ((("limit", "slow"),), limits[1])], unit="watts")
+
+    hwmon = snapshot.get("hwmon") or {}
+    if hwmon:
+        metric("pang11_hwmon_temperature_celsius", "gauge", "Temperatures from hwmon sensors.",
+               [((("sensor", name),), value) for name, value in hwmon.items()], unit="celsius")
+
+    cpus = snapshot.get("cpus")
+    if cpus:
+        cores = [str(core) for core in range(len(cpus["util"]))]
+        metric("pang11_cpu_utilization_percent", "gauge", "Per-core busy share since the last sample.",
+               [((("cpu", core),), value) for core, value in zip(cores, cpus["util"])], unit="percent")
+        metric("pang11_cpu_frequency_mhz", "gauge", "Per-core current frequency from cpufreq.",
+               [((("cpu", core),), value) for core, value in zip(cores, cpus["mhz"])])
+
+    metric("pang11_last_sample_timestamp_seconds", "gauge", "Unix time of the last sample.",
+           [((), f"{snapshot['time']:.3f}")], unit="seconds")
+
+    lines.append("# EOF")
+    return ("\n".join(lines) + "\n").encode()
+
+
+class MetricsExporter:
+    """Serves the latest rendered snapshot on http://127.0.0.1:<port>/metrics"""
+
+    def __init__(self, port=METRICS_PORT, host="127.0.0.1"):
+        self.body = b"# EOF\n"
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = exporter.body
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       name="metrics-exporter", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def update(self, snapshot):
+        """Re-render the exposition for a new snapshot"""
+        self.body = render(snapshot)
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
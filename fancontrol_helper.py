@@ -0,0 +1,386 @@
+#!/usr/bin/python3
+"""Long-lived privileged helper for the Pangolin 11 monitor.
+
+The GUI starts this once through pkexec (action com.pang11.fancontrol.helper)
+and then talks to it over stdin/stdout with one JSON object per line:
+
+    -> {"id": 1, "cmd": "sensors"}
+    <- {"id": 1, "ok": true, "result": {"temp": 52, "rpm": 2300, "duty": 40}}
+
+Commands: ping, sensors, ryzenadj_info, ryzenadj_limits (the current limits
+in the form limits takes), service_status, service, profile, limits (custom
+PPT limits), set_duty and batch (a list of read requests answered in one
+round-trip). Run with --fake to serve simulated values without root or Clevo
+hardware, and with --ec to read the EC registers in-process instead of
+spawning clevo-fancontrol.
+
+Requests run on one worker per lane (see COMMAND_LANES) and responses are
+written as they finish, so a slow systemctl or ryzenadj action never holds
+up sampling or fan control; clients match responses to requests by id.
+"""
+import json
+import math
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sensors
+
+# Installed location of the helper (see install-desktop.sh)
+INSTALLED_HELPER = "/usr/local/bin/pang11-fancontrol-helper"
+
+# Commands that only read state; the only ones a batch may contain
+READ_COMMANDS = ("ping", "sensors", "ryzenadj_info", "ryzenadj_limits", "service_status")
+
+# Worker lane of each command; lanes run concurrently, requests within a
+# lane in order. Everything else (sampling batches, status reads) is "sample".
+COMMAND_LANES = {"service": "action", "profile": "action", "limits": "action",
+                 "sensors": "control", "set_duty": "control"}
+LANES = ("action", "control", "sample")
+
+
+def lane_of(request):
+    return COMMAND_LANES.get(request.get("cmd"), "sample")
+
+
+class HelperError(Exception):
+    """Raised when the helper is unavailable or a request fails"""
+
+
+class LiveBackend:
+    """Talks to the real hardware tools; expects to already run as root"""
+
+    def __init__(self, ec_path=None):
+        self.ec = None
+        if ec_path:
+            try:
+                self.ec = sensors.ECReader(ec_path)
+            except OSError as e:
+                print(f"Cannot open EC ({e}), using clevo-fancontrol", file=sys.stderr)
+
+    def sensors(self):
+        if self.ec is not None:
+            temp, rpm, duty = self.ec.read()
+            return {"temp": temp, "rpm": rpm, "duty": duty}
+        output = subprocess.check_output([sensors.CLEVO_FANCONTROL], text=True,
+                                         stderr=subprocess.DEVNULL).strip()
+        temp, rpm, duty = sensors.parse_sensor_output(output)
+        return {"temp": temp, "rpm": rpm, "duty": duty}
+
+    def ryzenadj_output(self):
+        result = subprocess.run([sensors.RYZENADJ, "--info"],
+                                capture_output=True, text=True)
+        return result.stdout if result.returncode == 0 else None
+
+    def ryzenadj_info(self):
+        output = self.ryzenadj_output()
+        return sensors.parse_ryzenadj_info(output) if output is not None else None
+
+    def ryzenadj_limits(self):
+        output = self.ryzenadj_output()
+        return sensors.parse_ryzenadj_limits(output) if output is not None else None
+
+    def service_status(self, service):
+        return sensors.get_service_active(service)
+
+    def service(self, service, action):
+        return subprocess.run(["systemctl", action, service]).returncode
+
+    def profile(self, name):
+        return subprocess.run([sensors.RYZENADJ] + sensors.ryzenadj_profile_args(name)).returncode
+
+    def set_limits(self, fast, slow, tctl):
+        return subprocess.run([sensors.RYZENADJ] + sensors.ryzenadj_limit_args(fast, slow, tctl)).returncode
+
+    def set_duty(self, duty):
+        return subprocess.run([sensors.CLEVO_FANCONTROL, str(duty)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+
+
+class FakeBackend:
+    """Simulated hardware for running and testing without root"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.services = {service: True for service in sensors.MANAGED_SERVICES}
+        self.limits = (30.0, 20.0)
+        self.tctl = 98
+        self.duty = None  # set by set_duty, otherwise follows the built-in curve
+
+    def sensors(self):
+        elapsed = time.monotonic() - self.started
+        temp = int(55 + 15 * math.sin(elapsed / 20))
+        duty = self.duty if self.duty is not None else max(0, min(100, (temp - 40) * 3))
+        rpm = duty * 45 if self.services["clevo-fancontrol"] else 0
+        return {"temp": temp, "rpm": rpm, "duty": duty}
+
+    def ryzenadj_info(self):
+        return self.limits
+
+    def ryzenadj_limits(self):
+        fast, slow = self.limits
+        return round(fast * 1000), round(slow * 1000), self.tctl
+
+    def service_status(self, service):
+        return self.services.get(service)
+
+    def service(self, service, action):
+        self.services[service] = action == "start"
+        return 0
+
+    def profile(self, name):
+        return self.set_limits(*sensors.RYZENADJ_PROFILES[name])
+
+    def set_limits(self, fast, slow, tctl):
+        self.limits = (fast / 1000.0, slow / 1000.0)
+        self.tctl = tctl
+        return 0
+
+    def set_duty(self, duty):
+        self.duty = duty
+        return 0
+
+
+def check_batch(args):
+    """The requests of a batch; raises ValueError unless all of them are reads"""
+    requests = args.get("requests", [])
+    if not isinstance(requests, list) or not all(isinstance(r, dict) for r in requests):
+        raise ValueError("batch requests must be a list of requests")
+    for request in requests:
+        if request.get("cmd") not in READ_COMMANDS:
+            raise ValueError(f"batch may only contain read commands, not {request.get('cmd')!r}")
+    return requests
+
+
+class HelperServer:
+    """Dispatches protocol requests to a backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.locks = {lane: threading.Lock() for lane in LANES}
+
+    def run(self, request):
+        """handle() a request, serialized only with requests of its lane"""
+        with self.locks[lane_of(request)]:
+            return self.handle(request)
+
+    def handle(self, request):
+        response = {"id": request.get("id")}
+        try:
+            response["result"] = self.dispatch(request.get("cmd"), request.get("args") or {})
+            response["ok"] = True
+        except Exception as e:
+            response["ok"] = False
+            response["error"] = str(e)
+        return response
+
+    def dispatch(self, cmd, args):
+        if cmd == "ping":
+            return "pong"
+        if cmd == "sensors":
+            return self.backend.sensors()
+        if cmd == "ryzenadj_info":
+            return self.backend.ryzenadj_info()
+        if cmd == "ryzenadj_limits":
+            return self.backend.ryzenadj_limits()
+        if cmd == "service_status":
+            return self.backend.service_status(self.checked_service(args))
+        if cmd == "service":
+            action = args.get("action")
+            if action not in ("start", "stop"):
+                raise ValueError(f"unsupported service action: {action}")
+            return self.backend.service(self.checked_service(args), action)
+        if cmd == "profile":
+            name = args.get("name")
+            if name not in sensors.RYZENADJ_PROFILES:
+                raise ValueError(f"unknown profile: {name}")
+            return self.backend.profile(name)
+        if cmd == "limits":
+            fast, slow, tctl = args.get("fast"), args.get("slow"), args.get("tctl")
+            sensors.check_ryzenadj_limits(fast, slow, tctl)
+            return self.backend.set_limits(fast, slow, tctl)
+        if cmd == "set_duty":
+            duty = args.get("duty")
+            if not isinstance(duty, int) or not 0 <= duty <= 100:
+                raise ValueError(f"duty must be an integer 0-100: {duty}")
+            return self.backend.set_duty(duty)
+        if cmd == "batch":
+            requests = check_batch(args)
+            return [self.handle(r) for r in requests]
+        raise ValueError(f"unknown command: {cmd}")
+
+    def checked_service(self, args):
+        service = args.get("service")
+        if service not in sensors.MANAGED_SERVICES:
+            raise ValueError(f"service not managed: {service}")
+        return service
+
+    def serve(self, infile, outfile):
+        write_lock = threading.Lock()
+
+        def write(response):
+            with write_lock:
+                outfile.write(json.dumps(response) + "\n")
+                outfile.flush()
+
+        def work(requests):
+            while True:
+                request = requests.get()
+                if request is None:
+                    return
+                write(self.run(request))
+
+        lanes = {lane: queue.Queue() for lane in LANES}
+        workers = [threading.Thread(target=work, args=(requests,), name=f"helper-{lane}", daemon=True)
+                   for lane, requests in lanes.items()]
+        for worker in workers:
+            worker.start()
+        for line in infile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                write({"id": None, "ok": False, "error": f"bad request: {e}"})
+                continue
+            if not isinstance(request, dict):
+                write({"id": None, "ok": False, "error": "bad request: not an object"})
+                continue
+            lanes[lane_of(request)].put(request)
+        for requests in lanes.values():
+            requests.put(None)
+        for worker in workers:
+            worker.join()
+
+
+class HelperClient:
+    """GUI-side connection to a running helper process"""
+
+    def __init__(self, fake=False, ec=False):
+        self.fake = fake
+        self.ec = ec
+        self.process = None
+        self.reader = None
+        self.next_id = 0
+        self.responses = {}  # id -> response not yet collected by its request()
+        self.closed = False
+        self.lock = threading.Lock()  # guards the ids, responses and stdin writes
+        self.condition = threading.Condition(self.lock)
+
+    def command(self):
+        """Command line used to start the helper"""
+        if self.fake:
+            return [sys.executable, os.path.abspath(__file__), "--fake"]
+        path = INSTALLED_HELPER if os.path.exists(INSTALLED_HELPER) else os.path.abspath(__file__)
+        options = ["--ec"] if self.ec else []
+        if os.geteuid() == 0:
+            return [sys.executable, path] + options
+        return ["pkexec", path] + options
+
+    def start(self):
+        self.process = subprocess.Popen(self.command(), stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, text=True, bufsize=1)
+        self.closed = False
+        self.reader = threading.Thread(target=self.read_loop, args=(self.process,),
+                                       name="helper-client", daemon=True)
+        self.reader.start()
+
+    def read_loop(self, process):
+        """Hand each response to the request() waiting for its id"""
+        try:
+            for line in process.stdout:
+                try:
+                    response = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                with self.condition:
+                    self.responses[response.get("id")] = response
+                    self.condition.notify_all()
+        except (OSError, ValueError):
+            pass
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def request(self, cmd, **args):
+        """Send one request and return its result, raising HelperError on failure.
+
+        Requests from several threads are in flight at once; a slow action
+        does not delay the reads sent after it.
+        """
+        with self.condition:
+            if self.process is None or self.closed or self.process.poll() is not None:
+                raise HelperError("helper is not running")
+            self.next_id += 1
+            request_id = self.next_id
+            try:
+                self.process.stdin.write(json.dumps({"id": request_id, "cmd": cmd, "args": args}) + "\n")
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                raise HelperError(f"helper connection lost: {e}")
+            while request_id not in self.responses and not self.closed:
+                self.condition.wait()
+            response = self.responses.pop(request_id, None)
+        if response is None:
+            raise HelperError("helper exited")
+        if not response.get("ok"):
+            raise HelperError(response.get("error", "request failed"))
+        return response["result"]
+
+    def batch(self, *requests):
+        """Send several (cmd, args) requests in one round-trip"""
+        result = self.request("batch", requests=[{"cmd": cmd, "args": args} for cmd, args in requests])
+        return [r.get("result") if r.get("ok") else None for r in result]
+
+    def close(self):
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+
+class LocalHelper:
+    """HelperClient-compatible wrapper around an in-process backend.
+
+    Used when the caller already runs as root (the daemon), so requests are
+    dispatched directly instead of through a child process.
+    """
+
+    def __init__(self, backend):
+        self.server = HelperServer(backend)
+
+    def request(self, cmd, **args):
+        response = self.server.run({"cmd": cmd, "args": args})
+        if not response["ok"]:
+            raise HelperError(response["error"])
+        return response["result"]
+
+    def batch(self, *requests):
+        result = self.request("batch", requests=[{"cmd": cmd, "args": args} for cmd, args in requests])
+        return [r.get("result") if r.get("ok") else None for r in result]
+
+    def close(self):
+        pass
+
+
+def main():
+    if "--fake" in sys.argv[1:]:
+        backend = FakeBackend()
+    else:
+        backend = LiveBackend(sensors.EC_IO_PATH if "--ec" in sys.argv[1:] else None)
+    HelperServer(backend).serve(sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""Fleet dashboard: many sampler daemons on one screen.
+
+Subscribes to any number of sampler daemons (see daemon.py) and shows a
+compact row per host with its latest readings, alert status and
+temperature/power sparklines:
+
+    python3 fleet.py /run/pang11-fancontrol.sock laptop=10.0.0.5:9878
+    python3 fleet.py --simulate 40              # 40 local synthetic daemons
+    python3 fleet.py --simulate 40 --headless   # status table on stdout
+
+Remote daemons have to be started with --listen HOST:PORT. All connections
+are served by one selector loop on one thread (host names are looked up on
+short-lived threads beside it), and the window redraws on a single 1 s timer
+that only touches the rows whose data changed, so dozens of hosts cost about
+as much as one.
+"""
+import argparse
+import errno
+import json
+import os
+import selectors
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from backends import SYNTHETIC_PROFILES
+from rolling import RingBuffer
+
+# Seconds of history in each sparkline, at most one point per SPARKLINE_PERIOD
+SPARKLINE_WINDOW = 120
+SPARKLINE_PERIOD = 1.0
+
+# Reconnect backoff bounds in seconds
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 30.0
+
+# Alert thresholds: seconds without a snapshot, °C, and °C with the fan at 0 RPM
+STALE_AFTER = 5.0
+HOT_TEMP = 90
+FAN_STALL_TEMP = 70
+
+# Dashboard redraw period in milliseconds
+DASHBOARD_INTERVAL = 1000
+
+# Sparkline size in pixels and value ranges (temperature °C, power W)
+SPARKLINE_SIZE = (240, 36)
+TEMP_RANGE = (30, 100)
+POWER_RANGE = (0, 60)
+
+# Status colors of the dashboard rows
+STATUS_COLORS = {"ok": "#4ecdc4", "warning": "#f7b731", "alert": "#ff6b6b", "offline": "#808080"}
+
+
+def parse_source(text):
+    """"[NAME=]PATH" or "[NAME=]HOST:PORT" -> (name, address)"""
+    name, _, address = text.rpartition("=")
+    if "/" in address or address.endswith(".sock"):
+        return name or os.path.basename(address).removesuffix(".sock"), address
+    host, _, port = address.rpartition(":")
+    try:
+        return name or host, (host or "127.0.0.1", int(port))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a socket path or HOST:PORT, got {text!r}")
+
+
+class FleetSource:
+    """Connection state and recent samples of one sampler daemon"""
+
+    def __init__(self, name, address):
+        self.name = name
+        self.address = address  # Unix socket path or (host, port)
+        # (family, sockaddr) to connect to; TCP hosts are looked up off the selector loop
+        self.resolved = (socket.AF_UNIX, address) if isinstance(address, str) else None
+        self.resolving = False
+        self.resolve_error = None
+        self.sock = None
+        self.inbuf = b""
+        self.connected = False
+        self.error = None
+        self.retry_at = 0.0
+        self.retry_delay = RECONNECT_MIN
+        self.latest = None
+        self.received = None  # perf_counter() of the latest snapshot
+        self.samples = RingBuffer(int(SPARKLINE_WINDOW / SPARKLINE_PERIOD), 3)  # time, temp, W
+        self.version = 0  # bumped on every change, so the GUI can skip unchanged rows
+
+    def add(self, snapshot, now):
+        self.latest = snapshot
+        self.received = now
+        if not len(self.samples) or now - self.samples.view(1)[0, 0] >= SPARKLINE_PERIOD:
+            self.samples.append((now, snapshot["temp"], snapshot["power"]))
+        self.version += 1
+
+
+class FleetMonitor(threading.Thread):
+    """One selector loop subscribed to every source, reconnecting with backoff"""
+
+    def __init__(self, sources):
+        super().__init__(name="fleet-monitor", daemon=True)
+        self.sources = list(sources)
+        self.lock = threading.Lock()
+        self.selector = selectors.DefaultSelector()
+        self.wakeup_r, self.wakeup_w = socket.socketpair()
+        self.wakeup_r.setblocking(False)
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ, None)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                now = time.perf_counter()
+                with self.lock:
+                    waiting = [s for s in self.sources if s.sock is None and not s.resolving]
+                for source in waiting:
+                    if source.retry_at <= now:
+                        self.connect(source, now)
+                with self.lock:
+                    retries = [s.retry_at for s in self.sources if s.sock is None and not s.resolving]
+                timeout = max(0.0, min(retries, default=now + 1.0) - now)
+                for key, events in self.selector.select(min(timeout, 1.0)):
+                    source = key.data
+                    if source is None:
+                        self.wakeup_r.recv(64)
+                    elif not source.connected:
+                        self.finish_connect(source)
+                    else:
+                        self.read(source)
+        finally:
+            for source in self.sources:
+                self.disconnect(source)
+            self.selector.close()
+            self.wakeup_r.close()
+            self.wakeup_w.close()
+
+    def connect(self, source, now):
+        with self.lock:
+            error, source.resolve_error = source.resolve_error, None
+            resolved = source.resolved
+        if error is not None:
+            self.fail(source, error, now)
+            return
+        if resolved is None:
+            self.resolve(source)
+            return
+        family, sockaddr = resolved
+        sock = None
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            err = sock.connect_ex(sockaddr)
+            error = None if err in (0, errno.EINPROGRESS, errno.EAGAIN) else os.strerror(err)
+        except OSError as e:
+            error = str(e)
+        if error is not None:
+            if sock is not None:
+                sock.close()
+            self.fail(source, error, now)
+            return
+        source.sock = sock
+        self.selector.register(sock, selectors.EVENT_WRITE, source)
+
+    def resolve(self, source):
+        """Look up a TCP source's host on its own thread, so a slow DNS server stalls no other host"""
+        with self.lock:
+            source.resolving = True
+        threading.Thread(target=self.lookup, args=(source,), name=f"fleet-resolve-{source.name}",
+                         daemon=True).start()
+
+    def lookup(self, source):
+        host, port = source.address
+        try:
+            family, _, _, _, sockaddr = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+        except OSError as e:  # socket.gaierror for unknown names
+            with self.lock:
+                source.resolve_error = str(e)
+        else:
+            with self.lock:
+                source.resolved = (family, sockaddr)
+        with self.lock:
+            source.resolving = False
+        try:
+            self.wakeup_w.send(b"x")
+        except OSError:
+            pass  # the loop has stopped
+
+    def finish_connect(self, source):
+        err = source.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err:
+            self.fail(source, os.strerror(err))
+            return
+        self.selector.modify(source.sock, selectors.EVENT_READ, source)
+        with self.lock:
+            source.connected = True
+            source.error = None
+            source.retry_delay = RECONNECT_MIN
+            source.version += 1
+
+    def read(self, source):
+        try:
+            data = source.sock.recv(65536)
+        except OSError as e:
+            self.fail(source, str(e))
+            return
+        if not data:
+            self.fail(source, "connection closed")
+            return
+        *lines, source.inbuf = (source.inbuf + data).split(b"\n")
+        now = time.perf_counter()
+        with self.lock:
+            for line in lines:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if message.get("type") == "snapshot":
+                    source.add(message["snapshot"], now)
+
+    def disconnect(self, source):
+        if source.sock is not None:
+            self.selector.unregister(source.sock)
+            source.sock.close()
+        source.sock = None
+        source.inbuf = b""
+
+    def fail(self, source, error, now=None):
+        self.disconnect(source)
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            source.connected = False
+            source.error = error
+            source.retry_at = now + source.retry_delay
+            source.retry_delay = min(source.retry_delay * 2, RECONNECT_MAX)
+            if not isinstance(source.address, str):
+                source.resolved = None  # look the host up again, it may have moved
+            source.version += 1
+
+    def rows(self, versions=None):
+        """(source, version, latest, received, sparkline copy or None) per source.
+
+        The sparkline is only copied for sources whose version differs from
+        versions[name].
+        """
+        rows = []
+        with self.lock:
+            for source in self.sources:
+                changed = versions is None or versions.get(source.name) != source.version
+                rows.append((source, source.version, source.latest, source.received,
+                             source.samples.view().copy() if changed else None))
+        return rows
+
+    def stop(self):
+        self._stop_event.set()
+        try:
+            self.wakeup_w.send(b"x")
+        except OSError:
+            pass
+        self.join()
+
+
+def alert_status(source, latest, received, now):
+    """("ok" | "warning" | "alert" | "offline", text) for one source"""
+    if not source.connected:
+        return "offline", f"offline: {source.error}" if source.error else "connecting"
+    if latest is None:
+        return "warning", "waiting"
+    if now - received > STALE_AFTER:
+        return "alert", f"stale {now - received:.0f}s"
+    if latest["temp"] >= HOT_TEMP:
+        return "alert", "hot"
+    if latest["rpm"] == 0 and latest["temp"] >= FAN_STALL_TEMP:
+        return "alert", "fan stalled"
+    return "ok", "ok"
+
+
+def format_values(latest):
+    if latest is None:
+        return "-"
+    return f"{latest['temp']:>3.0f}°C {latest['rpm']:>5} RPM {latest['power']:>5.1f} W"
+
+
+def sparkline_coords(times, values, now, value_range, size=SPARKLINE_SIZE):
+    """Flat x0, y0, x1, y1, ... canvas coordinates of one sparkline"""
+    width, height = size
+    low, high = value_range
+    x = width + (times - now) * width / SPARKLINE_WINDOW
+    y = height - 1 - (np.clip(values, low, high) - low) * (height - 2) / (high - low)
+    return np.column_stack((x, y)).ravel().tolist()
+
+
+class FleetDashboard:
+    """One compact row per source, redrawn on a single Tk timer"""
+
+    def __init__(self, root, monitor):
+        import customtkinter as ctk
+
+        self.root = root
+        self.monitor = monitor
+        self.root.title(f"Pangolin 11 Fleet ({len(monitor.sources)} hosts)")
+        self.root.geometry("900x700")
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.summary_label = ctk.CTkLabel(root, text="",
+                                          font=ctk.CTkFont(family="Courier New", size=14, weight="bold"))
+        self.summary_label.pack(padx=10, pady=(10, 0), anchor="w")
+        frame = ctk.CTkScrollableFrame(root)
+        frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        font = ctk.CTkFont(family="Courier New", size=12)
+        self.rows = {}
+        for i, source in enumerate(monitor.sources):
+            name = ctk.CTkLabel(frame, text=source.name, font=font, anchor="w", width=120)
+            status = ctk.CTkLabel(frame, text="", font=font, anchor="w", width=150)
+            values = ctk.CTkLabel(frame, text="-", font=font, anchor="w", width=220)
+            canvas = ctk.CTkCanvas(frame, width=SPARKLINE_SIZE[0], height=SPARKLINE_SIZE[1],
+                                   bg="#1a1a1a", highlightthickness=0)
+            temp_line = canvas.create_line(0, 0, 0, 0, fill="#ff6b6b")
+            power_line = canvas.create_line(0, 0, 0, 0, fill="#f7b731")
+            for column, widget in enumerate((name, status, values, canvas)):
+                widget.grid(row=i, column=column, padx=5, pady=2, sticky="w")
+            self.rows[source.name] = {"status": status, "values": values, "canvas": canvas,
+                                      "temp": temp_line, "power": power_line,
+                                      "version": None, "status_text": None}
+        self.job = self.root.after(0, self.refresh)
+
+    def refresh(self):
+        now = time.perf_counter()
+        versions = {name: row["version"] for name, row in self.rows.items()}
+        counts = dict.fromkeys(STATUS_COLORS, 0)
+        for source, version, latest, received, samples in self.monitor.rows(versions):
+            row = self.rows[source.name]
+            level, text = alert_status(source, latest, received, now)
+            counts[level] += 1
+            if text != row["status_text"]:
+                row["status"].configure(text=text, text_color=STATUS_COLORS[level])
+                row["status_text"] = text
+            if samples is not None:
+                row["version"] = version
+                row["values"].configure(text=format_values(latest))
+                self.draw_sparkline(row, samples, now)
+        self.summary_label.configure(text="  ".join(f"{level}: {count}"
+                                                    for level, count in counts.items()))
+        self.job = self.root.after(DASHBOARD_INTERVAL, self.refresh)
+
+    def draw_sparkline(self, row, samples, now):
+        canvas = row["canvas"]
+        if len(samples) < 2:
+            canvas.coords(row["temp"], 0, 0, 0, 0)
+            canvas.coords(row["power"], 0, 0, 0, 0)
+            return
+        times = samples[:, 0]
+        canvas.coords(row["temp"], *sparkline_coords(times, samples[:, 1], now, TEMP_RANGE))
+        canvas.coords(row["power"], *sparkline_coords(times, samples[:, 2], now, POWER_RANGE))
+
+    def close(self):
+        self.root.after_cancel(self.job)
+        self.monitor.stop()
+        self.root.destroy()
+
+
+def run_headless(monitor, interval=DASHBOARD_INTERVAL / 1000):
+    """Print a status table every interval seconds until interrupted"""
+    while True:
+        now = time.perf_counter()
+        lines = [time.strftime("%H:%M:%S")]
+        for source, _, latest, received, _ in monitor.rows({}):
+            _, text = alert_status(source, latest, received, now)
+            lines.append(f"  {source.name:<16}{text:<28.27}{format_values(latest)}")
+        print("\n".join(lines), flush=True)
+        time.sleep(interval)
+
+
+def simulate(count, directory, speed):
+    """Start `count` synthetic sampler daemons; returns (processes, sources)"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daemon.py")
+    profiles = sorted(SYNTHETIC_PROFILES)
+    processes = []
+    sources = []
+    for i in range(count):
+        path = os.path.join(directory, f"sim-{i + 1:02d}.sock")
+        processes.append(subprocess.Popen(
+            [sys.executable, script, "--fake", "--socket", path,
+             "--synthetic", profiles[i % len(profiles)], "--speed", str(speed)],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL))
+        sources.append(FleetSource(f"sim-{i + 1:02d}", path))
+    return processes, sources
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pangolin 11 fleet dashboard")
+    parser.add_argument("sources", nargs="*", type=parse_source, metavar="[NAME=]SOCKET|HOST:PORT",
+                        help="sampler daemons to subscribe to")
+    parser.add_argument("--simulate", type=int, default=0, metavar="N",
+                        help="also start N local synthetic daemons")
+    parser.add_argument("--speed", type=float, default=1.0, help="simulation speed of --simulate")
+    parser.add_argument("--headless", action="store_true", help="print a status table instead")
+    args = parser.parse_args(argv)
+
+    sources = [FleetSource(name, address) for name, address in args.sources]
+    processes = []
+    directory = None
+    if args.simulate:
+        directory = tempfile.mkdtemp(prefix="pang11-fleet-")
+        processes, simulated = simulate(args.simulate, directory, args.speed)
+        sources += simulated
+    if not sources:
+        parser.error("no sources given")
+
+    # Clean up the simulated daemons on SIGTERM too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    monitor = FleetMonitor(sources)
+    monitor.start()
+    try:
+        if args.headless:
+            run_headless(monitor)
+        else:
+            import customtkinter as ctk
+
+            ctk.set_appearance_mode("dark")
+            root = ctk.CTk()
+            FleetDashboard(root, monitor)
+            root.mainloop()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if monitor.is_alive():
+            monitor.stop()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
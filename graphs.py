@@ -0,0 +1,121 @@
+from matplotlib.figure import Figure
+from matplotlib.patches import Polygon
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+# Seconds of history shown in each graph
+GRAPH_WINDOW = 60
+
+# Blit only the data region instead of redrawing the whole figure every tick
+GRAPH_BLIT = True
+
+
+class LiveGraph:
+    """A history graph whose line and fill artists are created once.
+
+    Each update only moves the existing artists with set_data/set_xy. In blit
+    mode the static background (axes, grid, ticks, labels) is cached after
+    every full draw and only the data region is repainted; a full draw only
+    happens when the data leaves the current y-range or the canvas resizes.
+    With parent=None the graph renders off-screen (for benchmarks).
+    """
+
+    def __init__(self, parent, ylabel, color, y_floor, y_headroom,
+                 xlabel=None, window=GRAPH_WINDOW, blit=GRAPH_BLIT):
+        self.color = color
+        self.window = window
+        self.y_floor = y_floor
+        self.y_headroom = y_headroom
+        self.blit = blit
+        self.background = None
+
+        fig = Figure(figsize=(6, 2), dpi=80, facecolor='#212121')
+        self.figure = fig
+        self.ax = fig.add_subplot(111)
+        self.ax.set_facecolor('#1a1a1a')
+        self.ax.set_ylabel(ylabel, color='white', fontsize=9)
+        if xlabel:
+            self.ax.set_xlabel(xlabel, color='white', fontsize=9)
+        self.ax.tick_params(colors='white', labelsize=8)
+        self.ax.grid(True, alpha=0.2, color='white')
+        self.ax.spines['bottom'].set_color('white')
+        self.ax.spines['top'].set_color('#1a1a1a')
+        self.ax.spines['left'].set_color('white')
+        self.ax.spines['right'].set_color('#1a1a1a')
+
+        self.line, = self.ax.plot([], [], color=color, linewidth=2, animated=blit)
+        self.fill = Polygon(self.fill_vertices([], []), closed=True,
+                            facecolor=color, edgecolor='none', alpha=0.3,
+                            animated=blit)
+        self.ax.add_patch(self.fill)
+        # Burst capture trace drawn over the regular history
+        self.overlay, = self.ax.plot([], [], color='white', linewidth=0.8, alpha=0.8, animated=blit)
+        self.ax.set_autoscale_on(False)
+        self.ax.set_xlim(0, window)  # seconds ago
+        self.ax.set_ylim(0, y_floor)
+
+        fig.tight_layout()
+
+        if parent is None:
+            self.canvas = FigureCanvasAgg(fig)
+        else:
+            self.canvas = FigureCanvasTkAgg(fig, parent)
+            self.canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        if blit:
+            self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def fill_vertices(self, x_values, values):
+        """Polygon outline for the area between the line and zero"""
+        if len(x_values) == 0:
+            return [(0, 0)]
+        return ([(x_values[0], 0)] + list(zip(x_values, values)) + [(x_values[-1], 0)])
+
+    def on_draw(self, event):
+        """Cache the static background after every full draw"""
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        self.ax.draw_artist(self.fill)
+        self.ax.draw_artist(self.line)
+        self.ax.draw_artist(self.overlay)
+
+    def rescale(self, values, peak=None):
+        """Adjust the y-limit if the data left the current range.
+
+        Returns True when the limit changed and a full draw is needed.
+        """
+        if peak is None:
+            peak = float(values.max()) if len(values) else 0
+        top = self.ax.get_ylim()[1]
+        target = max(self.y_floor, peak + self.y_headroom)
+        if peak >= top or target < top / 2:
+            self.ax.set_ylim(0, target)
+            return True
+        return False
+
+    def update(self, x_values, values, peak=None, overlay=None):
+        """Show a new window of values at x_values seconds ago.
+
+        peak, when the caller tracks it, saves a scan of values for the y-limit.
+        overlay is an optional (x_values, values) trace drawn on top, e.g. a
+        burst capture; pass None to clear it.
+        """
+        self.line.set_data(x_values, values)
+        self.fill.set_xy(self.fill_vertices(x_values, values))
+        if overlay is not None:
+            self.overlay.set_data(*overlay)
+            if len(overlay[1]):
+                if peak is None:
+                    peak = float(values.max()) if len(values) else 0
+                peak = max(peak, float(overlay[1].max()))
+        elif len(self.overlay.get_xdata()):
+            self.overlay.set_data([], [])
+
+        if self.rescale(values, peak) or not self.blit or self.background is None:
+            self.canvas.draw()
+            return
+
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.ax.bbox)
@@ -0,0 +1,186 @@
+import fcntl
+import math
+import os
+
+import numpy as np
+
+# Metrics kept in the history, in column order
+METRICS = ("temp", "rpm", "duty", "power")
+
+# Rollup tiers: (bucket seconds, capacity). Every tier, including tier 0,
+# rolls samples up into buckets of its resolution, however often they come:
+# 1 h of 1 s buckets, 24 h of 10 s buckets, 7 days of 1 min buckets (~1.3 MB)
+TIERS = ((1, 3600), (10, 8640), (60, 10080))
+
+# Most points a graph should get from one tier before a coarser one is used
+MAX_TIER_POINTS = 600
+
+RECORD = np.dtype([
+    ("time", "<f8"),
+    ("min", "<f4", (len(METRICS),)),
+    ("max", "<f4", (len(METRICS),)),
+    ("mean", "<f4", (len(METRICS),)),
+])
+HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u4"),
+    ("head", "<u8", (len(TIERS),)),
+    ("count", "<u8", (len(TIERS),)),
+])
+HEADER_SIZE = 64
+MAGIC = b"P11H"
+VERSION = 1
+
+
+def default_history_path():
+    cache = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(cache, "pang11-fancontrol", "history.bin")
+
+
+class HistoryStore:
+    """Memory-mapped ring store of samples with min/max/mean rollup tiers.
+
+    The file is a fixed-size header followed by one ring of RECORDs per
+    tier. It is mapped with numpy.memmap, so opening it is instant and
+    appends are plain stores into the mapping. Only one process may write
+    the file: it is flock()ed while open, and a second store on the same
+    path raises OSError. With path=None the store lives in memory only.
+    """
+
+    def __init__(self, path=None):
+        size = HEADER_SIZE + sum(capacity for _, capacity in TIERS) * RECORD.itemsize
+        self.lock_fd = None
+        if path is None:
+            self.buffer = np.zeros(size, dtype=np.uint8)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                raise OSError(f"{path} is in use by another monitor")
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self.lock_fd = fd  # held (and the lock with it) for the life of the store
+            self.buffer = np.memmap(path, dtype=np.uint8, mode="r+", shape=(size,))
+
+        self.header = self.buffer[:HEADER.itemsize].view(HEADER)
+        if self.header["magic"][0] != MAGIC or self.header["version"][0] != VERSION:
+            self.buffer[:] = 0
+            self.header["magic"] = MAGIC
+            self.header["version"] = VERSION
+
+        self.rings = []
+        offset = HEADER_SIZE
+        for _, capacity in TIERS:
+            end = offset + capacity * RECORD.itemsize
+            self.rings.append(self.buffer[offset:end].view(RECORD))
+            offset = end
+
+        # In-progress rollup bucket of each tier: [bucket, min, max, sum, n]
+        self.pending = [None] * len(TIERS)
+
+    def write(self, tier, bucket_time, low, high, mean):
+        ring = self.rings[tier]
+        head = int(self.header["head"][0][tier])
+        ring[head] = (bucket_time, low, high, mean)
+        self.header["head"][0][tier] = (head + 1) % len(ring)
+        self.header["count"][0][tier] = min(int(self.header["count"][0][tier]) + 1, len(ring))
+
+    def append(self, timestamp, values):
+        """Add one sample; values are in METRICS order"""
+        values = [float(v) for v in values]
+        for tier in range(len(TIERS)):
+            resolution = TIERS[tier][0]
+            bucket = math.floor(timestamp / resolution) * resolution
+            pending = self.pending[tier]
+            if pending is not None and pending[0] != bucket:
+                self.flush_bucket(tier)
+                pending = None
+            if pending is None:
+                self.pending[tier] = [bucket, list(values), list(values), list(values), 1]
+                continue
+            for i, value in enumerate(values):
+                pending[1][i] = min(pending[1][i], value)
+                pending[2][i] = max(pending[2][i], value)
+                pending[3][i] += value
+            pending[4] += 1
+
+    def flush_bucket(self, tier):
+        bucket, low, high, total, n = self.pending[tier]
+        self.write(tier, bucket, low, high, [v / n for v in total])
+        self.pending[tier] = None
+
+    def records(self, tier):
+        """All records of a tier in chronological order (a copy)"""
+        ring = self.rings[tier]
+        count = int(self.header["count"][0][tier])
+        head = int(self.header["head"][0][tier])
+        if count < len(ring):
+            records = ring[:count]
+        else:
+            records = np.concatenate((ring[head:], ring[:head]))
+        pending = self.pending[tier]
+        if pending is not None:
+            bucket, low, high, total, n = pending
+            extra = np.array([(bucket, low, high, [v / n for v in total])], dtype=RECORD)
+            records = np.concatenate((records, extra))
+        return records
+
+    def tier_for_window(self, seconds):
+        """Finest tier that covers the window without exceeding MAX_TIER_POINTS"""
+        for tier, (resolution, capacity) in enumerate(TIERS):
+            if seconds / resolution <= min(capacity, MAX_TIER_POINTS):
+                return tier
+        return len(TIERS) - 1
+
+    def series(self, metric, seconds, now, field="mean"):
+        """Return (times, values) of one metric for the last `seconds`"""
+        records = self.records(self.tier_for_window(seconds))
+        records = records[records["time"] >= now - seconds]
+        column = METRICS.index(metric)
+        return records["time"], records[field][:, column]
+
+    def span(self, tier):
+        """(oldest, newest) record time of a tier, or None while it is empty"""
+        ring = self.rings[tier]
+        count = int(self.header["count"][0][tier])
+        if count == 0:
+            return None
+        head = int(self.header["head"][0][tier])
+        oldest = 0 if count < len(ring) else head
+        return float(ring[oldest]["time"]), float(ring[head - 1]["time"])
+
+    def between(self, start, end):
+        """(tier, records) from start to end, from the finest tier that still holds start.
+
+        One record on either side of the range is included so lines reach
+        the edges of a plot.
+        """
+        for tier in range(len(TIERS)):
+            span = self.span(tier)
+            if span is not None and span[0] <= start:
+                break
+        else:
+            # Nothing reaches back that far: the tier with the oldest data
+            spans = [self.span(tier) for tier in range(len(TIERS))]
+            tier = min(range(len(TIERS)), key=lambda t: spans[t][0] if spans[t] else math.inf)
+        records = self.records(tier)
+        first, last = np.searchsorted(records["time"], (start, end))
+        return tier, records[max(first - 1, 0):last + 1]
+
+    def flush(self):
+        if isinstance(self.buffer, np.memmap):
+            self.buffer.flush()
+
+    def close(self):
+        """Write pending buckets, flush and release the file lock"""
+        for tier in range(len(TIERS)):
+            if self.pending[tier] is not None:
+                self.flush_bucket(tier)
+        self.flush()
+        if self.lock_fd is not None:
+            os.close(self.lock_fd)
+            self.lock_fd = None
@@ -0,0 +1,285 @@
+"""Zoomable long-range history of temperature, fan speed and power.
+
+The viewer reads the rollup tiers of a HistoryStore: the finest tier that
+still holds the start of the visible range is fetched and every series is
+decimated to the plot's pixel width with Largest-Triangle-Three-Buckets
+before it reaches matplotlib, so a 24 h view costs about as much to draw as
+a 1 min one. The range buttons follow the newest data; the mouse wheel
+zooms around the cursor and dragging pans. A cursor line is shown at the
+same time in all three panels together with the values under it.
+"""
+import time
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.ticker import FuncFormatter
+
+from history import METRICS, TIERS
+
+# (label, seconds, follow refresh seconds) of the range buttons
+HISTORY_RANGES = (("1 min", 60, 1), ("10 min", 600, 5), ("1 h", 3600, 15), ("24 h", 86400, 60))
+
+# Narrowest and widest visible range when zooming, in seconds
+HISTORY_MIN_SPAN = 10
+HISTORY_MAX_SPAN = 7 * 86400
+
+# Visible range change per mouse wheel step
+HISTORY_ZOOM_STEP = 1.25
+
+# (metric, label, color, y_floor, y_headroom, unit) of each panel
+HISTORY_PANELS = (
+    ("temp", "Temperature (°C)", "#ff6b6b", 100, 10, "°C"),
+    ("rpm", "Fan Speed (RPM)", "#4ecdc4", 5000, 500, "RPM"),
+    ("power", "Power (W)", "#f7b731", 50, 5, "W"),
+)
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: `threshold` points of (x, y) that keep its shape.
+
+    The first and last points are kept; every bucket in between keeps the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)  # threshold - 2 buckets
+    counts = np.diff(edges)
+    next_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1])[1:] / counts[1:], x[-1])
+    next_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1])[1:] / counts[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    kept = 0
+    for bucket in range(threshold - 2):
+        low, high = edges[bucket], edges[bucket + 1]
+        kept_x, kept_y = x[kept], y[kept]
+        area = np.abs((kept_x - next_x[bucket]) * (y[low:high] - kept_y)
+                      - (kept_x - x[low:high]) * (next_y[bucket] - kept_y))
+        kept = low + int(area.argmax())
+        selected[bucket + 1] = kept
+    return x[selected], y[selected]
+
+
+def format_time(seconds, span):
+    """Tick label for a unix time, with seconds only on short ranges"""
+    if span <= 600:
+        pattern = "%H:%M:%S"
+    elif span <= 86400:
+        pattern = "%H:%M"
+    else:
+        pattern = "%a %H:%M"
+    return time.strftime(pattern, time.localtime(seconds))
+
+
+class HistoryView:
+    """Three time-linked history panels over a HistoryStore.
+
+    With parent=None the figure renders off-screen (for benchmarks); with a
+    Tk parent it gets range buttons, wheel zoom, drag panning and linked
+    cursors.
+    """
+
+    def __init__(self, parent, history):
+        self.history = history
+        self.parent = parent
+        self.end = time.time()
+        self.span = HISTORY_RANGES[0][1]
+        self.refresh_seconds = HISTORY_RANGES[0][2]
+        self.following = True  # the view ends at the newest data
+        self.series = {}  # metric -> decimated (x, y) on screen
+        self.points = (0, 0)  # records fetched, points drawn per panel
+        self.tier = 0
+        self.background = None
+        self.drag = None  # (pixel x, view end) where a pan started
+        self.redraw_job = None
+        self.follow_job = None
+
+        fig = Figure(figsize=(9, 6.5), dpi=80, facecolor='#212121')
+        self.figure = fig
+        self.axes = fig.subplots(len(HISTORY_PANELS), 1, sharex=True)
+        self.lines = []
+        self.cursors = []
+        self.readouts = []
+        for ax, (_, label, color, y_floor, _, _) in zip(self.axes, HISTORY_PANELS):
+            ax.set_facecolor('#1a1a1a')
+            ax.set_ylabel(label, color='white', fontsize=9)
+            ax.tick_params(colors='white', labelsize=8)
+            ax.grid(True, alpha=0.2, color='white')
+            for side in ('bottom', 'left'):
+                ax.spines[side].set_color('white')
+            for side in ('top', 'right'):
+                ax.spines[side].set_color('#1a1a1a')
+            ax.set_autoscale_on(False)
+            ax.set_ylim(0, y_floor)
+            self.lines.append(ax.plot([], [], color=color, linewidth=1.5)[0])
+            self.cursors.append(ax.axvline(0, color='white', linewidth=0.8, alpha=0.7,
+                                           visible=False, animated=True))
+            self.readouts.append(ax.text(0.01, 0.92, "", transform=ax.transAxes, color='white',
+                                         fontsize=9, va='top', animated=True))
+        self.axes[-1].xaxis.set_major_formatter(
+            FuncFormatter(lambda seconds, _: format_time(seconds, self.span)))
+        fig.tight_layout()
+
+        if parent is None:
+            self.canvas = FigureCanvasAgg(fig)
+            return
+
+        import customtkinter as ctk
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        controls = ctk.CTkFrame(parent, fg_color="transparent")
+        controls.pack(fill="x", padx=10, pady=(10, 0))
+        for label, seconds, refresh in HISTORY_RANGES:
+            ctk.CTkButton(controls, text=label, width=70,
+                          command=lambda s=seconds, r=refresh: self.set_range(s, r)).pack(side="left", padx=(0, 5))
+        self.status = ctk.CTkLabel(controls, text="", font=ctk.CTkFont(family="Courier New", size=11))
+        self.status.pack(side="right")
+
+        self.canvas = FigureCanvasTkAgg(fig, parent)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.canvas.mpl_connect('resize_event', lambda event: self.schedule_redraw())
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+        self.canvas.mpl_connect('button_press_event', self.on_press)
+        self.canvas.mpl_connect('button_release_event', self.on_release)
+        self.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        self.canvas.mpl_connect('axes_leave_event', self.hide_cursor)
+        self.canvas.get_tk_widget().bind("<Map>", self.on_map, add="+")
+        self.set_range(self.span, self.refresh_seconds)
+
+    def set_range(self, seconds, refresh_seconds):
+        """Show the last `seconds` and keep following new data"""
+        self.span = seconds
+        self.refresh_seconds = refresh_seconds
+        self.following = True
+        self.end = time.time()
+        self.redraw()
+        self.schedule_follow()
+
+    def schedule_follow(self):
+        if self.follow_job is not None:
+            self.canvas.get_tk_widget().after_cancel(self.follow_job)
+            self.follow_job = None
+        if self.following:
+            self.follow_job = self.canvas.get_tk_widget().after(
+                int(self.refresh_seconds * 1000), self.follow)
+
+    def follow(self):
+        self.follow_job = None
+        self.end = time.time()
+        if self.canvas.get_tk_widget().winfo_viewable():
+            self.redraw()  # hidden windows catch up on <Map> instead
+        self.schedule_follow()
+
+    def on_map(self, event):
+        if self.following:
+            self.end = time.time()
+            self.schedule_redraw()
+
+    def schedule_redraw(self):
+        """Coalesce bursts of wheel and drag events into one redraw"""
+        if self.redraw_job is None:
+            self.redraw_job = self.canvas.get_tk_widget().after_idle(self.redraw)
+
+    def redraw(self):
+        """Fetch, decimate to the pixel width and draw the visible range"""
+        self.redraw_job = None
+        start = self.end - self.span
+        width = max(int(self.axes[0].bbox.width), 3)
+        self.tier, records = self.history.between(start, self.end)
+        times = records["time"]
+        drawn = 0
+        for ax, line, (metric, _, _, y_floor, y_headroom, _) in zip(self.axes, self.lines, HISTORY_PANELS):
+            x, y = lttb(times, records["mean"][:, METRICS.index(metric)].astype(np.float64), width)
+            self.series[metric] = (x, y)
+            line.set_data(x, y)
+            peak = float(y.max()) if len(y) else 0
+            ax.set_ylim(0, max(y_floor, peak + y_headroom))
+            drawn = len(x)
+        self.axes[0].set_xlim(start, self.end)
+        self.points = (len(times), drawn)
+        if self.parent is not None:
+            resolution = TIERS[self.tier][0]
+            follow = "live" if self.following else "paused"
+            self.status.configure(text=f"{follow} · {resolution} s tier · "
+                                       f"{len(times)} → {drawn} points")
+        self.canvas.draw()
+
+    def on_draw(self, event):
+        """Cache the figure for blitting the cursor"""
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_cursor()
+
+    def draw_cursor(self):
+        for ax, cursor, readout in zip(self.axes, self.cursors, self.readouts):
+            ax.draw_artist(cursor)
+            ax.draw_artist(readout)
+
+    def blit_cursor(self):
+        if self.background is None:
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_cursor()
+        self.canvas.blit(self.figure.bbox)
+
+    def on_motion(self, event):
+        if self.drag is not None:
+            pixel_x, end = self.drag
+            seconds_per_pixel = self.span / max(self.axes[0].bbox.width, 1)
+            self.end = min(end - (event.x - pixel_x) * seconds_per_pixel, time.time())
+            self.schedule_redraw()
+            return
+        if event.inaxes not in self.axes or event.xdata is None:
+            return
+        stamp = format_time(event.xdata, 0)
+        for cursor, readout, (metric, _, _, _, _, unit) in zip(self.cursors, self.readouts, HISTORY_PANELS):
+            x, y = self.series.get(metric, ((), ()))
+            cursor.set_xdata([event.xdata, event.xdata])
+            cursor.set_visible(True)
+            if len(x):
+                value = np.interp(event.xdata, x, y)
+                readout.set_text(f"{stamp}  {value:.0f} {unit}" if unit == "RPM"
+                                 else f"{stamp}  {value:.1f} {unit}")
+        self.blit_cursor()
+
+    def hide_cursor(self, event=None):
+        for cursor, readout in zip(self.cursors, self.readouts):
+            cursor.set_visible(False)
+            readout.set_text("")
+        self.blit_cursor()
+
+    def on_scroll(self, event):
+        """Zoom around the time under the mouse"""
+        if event.xdata is None:
+            return
+        factor = 1 / HISTORY_ZOOM_STEP if event.button == "up" else HISTORY_ZOOM_STEP
+        span = min(max(self.span * factor, HISTORY_MIN_SPAN), HISTORY_MAX_SPAN)
+        fraction = (self.end - event.xdata) / self.span  # keep the cursor's time in place
+        self.end = min(event.xdata + fraction * span, time.time())
+        self.span = span
+        self.pause()
+        self.schedule_redraw()
+
+    def on_press(self, event):
+        if event.button == 1 and event.inaxes in self.axes:
+            self.drag = (event.x, self.end)
+            self.pause()
+
+    def on_release(self, event):
+        self.drag = None
+
+    def pause(self):
+        """Stop following new data after a manual zoom or pan"""
+        self.following = False
+        self.schedule_follow()
+
+    def close(self):
+        widget = self.canvas.get_tk_widget()
+        for job in (self.redraw_job, self.follow_job):
+            if job is not None:
+                widget.after_cancel(job)
+        self.redraw_job = self.follow_job = None
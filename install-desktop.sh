@@ -34,6 +34,23 @@ cp "$SCRIPT_DIR/pang11-fancontrol-gui" "$INSTALL_DIR/"
 cp "$SCRIPT_DIR/main.py" "$INSTALL_DIR/pang11-fancontrol-main.py"
 cp "$SCRIPT_DIR/fan.png" "$INSTALL_DIR/"
 
+# Supporting modules imported by main.py
+for module in sensors.py sampler.py graphs.py fancontrol_helper.py sysfs.py history.py daemon.py exporter.py controller.py backends.py profiler.py scheduler.py rolling.py profilebench.py fleet.py viewmodel.py actions.py rules.py burst.py historyview.py tray.py; do
+    cp "$SCRIPT_DIR/$module" "$INSTALL_DIR/"
+done
+
+# Install the privileged helper and its polkit action
+echo "Installing privileged helper..."
+cp "$SCRIPT_DIR/fancontrol_helper.py" "$INSTALL_DIR/pang11-fancontrol-helper"
+chmod +x "$INSTALL_DIR/pang11-fancontrol-helper"
+mkdir -p /usr/share/polkit-1/actions
+cp "$SCRIPT_DIR/com.pang11.fancontrol.policy" /usr/share/polkit-1/actions/
+
+# Install the sampler daemon unit (enable with: systemctl enable --now pang11-fancontrol-daemon)
+echo "Installing sampler daemon unit..."
+cp "$SCRIPT_DIR/pang11-fancontrol-daemon.service" /etc/systemd/system/
+systemctl daemon-reload 2>/dev/null || true
+
 # Copy icon
 echo "Installing icon..."
 cp "$SCRIPT_DIR/fan.png" "$ICON_DIR/pang11-fancontrol.png"
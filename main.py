@@ -1,73 +1,243 @@
+import time
+STARTED = time.perf_counter()  # startup timings are measured from here
+
+import argparse
+import json
 import subprocess
+import sys
+import threading
 import customtkinter as ctk
 from tkinter import messagebox
-import json
 import os
-import time
-from collections import deque
-import threading
 try:
     from PIL import Image, ImageTk, ImageDraw
 except ImportError:
     print("Please install Pillow: pip install Pillow")
     exit(1)
 import math
-import matplotlib
-matplotlib.use('TkAgg')
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.animation as animation
-from datetime import datetime
+import queue
+import shutil
+import numpy as np
+
+import daemon
+from actions import Action, ActionQueue
+from burst import DEFAULT_BURST_RATE, BurstCapture
+from backends import LiveSensorBackend, TraceRecorder, add_backend_arguments, simulated_backend_from_args
+from exporter import MetricsExporter
+from fancontrol_helper import HelperClient, HelperError
+from history import METRICS, HistoryStore, default_history_path
+from profiler import Profiler
+from rolling import EnergyMeter, RingBuffer, RollingStats, boot_time, integrate
+from rules import RULES_PATH, RuleEngine, load_rules
+from sampler import SensorCollector
+from sensors import RYZENADJ, ECReader, ryzenadj_profile_args
+from sysfs import CpuReader, SysfsReader
+from tray import TrayIndicator
+from viewmodel import ViewModel
 
 # Path to your fan image
 FAN_IMAGE = "fan.png"
 
+# Size of the fan shown in the status card, and where the resized image is cached
+FAN_SIZE = 80
+FAN_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                         "pang11-fancontrol", f"fan-{FAN_SIZE}.png")
+
 # How often to refresh values (ms)
-REFRESH_INTERVAL = 1000  # 1 second for data updates
+REFRESH_INTERVAL = 1000  # starting interval of each sensor source (see scheduler.py)
+SNAPSHOT_POLL_INTERVAL = 100  # 100ms to pick up new snapshots from the collector
+HIDDEN_POLL_INTERVAL = 1000  # poll interval while the window is hidden and nothing is drawn
 FAN_ANIMATION_INTERVAL = 50  # 50ms for smooth fan animation
+DEBUG_PANEL_INTERVAL = 1000  # 1 second between debug panel refreshes
+
+# Seconds covered by the "avg" statistics, and samples kept in memory for graphs and stats
+STATS_WINDOW = 300
+RECENT_SAMPLES = 2048
+
+# Histogram (bin width, upper bound) of each metric's rolling statistics
+METRIC_BINS = {"temp": (0.5, 120), "rpm": (25, 8000), "duty": (1, 100), "power": (0.1, 150)}
+
+# Privileged helper: "on" (authorized once via pkexec), "fake" (simulated
+# hardware, no root needed) or "off" (spawn sudo/pkexec for every call)
+HELPER_MODE = os.environ.get("PANG11_HELPER", "on")
+
+# Fan/temperature source: "clevo" (clevo-fancontrol binary) or "ec" (read the
+# EC registers in-process through ec_sys, needs `modprobe ec_sys`)
+SENSOR_BACKEND = os.environ.get("PANG11_SENSORS", "clevo")
+
+# Serve OpenMetrics on 127.0.0.1:<port> when set (e.g. PANG11_METRICS_PORT=9877)
+METRICS_PORT = os.environ.get("PANG11_METRICS_PORT")
+
+# Built-in fan controller: unset (observe only), "curve" or "pid"
+FAN_CONTROL = os.environ.get("PANG11_FAN_CONTROL")
+
+# The fan image has rotational symmetry, so one blade period of frames covers a full turn
+FAN_BLADES = 7  # matches create_simple_fan_image
+FAN_FRAMES_PER_BLADE = 24  # ~2.1 degree steps
+
+# Per-core heatmap: cores per row and cell size in pixels
+CPU_COLUMNS = 16
+CPU_CELL_SIZE = (44, 26)
+
+# Heatmap fill per 10% utilization step, idle to saturated, and for offline cores
+CPU_HEAT_COLORS = ("#263238", "#1e4d5c", "#1f6f6f", "#2e8b57", "#6b9e2e", "#a8a820",
+                   "#d9a521", "#f7b731", "#f08a3c", "#f46b50", "#ff6b6b")
+CPU_OFFLINE_COLOR = "#424242"
+
+# Snapshot field holding the status of each action group; its buttons are set from it
+ACTION_STATUS_FIELDS = {"clevo": "clevo_active", "cpufreq": "cpufreq_active", "profile": "ppt_limits"}
 
 # Set CustomTkinter appearance and color theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
 class FanMonitorApp:
-    def __init__(self, root):
+    def __init__(self, root, backend=None, record=None):
         self.root = root
+        self.backend = backend  # None samples the real machine (via the daemon if running)
+        self.record = record  # trace file every snapshot is appended to
         self.root.title("Pangolin 11 System Monitor")
+        # Temperature/RPM indicator while the window is hidden; nothing is drawn then
+        self.tray = TrayIndicator(self.root, "Pangolin 11 System Monitor")
+        self.hidden = False
         self.root.geometry("1200x800")
         self.root.minsize(1100, 700)
 
-        # Data storage for graphs (last 60 data points = 1 minute of history)
-        self.temp_history = deque(maxlen=60)
-        self.rpm_history = deque(maxlen=60)
-        self.power_history = deque(maxlen=60)
-        self.time_history = deque(maxlen=60)
-
-        # Initialize with some data
-        current_time = datetime.now()
-        for i in range(60):
-            self.temp_history.append(0)
-            self.rpm_history.append(0)
-            self.power_history.append(0)
-            self.time_history.append((current_time.timestamp() - (60 - i)))
+        # Stage latencies and tick skew of the monitor itself (F12 shows them)
+        self.profiler = Profiler()
+
+        # Last rendered label/button state; widgets are only configured on change
+        self.view = ViewModel()
+        self.debug_window = None
+        self.debug_job = None
+        self.history_window = None
+        self.history_view = None
+        self.next_poll = None
+        self.next_fan_frame = None
+        self.snapshot = None  # latest applied snapshot
+        self.burst = None  # BurstCapture overlaid on the power graph, running or finished
+        self.burst_recording = False  # until the stop of self.burst has been reported
+        self.daemon_connected = True  # as last shown; data is stale while False
+
+        # Sample history, persisted across restarts
+        self.history = self.open_history()
+
+        # Recent samples (time + METRICS columns) for the graphs, rolling
+        # statistics for the status card and the energy total since boot
+        self.recent = RingBuffer(RECENT_SAMPLES, 1 + len(METRICS))
+        self.stats = {metric: self.rolling_stats(metric, STATS_WINDOW) for metric in ("temp", "power")}
+        self.graph_peaks = {}
+        self.energy = EnergyMeter(self.energy_since_boot())
+        self.seed_recent()
+
+        # Startup milestones in seconds since STARTED (see --startup-time)
+        self.startup = {}
+        self.on_startup_complete = None
 
         # Load or create fan image
         if not os.path.exists(FAN_IMAGE):
             self.create_simple_fan_image()
-        self.original_fan = Image.open(FAN_IMAGE)
-        # Make fan smaller (80x80)
-        try:
-            self.original_fan = self.original_fan.resize((80, 80), Image.Resampling.LANCZOS)
-        except AttributeError:
-            self.original_fan = self.original_fan.resize((80, 80), Image.LANCZOS)
+        self.original_fan = self.load_fan_image()
         self.fan_angle = 0
         self.last_fan_update = time.time()
         self.current_rpm = 0
+        self.fan_animation_job = None
+        self.fan_frames = self.create_fan_frames()
+        self.fan_frame_index = 0
+
+        # Battery and hwmon sensors are discovered once and read in batches
+        self.sysfs = SysfsReader() if backend is None else None
+
+        # Graph panels are built after the first data is on screen
+        self.graphs = []
 
         self.create_ui()
         self.start_updates()
+        self.mark_startup("window")
+        self.root.after_idle(self.load_graphs)
+
+    def mark_startup(self, milestone):
+        """Record the first time a startup milestone is reached"""
+        if milestone in self.startup:
+            return
+        self.startup[milestone] = time.perf_counter() - STARTED
+        if self.on_startup_complete is not None and {"first data", "graphs"} <= set(self.startup):
+            self.on_startup_complete(self.startup)
+
+    def load_fan_image(self):
+        """The fan image at FAN_SIZE, resized once and cached on disk"""
+        try:
+            if os.path.getmtime(FAN_CACHE) >= os.path.getmtime(FAN_IMAGE):
+                return Image.open(FAN_CACHE)
+        except OSError:
+            pass
+
+        fan = Image.open(FAN_IMAGE)
+        try:
+            fan = fan.resize((FAN_SIZE, FAN_SIZE), Image.Resampling.LANCZOS)
+        except AttributeError:
+            fan = fan.resize((FAN_SIZE, FAN_SIZE), Image.LANCZOS)
+        try:
+            os.makedirs(os.path.dirname(FAN_CACHE), exist_ok=True)
+            fan.save(FAN_CACHE)
+        except OSError:
+            pass
+        return fan
+
+    def rolling_stats(self, metric, window):
+        bin_width, high = METRIC_BINS[metric]
+        return RollingStats(window, bin_width=bin_width, high=high)
+
+    def seed_recent(self):
+        """Fill the recent buffer and statistics from the stored history"""
+        records = self.history.records(0)
+        records = records[records["time"] >= time.time() - STATS_WINDOW]
+        for timestamp, values in zip(records["time"], records["mean"]):
+            self.add_recent(float(timestamp), [float(v) for v in values])
+
+    def add_recent(self, timestamp, values):
+        """Record one sample (values in METRICS order) in the buffer and statistics"""
+        self.recent.append([timestamp] + values)
+        for metric, stats in self.stats.items():
+            stats.add(timestamp, values[METRICS.index(metric)])
+        for metric, stats in self.graph_peaks.items():
+            stats.add(timestamp, values[METRICS.index(metric)])
+
+    def energy_since_boot(self):
+        """Watt-hours integrated from the stored history since the system booted"""
+        booted = boot_time()
+        if booted is None:
+            return 0.0
+        now = time.time()
+        times, power = self.history.series("power", now - booted, now)
+        return integrate(times, power.astype(float)) / 3600
+
+    def open_history(self):
+        """Open the on-disk history store, or keep history in memory if that fails"""
+        if self.backend is not None and not self.backend.live:
+            return HistoryStore()  # simulated data stays out of the machine's history
+        try:
+            return HistoryStore(default_history_path())
+        except OSError as e:
+            print(f"Cannot open history store ({e}), keeping history in memory")
+            return HistoryStore()
+
+    def create_fan_frames(self):
+        """Pre-render one blade period of rotated fan frames"""
+        period = 360 / FAN_BLADES
+        try:
+            resample = Image.Resampling.BICUBIC
+        except AttributeError:
+            resample = Image.BICUBIC
+
+        frames = []
+        for i in range(FAN_FRAMES_PER_BLADE):
+            angle = period * i / FAN_FRAMES_PER_BLADE
+            rotated = self.original_fan.rotate(-angle, resample=resample)
+            frames.append(ImageTk.PhotoImage(rotated))
+        return frames
 
-    def create_simple_fan_image(self, size=100, num_blades=7):
+    def create_simple_fan_image(self, size=100, num_blades=FAN_BLADES):
         """Create a simple fan image with gradient effects"""
         img = Image.new('RGBA', (size, size), (255, 255, 255, 0))
         draw = ImageDraw.Draw(img)
@@ -124,6 +294,14 @@ class FanMonitorApp:
                                   font=ctk.CTkFont(family="Courier New", size=20, weight="bold"))
         title_label.pack(pady=15)
 
+        # Progress and outcome of the last service/profile action
+        self.action_label = ctk.CTkLabel(title_frame, text="",
+                                         font=ctk.CTkFont(family="Courier New", size=12))
+        self.action_label.place(relx=1.0, rely=0.5, anchor="e", x=-15)
+
+        ctk.CTkButton(title_frame, text="📈 History", width=100,
+                      command=self.toggle_history_viewer).place(relx=0.0, rely=0.5, anchor="w", x=15)
+
         # Create two-column layout
         columns_frame = ctk.CTkFrame(main_container, fg_color="transparent")
         columns_frame.pack(fill="both", expand=True)
@@ -140,7 +318,7 @@ class FanMonitorApp:
         # === LEFT COLUMN CONTENT ===
 
         # System Status Card
-        status_card = self.create_card(left_column, "💻 System Status", height=220)
+        status_card = self.create_card(left_column, "💻 System Status", height=250)
 
         # Fan animation with smaller size
         fan_frame = ctk.CTkFrame(status_card, fg_color="transparent", height=80)
@@ -149,6 +327,7 @@ class FanMonitorApp:
         self.fan_canvas = ctk.CTkCanvas(fan_frame, width=80, height=80,
                                        bg="#212121", highlightthickness=0)
         self.fan_canvas.pack()
+        self.fan_item = self.fan_canvas.create_image(40, 40, image=self.fan_frames[0])
 
         # Live metrics with modern styling
         metrics_frame = ctk.CTkFrame(status_card, fg_color="transparent")
@@ -170,6 +349,16 @@ class FanMonitorApp:
                                         font=ctk.CTkFont(family="Courier New", size=12))
         self.battery_label.pack(pady=1)
 
+        self.stats_label = ctk.CTkLabel(metrics_frame, text="AVG 5M: --°C --.- W\nPEAK: --.- W  ENERGY: -.-- Wh",
+                                        font=ctk.CTkFont(family="Courier New", size=11))
+        self.stats_label.pack(pady=1)
+
+        self.controller_label = None
+        if FAN_CONTROL:
+            self.controller_label = ctk.CTkLabel(metrics_frame, text=f"{FAN_CONTROL.upper()}: --",
+                                                 font=ctk.CTkFont(family="Courier New", size=12))
+            self.controller_label.pack(pady=1)
+
         # Services Control Card
         services_card = self.create_card(left_column, "⚙️ Services Control", height=260)
 
@@ -244,19 +433,50 @@ class FanMonitorApp:
                                      fg_color="#2d5a2d", hover_color="#3d7a3d")
         self.perf_btn.pack(side="left", padx=5)
 
-        # === RIGHT COLUMN CONTENT (GRAPHS) ===
-
-        # Temperature Graph
-        temp_graph_card = self.create_card(right_column, "🌡️ Temperature History", height=240)
-        self.create_temp_graph(temp_graph_card)
-
-        # Fan Speed Graph
-        fan_graph_card = self.create_card(right_column, "💨 Fan Speed History", height=240)
-        self.create_fan_graph(fan_graph_card)
-
-        # Power Consumption Graph
-        power_graph_card = self.create_card(right_column, "⚡ Power Consumption", height=240)
-        self.create_power_graph(power_graph_card)
+        # Buttons disabled while an action of their group is queued or running
+        self.action_buttons = {
+            "clevo": (self.clevo_start, self.clevo_stop),
+            "cpufreq": (self.cpufreq_start, self.cpufreq_stop),
+            "profile": (self.battery_btn, self.quiet_btn, self.perf_btn),
+        }
+        self.action_pressed = {}  # group -> (pressed button, its original text)
+        self.deferred_profile = None  # (rule, profile) to switch to once the profile action finishes
+
+        # Extra hwmon sensors discovered at startup
+        self.hwmon_labels = {}
+        sensor_names = self.backend.sensor_names() if self.backend else self.sysfs.sensor_names()
+        if sensor_names:
+            sensors_card = self.create_card(left_column, "📡 Sensors")
+            for name in sensor_names:
+                label = ctk.CTkLabel(sensors_card, text=f"{name}: --°C",
+                                     font=ctk.CTkFont(family="Courier New", size=12))
+                label.pack(pady=0)
+                self.hwmon_labels[name] = label
+
+        # === RIGHT COLUMN CONTENT (CORES AND GRAPHS) ===
+
+        # Per-core heatmap; the cells are created from the first snapshot with CPU data
+        rows = -(-(os.cpu_count() or 1) // CPU_COLUMNS)
+        cpu_card = self.create_card(right_column, "🧮 CPU Cores", height=90 + rows * CPU_CELL_SIZE[1])
+        self.cpu_summary = ctk.CTkLabel(cpu_card, text="Waiting for data…",
+                                        font=ctk.CTkFont(family="Courier New", size=12))
+        self.cpu_summary.pack()
+        self.cpu_canvas = ctk.CTkCanvas(cpu_card, width=CPU_COLUMNS * CPU_CELL_SIZE[0],
+                                        height=rows * CPU_CELL_SIZE[1], bg="#2b2b2b",
+                                        highlightthickness=0)
+        self.cpu_canvas.pack(pady=5)
+        self.cpu_cells = []  # [rectangle, text, fill, label] per core
+
+        # Graph cards start with a placeholder; load_graphs fills them in
+        self.graph_cards = []
+        for title, create in (("🌡️ Temperature History", self.create_temp_graph),
+                              ("💨 Fan Speed History", self.create_fan_graph),
+                              ("⚡ Power Consumption", self.create_power_graph)):
+            card = self.create_card(right_column, title, height=200)
+            placeholder = ctk.CTkLabel(card, text="Loading graph…",
+                                       font=ctk.CTkFont(family="Courier New", size=12))
+            placeholder.pack(expand=True)
+            self.graph_cards.append((card, placeholder, create))
 
     def create_card(self, parent, title, height=None):
         """Create a modern card widget"""
@@ -275,355 +495,751 @@ class FanMonitorApp:
 
         return card
 
+    def load_graphs(self):
+        """Import matplotlib off the Tk thread, then build the graphs one per callback"""
+        loader = threading.Thread(target=lambda: __import__("graphs"), name="graph-import",
+                                  daemon=True)
+        loader.start()
+        self.wait_for_graphs(loader)
+
+    def wait_for_graphs(self, loader):
+        if loader.is_alive():
+            self.root.after(20, self.wait_for_graphs, loader)
+            return
+        self.build_next_graph()
+
+    def build_next_graph(self):
+        """Replace the next placeholder with its graph"""
+        if not self.graph_cards:
+            self.update_graphs()
+            self.mark_startup("graphs")
+            return
+        card, placeholder, create = self.graph_cards.pop(0)
+        placeholder.destroy()
+        graph, metric = create(card)
+        self.graphs.append((graph, metric))
+
+        # Rolling maximum for the graph's y-limit, seeded from the recent buffer
+        peaks = self.rolling_stats(metric, graph.window)
+        view = self.recent.view()
+        peaks.extend(view[:, 0], view[:, 1 + METRICS.index(metric)])
+        self.graph_peaks[metric] = peaks
+        self.root.after(1, self.build_next_graph)
+
     def create_temp_graph(self, parent):
         """Create temperature graph"""
-        fig = Figure(figsize=(6, 2), dpi=80, facecolor='#212121')
-        self.temp_ax = fig.add_subplot(111)
-        self.temp_ax.set_facecolor('#1a1a1a')
-        self.temp_ax.set_ylabel('Temperature (°C)', color='white', fontsize=9)
-        self.temp_ax.tick_params(colors='white', labelsize=8)
-        self.temp_ax.grid(True, alpha=0.2, color='white')
-        self.temp_ax.spines['bottom'].set_color('white')
-        self.temp_ax.spines['top'].set_color('#1a1a1a')
-        self.temp_ax.spines['left'].set_color('white')
-        self.temp_ax.spines['right'].set_color('#1a1a1a')
-
-        fig.tight_layout()
-
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=(0, 10))
-        self.temp_canvas = canvas
+        from graphs import LiveGraph
+        self.temp_graph = LiveGraph(parent, 'Temperature (°C)', '#ff6b6b',
+                                    y_floor=100, y_headroom=10)
+        return self.temp_graph, "temp"
 
     def create_fan_graph(self, parent):
         """Create fan speed graph"""
-        fig = Figure(figsize=(6, 2), dpi=80, facecolor='#212121')
-        self.fan_ax = fig.add_subplot(111)
-        self.fan_ax.set_facecolor('#1a1a1a')
-        self.fan_ax.set_ylabel('Fan Speed (RPM)', color='white', fontsize=9)
-        self.fan_ax.tick_params(colors='white', labelsize=8)
-        self.fan_ax.grid(True, alpha=0.2, color='white')
-        self.fan_ax.spines['bottom'].set_color('white')
-        self.fan_ax.spines['top'].set_color('#1a1a1a')
-        self.fan_ax.spines['left'].set_color('white')
-        self.fan_ax.spines['right'].set_color('#1a1a1a')
-
-        fig.tight_layout()
-
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=(0, 10))
-        self.fan_speed_canvas = canvas
+        from graphs import LiveGraph
+        self.fan_graph = LiveGraph(parent, 'Fan Speed (RPM)', '#4ecdc4',
+                                   y_floor=5000, y_headroom=500)
+        return self.fan_graph, "rpm"
 
     def create_power_graph(self, parent):
         """Create power consumption graph"""
-        fig = Figure(figsize=(6, 2), dpi=80, facecolor='#212121')
-        self.power_ax = fig.add_subplot(111)
-        self.power_ax.set_facecolor('#1a1a1a')
-        self.power_ax.set_ylabel('Power (W)', color='white', fontsize=9)
-        self.power_ax.set_xlabel('Time (seconds ago)', color='white', fontsize=9)
-        self.power_ax.tick_params(colors='white', labelsize=8)
-        self.power_ax.grid(True, alpha=0.2, color='white')
-        self.power_ax.spines['bottom'].set_color('white')
-        self.power_ax.spines['top'].set_color('#1a1a1a')
-        self.power_ax.spines['left'].set_color('white')
-        self.power_ax.spines['right'].set_color('#1a1a1a')
-
-        fig.tight_layout()
-
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=(0, 10))
-        self.power_canvas = canvas
-
-    def update_graphs(self):
-        """Update all graphs with latest data"""
-        x_values = list(range(60, 0, -1))  # 60 to 1 seconds ago
-
-        # Update temperature graph
-        self.temp_ax.clear()
-        self.temp_ax.plot(x_values, list(self.temp_history), color='#ff6b6b', linewidth=2)
-        self.temp_ax.fill_between(x_values, list(self.temp_history), alpha=0.3, color='#ff6b6b')
-        self.temp_ax.set_ylabel('Temperature (°C)', color='white', fontsize=9)
-        self.temp_ax.set_ylim(0, max(100, max(self.temp_history) + 10) if self.temp_history else 100)
-        self.temp_ax.grid(True, alpha=0.2, color='white')
-        self.temp_ax.set_facecolor('#1a1a1a')
-        self.temp_ax.tick_params(colors='white', labelsize=8)
-        self.temp_canvas.draw()
-
-        # Update fan speed graph
-        self.fan_ax.clear()
-        self.fan_ax.plot(x_values, list(self.rpm_history), color='#4ecdc4', linewidth=2)
-        self.fan_ax.fill_between(x_values, list(self.rpm_history), alpha=0.3, color='#4ecdc4')
-        self.fan_ax.set_ylabel('Fan Speed (RPM)', color='white', fontsize=9)
-        self.fan_ax.set_ylim(0, max(5000, max(self.rpm_history) + 500) if self.rpm_history else 5000)
-        self.fan_ax.grid(True, alpha=0.2, color='white')
-        self.fan_ax.set_facecolor('#1a1a1a')
-        self.fan_ax.tick_params(colors='white', labelsize=8)
-        self.fan_speed_canvas.draw()
-
-        # Update power graph
-        self.power_ax.clear()
-        self.power_ax.plot(x_values, list(self.power_history), color='#f7b731', linewidth=2)
-        self.power_ax.fill_between(x_values, list(self.power_history), alpha=0.3, color='#f7b731')
-        self.power_ax.set_ylabel('Power (W)', color='white', fontsize=9)
-        self.power_ax.set_xlabel('Time (seconds ago)', color='white', fontsize=9)
-        self.power_ax.set_ylim(0, max(50, max(self.power_history) + 5) if self.power_history else 50)
-        self.power_ax.grid(True, alpha=0.2, color='white')
-        self.power_ax.set_facecolor('#1a1a1a')
-        self.power_ax.tick_params(colors='white', labelsize=8)
-        self.power_canvas.draw()
-
-    def get_sensor_values(self):
-        """Get sensor values from clevo-fancontrol"""
+        from graphs import LiveGraph
+        self.power_graph = LiveGraph(parent, 'Power (W)', '#f7b731',
+                                     y_floor=50, y_headroom=5,
+                                     xlabel='Time (seconds ago)')
+        self.burst_button = ctk.CTkButton(parent, text="⏺ Burst", width=80, height=24,
+                                          command=self.toggle_burst,
+                                          fg_color="#5a4a2d", hover_color="#6a5a3d")
+        self.burst_button.place(relx=1.0, y=15, anchor="ne", x=-15)
+        return self.power_graph, "power"
+
+    def toggle_burst(self):
+        """Start or stop a high-rate power capture overlaid on the power graph"""
+        if self.burst_recording:
+            self.burst.stop()
+            self.finish_burst()
+            return
         try:
-            output = subprocess.check_output(
-                ["sudo", "/usr/local/bin/clevo-fancontrol"],
-                text=True,
-                stderr=subprocess.DEVNULL
-            ).strip()
-
-            lines = output.split('\n')
-            cleaned_lines = [line for line in lines if 'wait_ec error' not in line]
-            cleaned_output = '\n'.join(cleaned_lines)
-
-            try:
-                data = json.loads(cleaned_output)
-            except json.JSONDecodeError:
-                import re
-                duty_match = re.search(r'"duty":\s*(\d+)', output)
-                rpms_match = re.search(r'"rpms":\s*(\d+)', output)
-                temp_match = re.search(r'"cpu_temp_cels":\s*(\d+)', output)
+            self.burst = BurstCapture(rate=DEFAULT_BURST_RATE)
+        except OSError as e:
+            messagebox.showerror("Error", f"Burst capture failed: {e}")
+            return
+        self.burst.start()
+        self.burst_recording = True
+        self.view.set(self.burst_button, text="⏹ Stop", fg_color="#5a2d2d", hover_color="#7a3d3d")
+        self.view.set(self.action_label, text=f"⏺ Capturing at {self.burst.rate} Hz…",
+                      text_color="#f7b731")
+        self.view.flush()
+
+    def finish_burst(self):
+        """Report a stopped capture; its trace stays on the graph until it scrolls out"""
+        self.burst_recording = False
+        self.view.set(self.burst_button, text="⏺ Burst", fg_color="#5a4a2d", hover_color="#6a5a3d")
+        if self.burst.error:
+            self.view.set(self.action_label, text=f"❌ Burst capture failed: {self.burst.error}",
+                          text_color="#ff6b6b")
+        else:
+            name = os.path.basename(self.burst.path)
+            self.view.set(self.action_label, text=f"✅ {self.burst.count} samples → {name}",
+                          text_color="#74c0fc")
+        self.view.flush()
+
+    def update_graphs(self, metrics=METRICS):
+        """Update the graphs of these metrics that have been built with latest data"""
+        now = time.time()
+        view = self.recent.view()
+        times = view[:, 0]
+        for graph, metric in self.graphs:
+            if metric not in metrics:
+                continue
+            # Zero-copy slice of the samples inside the graph window
+            start = np.searchsorted(times, now - graph.window)
+            values = view[start:, 1 + METRICS.index(metric)]
+            overlay = None
+            if metric == "power" and self.burst is not None:
+                overlay = self.burst.overlay(now, graph.window)
+            graph.update(now - times[start:], values, peak=self.graph_peaks[metric].max(),
+                         overlay=overlay)
 
-                duty = int(duty_match.group(1)) if duty_match else 0
-                rpms = int(rpms_match.group(1)) if rpms_match else 0
-                temp = int(temp_match.group(1)) if temp_match else 0
+    def update_data(self):
+        """Apply the newest snapshot from the collector to labels and graphs"""
+        if self.next_poll is not None:
+            self.profiler.tick("update_data", self.next_poll)
+        self.finish_actions()
+        self.handle_rule_events()
+        if isinstance(self.collector, daemon.DaemonClient):
+            self.show_daemon_connection()
+        snapshot = self.collector.latest()
+        if snapshot is not None:
+            with self.profiler.stage("tick"):
+                self.apply_snapshot(snapshot)
+        elif self.burst_recording and self.graphs and not self.hidden:
+            # Keep the burst trace moving between snapshots; only the power graph has it
+            with self.profiler.stage("graphs"):
+                self.update_graphs(("power",))
+        if self.burst_recording and not self.burst.is_alive():
+            self.finish_burst()  # the capture thread failed
+
+        if self.hidden:
+            self.handle_tray_requests()
+
+        # Schedule next poll
+        interval = HIDDEN_POLL_INTERVAL if self.hidden else SNAPSHOT_POLL_INTERVAL
+        self.next_poll = time.perf_counter() + interval / 1000
+        self.root.after(interval, self.update_data)
+
+    def show_daemon_connection(self):
+        """Mark the data stale while the daemon connection is down; the client reconnects"""
+        connected = self.collector.connected
+        if connected == self.daemon_connected:
+            return
+        self.daemon_connected = connected
+        if connected:
+            self.view.set(self.action_label, text="✅ Reconnected to the daemon", text_color="#74c0fc")
+        else:
+            self.view.set(self.action_label, text="⚠️ Daemon disconnected, data is stale; reconnecting…",
+                          text_color="#ff6b6b")
+        self.view.flush()
 
-                return temp, rpms, duty
+    def apply_snapshot(self, snapshot):
+        """Update history, labels, graphs and services from one snapshot"""
+        self.mark_startup("first data")
+        self.snapshot = snapshot
 
-            return data.get("cpu_temp_cels", 0), data.get("rpms", 0), data.get("duty", 0)
-        except:
-            return 0, 0, 0
+        # Store current rpm for fan animation
+        self.current_rpm = snapshot["rpm"]
 
-    def get_battery_power(self):
-        """Get battery power consumption"""
-        try:
-            with open('/sys/class/power_supply/BAT0/status', 'r') as f:
-                status = f.read().strip()
+        if self.exporter is not None:
+            with self.profiler.stage("exporter"):
+                self.exporter.update(snapshot)
 
-            try:
-                with open('/sys/class/power_supply/BAT0/current_now', 'r') as f:
-                    current_ua = int(f.read().strip())
-            except:
-                current_ua = 0
+        # Update history
+        with self.profiler.stage("history"):
+            values = [float(snapshot[metric]) for metric in METRICS]
+            self.history.append(snapshot["time"], values)
+            self.add_recent(snapshot["time"], values)
+            self.energy.add(snapshot["time"], snapshot["power"])
+
+        # While hidden only the buffers above are kept current; render() catches up on <Map>
+        if self.hidden:
+            self.tray.show(snapshot)
+            return
+        self.start_fan_animation()
+        self.render(snapshot)
+
+    def render(self, snapshot):
+        """Draw labels, graphs, services and CPU cores for a snapshot"""
+        with self.profiler.stage("labels"):
+            self.update_labels(snapshot)
 
-            try:
-                with open('/sys/class/power_supply/BAT0/voltage_now', 'r') as f:
-                    voltage_uv = int(f.read().strip())
-            except:
-                voltage_uv = 0
+        # Update graphs
+        with self.profiler.stage("graphs"):
+            self.update_graphs()
 
-            power_w = (current_ua / 1000000.0) * (voltage_uv / 1000000.0)
-            return power_w, status
-        except:
-            return 0, "Unknown"
+        # Update service statuses
+        with self.profiler.stage("services"):
+            self.update_service_statuses(snapshot)
 
-    def update_data(self):
-        """Update sensor data and graphs"""
-        temp, rpm, duty = self.get_sensor_values()
-        power_w, battery_status = self.get_battery_power()
+        with self.profiler.stage("cpus"):
+            self.update_cpu_panel(snapshot)
 
-        # Store current rpm for fan animation
-        self.current_rpm = rpm
+        # Apply the label and button changes of this tick in one batch
+        with self.profiler.stage("widgets"):
+            self.view.flush()
 
-        # Update history
-        self.temp_history.append(temp)
-        self.rpm_history.append(rpm)
-        self.power_history.append(power_w)
-        self.time_history.append(datetime.now().timestamp())
+    def update_labels(self, snapshot):
+        """Update the live metric labels with colors based on values"""
+        temp = snapshot["temp"]
+        rpm = snapshot["rpm"]
+        duty = snapshot["duty"]
+        power_w = snapshot["power"]
+        battery_status = snapshot["battery_status"]
 
-        # Update labels with colors based on values
         temp_color = "#ff6b6b" if temp > 80 else "#f7b731" if temp > 60 else "#74c0fc"
-        self.temp_label.configure(text=f"CPU: {temp}°C", text_color=temp_color)
+        self.view.set(self.temp_label, text=f"CPU: {temp}°C", text_color=temp_color)
 
         rpm_color = "#ff6b6b" if rpm > 4000 else "#f7b731" if rpm > 2000 else "#a78bfa"
-        self.rpm_label.configure(text=f"FAN: {rpm} RPM ({duty}%)", text_color=rpm_color)
+        self.view.set(self.rpm_label, text=f"FAN: {rpm} RPM ({duty}%)", text_color=rpm_color)
 
         power_color = "#ff6b6b" if power_w > 30 else "#f7b731" if power_w > 20 else "#22d3ee"
-        self.power_label.configure(text=f"POWER: {power_w:.2f} W", text_color=power_color)
+        self.view.set(self.power_label, text=f"POWER: {power_w:.2f} W", text_color=power_color)
 
         status_icons = {"Discharging": "🔋", "Charging": "⚡", "Full": "✅"}
         icon = status_icons.get(battery_status, "❓")
-        self.battery_label.configure(text=f"STATUS: {icon} {battery_status}")
-
-        # Update graphs
-        self.update_graphs()
-
-        # Update service statuses
-        self.update_service_statuses()
+        self.view.set(self.battery_label, text=f"STATUS: {icon} {battery_status}")
+
+        temp_stats = self.stats["temp"]
+        power_stats = self.stats["power"]
+        if len(power_stats):
+            self.view.set(self.stats_label,
+                          text=f"AVG 5M: {temp_stats.mean():.0f}°C {power_stats.mean():.1f} W\n"
+                               f"PEAK: {power_stats.peak:.1f} W  ENERGY: {self.energy.wh:.2f} Wh")
+
+        if self.controller_label is not None and self.controller is not None:
+            stats = self.controller.stats()
+            latency = f" · {stats['last_ms']:.0f} ms" if stats["count"] else ""
+            self.view.set(self.controller_label,
+                          text=f"{FAN_CONTROL.upper()}: {stats['duty']}%{latency}")
+
+        for name, value in snapshot["hwmon"].items():
+            label = self.hwmon_labels.get(name)
+            if label is not None:
+                text = f"{name}: {value:.0f}°C" if value is not None else f"{name}: --°C"
+                self.view.set(label, text=text)
+
+    def create_cpu_cells(self, count):
+        """One heatmap cell (rectangle and frequency text) per core"""
+        width, height = CPU_CELL_SIZE
+        rows = -(-count // CPU_COLUMNS)
+        self.cpu_canvas.delete("all")
+        self.cpu_canvas.configure(height=rows * height)
+        self.cpu_cells = []
+        for core in range(count):
+            x = (core % CPU_COLUMNS) * width
+            y = (core // CPU_COLUMNS) * height
+            rectangle = self.cpu_canvas.create_rectangle(x + 1, y + 1, x + width - 1, y + height - 1,
+                                                         fill=CPU_OFFLINE_COLOR, width=0)
+            text = self.cpu_canvas.create_text(x + width / 2, y + height / 2, text="",
+                                               fill="#e0e0e0", font=("Courier New", 9))
+            self.cpu_cells.append([rectangle, text, CPU_OFFLINE_COLOR, ""])
+
+    def update_cpu_panel(self, snapshot):
+        """Color each core by utilization and label it with its frequency in GHz"""
+        cpus = snapshot.get("cpus")
+        if not cpus:
+            return
+        util, mhz, governors = cpus["util"], cpus["mhz"], cpus["governor"]
+        if len(self.cpu_cells) != len(util):
+            self.create_cpu_cells(len(util))
+
+        # Only touch the canvas items whose color bucket or text changed
+        for cell, value, freq in zip(self.cpu_cells, util, mhz):
+            if value is None:
+                fill, label = CPU_OFFLINE_COLOR, "off"
+            else:
+                fill = CPU_HEAT_COLORS[min(len(CPU_HEAT_COLORS) - 1, int(value // 10))]
+                label = f"{freq / 1000:.1f}" if freq else f"{value:.0f}%"
+            if fill != cell[2]:
+                self.cpu_canvas.itemconfigure(cell[0], fill=fill)
+                cell[2] = fill
+            if label != cell[3]:
+                self.cpu_canvas.itemconfigure(cell[1], text=label)
+                cell[3] = label
+
+        online = [value for value in util if value is not None]
+        freqs = [freq for freq in mhz if freq]
+        summary = f"{len(util)} cores · avg {sum(online) / len(online) if online else 0:.0f}%"
+        if freqs:
+            summary += f" · {min(freqs) / 1000:.1f}–{max(freqs) / 1000:.1f} GHz"
+        summary += f" · {'/'.join(sorted({g for g in governors if g})) or 'no cpufreq'}"
+        self.view.set(self.cpu_summary, text=summary)
+
+    def fan_rotation_speed(self):
+        """Fan rotation speed in degrees per second for the current RPM"""
+        if self.current_rpm == 0:
+            return 0
+        elif self.current_rpm < 2000:
+            return 180
+        else:
+            return 360 + (self.current_rpm / 5000) * 360  # Faster for higher RPM
+
+    def start_fan_animation(self, event=None):
+        """(Re)start the fan animation timer if the fan should be spinning"""
+        if event is not None and event.widget is not self.root:
+            return
+        if self.fan_animation_job is not None or self.fan_rotation_speed() == 0:
+            return
+        self.last_fan_update = time.time()
+        self.next_fan_frame = None
+        self.animate_fan()
 
-        # Schedule next update
-        self.root.after(REFRESH_INTERVAL, self.update_data)
+    def stop_fan_animation(self, event=None):
+        """Cancel the fan animation timer"""
+        if event is not None and event.widget is not self.root:
+            return
+        if self.fan_animation_job is not None:
+            self.root.after_cancel(self.fan_animation_job)
+            self.fan_animation_job = None
 
     def animate_fan(self):
         """Animate the fan based on RPM"""
+        self.fan_animation_job = None
+        if self.next_fan_frame is not None:
+            self.profiler.tick("animate_fan", self.next_fan_frame)
+        with self.profiler.stage("animate_fan"):
+            self.draw_fan_frame()
+
+    def draw_fan_frame(self):
+        """Advance the fan sprite and schedule the next frame while it spins"""
+        # Stop entirely while the fan is idle or the window is hidden;
+        # start_fan_animation picks it up again on the next RPM or <Map>
+        rotation_speed = self.fan_rotation_speed()
+        if rotation_speed == 0 or not self.fan_canvas.winfo_viewable():
+            return
+
         current_time = time.time()
         time_delta = current_time - self.last_fan_update
         self.last_fan_update = current_time
 
-        # Calculate rotation speed based on RPM
-        if self.current_rpm == 0:
-            rotation_speed = 0
-        elif self.current_rpm < 2000:
-            rotation_speed = 180  # degrees per second
-        else:
-            rotation_speed = 360 + (self.current_rpm / 5000) * 360  # Faster for higher RPM
-
         self.fan_angle = (self.fan_angle + rotation_speed * time_delta) % 360
 
-        # Clear and redraw
-        self.fan_canvas.delete("all")
-
-        # Rotate fan image
-        try:
-            rotated = self.original_fan.rotate(-self.fan_angle, resample=Image.Resampling.BICUBIC)
-        except AttributeError:
-            rotated = self.original_fan.rotate(-self.fan_angle, resample=Image.BICUBIC)
-        self.fan_image = ImageTk.PhotoImage(rotated)
-        self.fan_canvas.create_image(40, 40, image=self.fan_image)
+        # Swap to the cached frame for this angle
+        period = 360 / FAN_BLADES
+        index = int((self.fan_angle % period) / period * FAN_FRAMES_PER_BLADE) % FAN_FRAMES_PER_BLADE
+        if index != self.fan_frame_index:
+            self.fan_frame_index = index
+            self.fan_canvas.itemconfigure(self.fan_item, image=self.fan_frames[index])
 
         # Schedule next animation frame
-        self.root.after(FAN_ANIMATION_INTERVAL, self.animate_fan)
+        self.next_fan_frame = time.perf_counter() + FAN_ANIMATION_INTERVAL / 1000
+        self.fan_animation_job = self.root.after(FAN_ANIMATION_INTERVAL, self.animate_fan)
 
-    def update_service_statuses(self):
-        """Update all service statuses"""
-        # Check Clevo service
-        try:
-            result = subprocess.run(["systemctl", "is-active", "clevo-fancontrol"],
-                                 capture_output=True, text=True)
-            clevo_active = result.stdout.strip() == "active"
+    def update_service_statuses(self, snapshot):
+        """Update all service statuses from a snapshot"""
+        # Clevo service
+        clevo_active = snapshot["clevo_active"]
+        if clevo_active is not None:
             if clevo_active:
-                self.clevo_status.configure(text="Clevo Fan Control: ✅ Running",
-                                          text_color="#74c0fc")
-                self.clevo_start.configure(state="disabled")
-                self.clevo_stop.configure(state="normal")
+                self.view.set(self.clevo_status, text="Clevo Fan Control: ✅ Running",
+                              text_color="#74c0fc")
+                self.view.set(self.clevo_start, state="disabled")
+                self.view.set(self.clevo_stop, state="normal")
             else:
-                self.clevo_status.configure(text="Clevo Fan Control: ❌ Stopped",
-                                          text_color="#ff6b6b")
-                self.clevo_start.configure(state="normal")
-                self.clevo_stop.configure(state="disabled")
-        except:
-            pass
+                self.view.set(self.clevo_status, text="Clevo Fan Control: ❌ Stopped",
+                              text_color="#ff6b6b")
+                self.view.set(self.clevo_start, state="normal")
+                self.view.set(self.clevo_stop, state="disabled")
 
-        # Check Auto-CPUFreq service
-        try:
-            result = subprocess.run(["systemctl", "is-active", "auto-cpufreq"],
-                                 capture_output=True, text=True)
-            cpufreq_active = result.stdout.strip() == "active"
+        # Auto-CPUFreq service
+        cpufreq_active = snapshot["cpufreq_active"]
+        if cpufreq_active is not None:
             if cpufreq_active:
-                self.cpufreq_status.configure(text="Auto-CPUFreq: ✅ Running",
-                                            text_color="#74c0fc")
-                self.cpufreq_start.configure(state="disabled")
-                self.cpufreq_stop.configure(state="normal")
+                self.view.set(self.cpufreq_status, text="Auto-CPUFreq: ✅ Running",
+                              text_color="#74c0fc")
+                self.view.set(self.cpufreq_start, state="disabled")
+                self.view.set(self.cpufreq_stop, state="normal")
             else:
-                self.cpufreq_status.configure(text="Auto-CPUFreq: ❌ Stopped",
-                                            text_color="#ff6b6b")
-                self.cpufreq_start.configure(state="normal")
-                self.cpufreq_stop.configure(state="disabled")
-        except:
-            pass
-
-        # Check RyzenAdj profile
+                self.view.set(self.cpufreq_status, text="Auto-CPUFreq: ❌ Stopped",
+                              text_color="#ff6b6b")
+                self.view.set(self.cpufreq_start, state="normal")
+                self.view.set(self.cpufreq_stop, state="disabled")
+
+        # RyzenAdj profile
+        limits = snapshot["ppt_limits"]
+        if limits:
+            fast, slow = limits
+
+            if fast <= 15:
+                profile = "🔋 Battery Mode"
+                self.view.set(self.battery_btn, state="disabled")
+                self.view.set(self.quiet_btn, state="normal")
+                self.view.set(self.perf_btn, state="normal")
+            elif fast <= 22:
+                profile = "🔇 Quiet Mode"
+                self.view.set(self.battery_btn, state="normal")
+                self.view.set(self.quiet_btn, state="disabled")
+                self.view.set(self.perf_btn, state="normal")
+            else:
+                profile = "⚡ Performance Mode"
+                self.view.set(self.battery_btn, state="normal")
+                self.view.set(self.quiet_btn, state="normal")
+                self.view.set(self.perf_btn, state="disabled")
+
+            self.view.set(self.ryzenadj_status,
+                          text=f"Current Profile: {profile}\n({fast:.0f}W/{slow:.0f}W)")
+
+        # Keep the buttons of in-flight actions disabled
+        for group, buttons in self.action_buttons.items():
+            if self.actions.busy(group):
+                for button in buttons:
+                    self.view.set(button, state="disabled")
+
+    def start_helper(self):
+        """Start the privileged helper once, or return None to use sudo per sample"""
+        if HELPER_MODE == "off":
+            return None
+        helper = HelperClient(fake=HELPER_MODE == "fake", ec=SENSOR_BACKEND == "ec")
         try:
-            result = subprocess.run(["sudo", "ryzenadj", "--info"],
-                                 capture_output=True, text=True)
-            if result.returncode == 0:
-                import re
-                fast_match = re.search(r'PPT LIMIT FAST\s+\|\s+(\d+\.\d+)', result.stdout)
-                slow_match = re.search(r'PPT LIMIT SLOW\s+\|\s+(\d+\.\d+)', result.stdout)
-
-                if fast_match and slow_match:
-                    fast = float(fast_match.group(1))
-                    slow = float(slow_match.group(1))
-
-                    if fast <= 15:
-                        profile = "🔋 Battery Mode"
-                        self.battery_btn.configure(state="disabled")
-                        self.quiet_btn.configure(state="normal")
-                        self.perf_btn.configure(state="normal")
-                    elif fast <= 22:
-                        profile = "🔇 Quiet Mode"
-                        self.battery_btn.configure(state="normal")
-                        self.quiet_btn.configure(state="disabled")
-                        self.perf_btn.configure(state="normal")
-                    else:
-                        profile = "⚡ Performance Mode"
-                        self.battery_btn.configure(state="normal")
-                        self.quiet_btn.configure(state="normal")
-                        self.perf_btn.configure(state="disabled")
-
-                    self.ryzenadj_status.configure(
-                        text=f"Current Profile: {profile}\n({fast:.0f}W/{slow:.0f}W)")
-        except:
-            pass
+            helper.start()
+        except OSError:
+            return None
+        return helper
+
+    def open_ec_reader(self):
+        """Open the EC directly when selected and no helper does it for us"""
+        if SENSOR_BACKEND != "ec" or self.helper is not None:
+            return None
+        try:
+            return ECReader()
+        except OSError as e:
+            print(f"Cannot open EC ({e}), falling back to clevo-fancontrol")
+            return None
+
+    def start_exporter(self):
+        """Start the local metrics endpoint if PANG11_METRICS_PORT is set"""
+        if not METRICS_PORT:
+            return None
+        try:
+            exporter = MetricsExporter(int(METRICS_PORT))
+        except (OSError, ValueError) as e:
+            print(f"Cannot start metrics exporter: {e}")
+            return None
+        exporter.start()
+        return exporter
+
+    def start_controller(self):
+        """Start the built-in fan controller if PANG11_FAN_CONTROL is set"""
+        if not FAN_CONTROL or self.helper is None:
+            return None
+        if isinstance(self.helper, daemon.DaemonClient):
+            # The daemon refuses set_duty from normal users, and a second
+            # controller would fight its own; fan control belongs to the daemon
+            message = "fan control is up to the daemon (--fan-control)"
+            print(f"PANG11_FAN_CONTROL ignored: {message}", file=sys.stderr)
+            self.view.set(self.controller_label, text=f"{FAN_CONTROL.upper()}: {message}")
+            return None
+        controller = daemon.start_fan_controller(self.helper, FAN_CONTROL)
+        controller.start()
+        return controller
+
+    def connect_daemon(self):
+        """Subscribe to a running sampler daemon, or return None"""
+        try:
+            return daemon.DaemonClient(daemon.SOCKET_PATH)
+        except OSError:
+            return None
 
     def start_updates(self):
         """Start all update loops"""
+        recorder = TraceRecorder(self.record) if self.record else None
+        self.actions = ActionQueue()
+        self.actions.start()
+        self.rule_events = queue.Queue()
+        client = self.connect_daemon() if self.backend is None else None
+        if self.backend is not None:
+            # Simulated or replayed sensors; actions fall back to pkexec
+            self.helper = None
+            self.collector = SensorCollector(self.backend, interval=REFRESH_INTERVAL / 1000,
+                                             recorder=recorder, profiler=self.profiler,
+                                             rules=self.start_rules())
+        elif client is not None:
+            # A shared daemon samples for us; it also handles actions we may perform
+            # and runs its own rules (daemon --rules), which we only display
+            self.helper = client
+            self.collector = client
+            self.collector.recorder = recorder
+            self.rule_events = client.rule_events
+        else:
+            self.helper = self.start_helper()
+            backend = LiveSensorBackend(self.helper, self.open_ec_reader(), self.sysfs, CpuReader())
+            self.collector = SensorCollector(backend, interval=REFRESH_INTERVAL / 1000,
+                                             recorder=recorder, profiler=self.profiler,
+                                             rules=self.start_rules())
+        self.collector.start()
+        self.exporter = self.start_exporter()
+        self.controller = self.start_controller()
         self.update_data()
-        self.animate_fan()
+        self.root.bind("<Map>", self.start_fan_animation, add="+")
+        self.root.bind("<Unmap>", self.stop_fan_animation, add="+")
+        self.root.bind("<Map>", self.on_map, add="+")
+        self.root.bind("<Unmap>", self.on_unmap, add="+")
+        self.root.bind("<F12>", self.toggle_debug_panel)
+        self.start_fan_animation()
+
+    def on_unmap(self, event):
+        """Stop rendering and sample at the low-power cadence while minimized or on another workspace"""
+        if event.widget is not self.root or self.hidden:
+            return
+        self.hidden = True
+        self.collector.set_background(True)
+        if self.snapshot is not None:
+            self.tray.show(self.snapshot)
+
+    def on_map(self, event):
+        """Resume rendering with one redraw from the buffered history"""
+        if event.widget is not self.root or not self.hidden:
+            return
+        self.hidden = False
+        self.tray.hide()
+        self.collector.set_background(False)
+        if self.snapshot is not None:
+            with self.profiler.stage("catch_up"):
+                self.render(self.snapshot)
+
+    def handle_tray_requests(self):
+        """Restore the window when the tray icon was clicked"""
+        while True:
+            try:
+                request = self.tray.requests.get_nowait()
+            except queue.Empty:
+                return
+            if request == "show":
+                self.root.deiconify()
+                self.root.lift()
+
+    def toggle_debug_panel(self, event=None):
+        """Show or hide the self-profiling panel"""
+        if self.debug_window is not None:
+            if self.debug_job is not None:
+                self.root.after_cancel(self.debug_job)
+                self.debug_job = None
+            self.debug_window.destroy()
+            self.debug_window = None
+            return
+
+        self.debug_window = ctk.CTkToplevel(self.root)
+        self.debug_window.title("Monitor timings")
+        self.debug_window.geometry("620x520")
+        self.debug_window.protocol("WM_DELETE_WINDOW", self.toggle_debug_panel)
+        self.debug_window.bind("<F12>", self.toggle_debug_panel)
+
+        self.debug_text = ctk.CTkTextbox(self.debug_window,
+                                         font=ctk.CTkFont(family="Courier New", size=12))
+        self.debug_text.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+
+        buttons = ctk.CTkFrame(self.debug_window, fg_color="transparent")
+        buttons.pack(fill="x", padx=10, pady=(0, 10))
+        ctk.CTkButton(buttons, text="Dump to file", width=120,
+                      command=self.dump_profile).pack(side="left")
+        self.debug_status = ctk.CTkLabel(buttons, text="",
+                                         font=ctk.CTkFont(family="Courier New", size=11))
+        self.debug_status.pack(side="left", padx=10)
+
+        self.refresh_debug_panel()
+
+    def toggle_history_viewer(self):
+        """Show or hide the zoomable long-range history"""
+        if self.history_window is not None:
+            self.history_view.close()
+            self.history_window.destroy()
+            self.history_window = None
+            self.history_view = None
+            return
+
+        from historyview import HistoryView
+        self.history_window = ctk.CTkToplevel(self.root)
+        self.history_window.title("History")
+        self.history_window.geometry("900x680")
+        self.history_window.protocol("WM_DELETE_WINDOW", self.toggle_history_viewer)
+        self.history_view = HistoryView(self.history_window, self.history)
+
+    def refresh_debug_panel(self):
+        self.debug_text.delete("1.0", "end")
+        self.debug_text.insert("1.0", self.profiler.format())
+        self.debug_job = self.root.after(DEBUG_PANEL_INTERVAL, self.refresh_debug_panel)
+
+    def dump_profile(self):
+        """Write the timings (and the daemon's sampling timings, if any) to a file"""
+        extra = {}
+        if isinstance(self.collector, daemon.DaemonClient):
+            try:
+                extra["daemon"] = self.collector.request("timings")
+            except HelperError as e:
+                extra["daemon"] = {"error": str(e)}
+        try:
+            path = self.profiler.dump(extra=extra)
+        except OSError as e:
+            self.debug_status.configure(text=f"Dump failed: {e}")
+            return
+        self.debug_status.configure(text=f"Saved {path}")
 
     # Service control methods
-    def start_clevo_service(self):
+    def run_privileged(self, cmd, fallback, **args):
+        """Run an action through the helper, or a one-off pkexec if it is not running"""
+        if self.helper is not None:
+            try:
+                return self.helper.request(cmd, **args)
+            except HelperError:
+                pass
+        return subprocess.run(["pkexec"] + fallback).returncode
+
+    def service_action(self, service, action):
+        result = self.run_privileged("service", ["systemctl", action, service],
+                                     service=service, action=action)
+        self.collector.refresh(["services"])
+        return result
+
+    def profile_action(self, profile):
+        result = self.run_privileged("profile", [RYZENADJ] + ryzenadj_profile_args(profile),
+                                     name=profile)
+        self.collector.refresh(["ryzenadj"])
+        return result
+
+    def submit_action(self, group, description, function, button=None):
+        """Queue an action; False if its group already has one in flight.
+
+        The buttons of the group stay disabled until it finishes.
+        """
+        if not self.actions.submit(Action(group, description, function)):
+            return False
+        if button is not None:
+            self.action_pressed[group] = (button, button.cget("text"))
+            self.view.set(button, text="⏳")
+        for other in self.action_buttons[group]:
+            self.view.set(other, state="disabled")
+        self.view.set(self.action_label, text=f"⏳ {description}…", text_color="#f7b731")
+        self.view.flush()
+        return True
+
+    def submit_rule_profile(self, rule, profile):
+        """Switch profiles for a rule now, or as soon as the profile action in flight finishes"""
+        if not self.submit_action("profile", f"Rule {rule}: {profile} mode",
+                                  lambda: self.profile_action(profile)):
+            self.deferred_profile = (rule, profile)  # the newest switch wins
+
+    def finish_actions(self):
+        """Report finished actions and re-enable their buttons"""
+        finished = self.actions.completed()
+        if not finished:
+            return
+        for action in finished:
+            button, text = self.action_pressed.pop(action.group, (None, None))
+            if button is not None:
+                self.view.set(button, text=text)
+            if action.ok:
+                self.view.set(self.action_label, text=f"✅ {action.outcome()}", text_color="#74c0fc")
+            else:
+                self.view.set(self.action_label, text=f"❌ {action.outcome()}", text_color="#ff6b6b")
+            if (self.snapshot or {}).get(ACTION_STATUS_FIELDS[action.group]) is None:
+                # No status to set the buttons from; re-enable them all
+                for button in self.action_buttons[action.group]:
+                    self.view.set(button, state="normal")
+        if self.snapshot is not None:
+            self.update_service_statuses(self.snapshot)
+        self.view.flush()
+        if self.deferred_profile is not None and not self.actions.busy("profile"):
+            rule, profile = self.deferred_profile
+            self.deferred_profile = None
+            self.submit_rule_profile(rule, profile)
+        for action in finished:
+            if not action.ok:
+                messagebox.showerror("Error", action.outcome())
+
+    def start_rules(self):
+        """RuleEngine for our own collector from RULES_PATH, or None"""
+        if not os.path.exists(RULES_PATH):
+            return None
         try:
-            subprocess.run(["pkexec", "systemctl", "start", "clevo-fancontrol"])
-            messagebox.showinfo("Success", "Clevo service started")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to start service: {e}")
+            return RuleEngine(load_rules(RULES_PATH), self.rule_events.put)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring rules in {RULES_PATH}: {e}", file=sys.stderr)
+            return None
+
+    def handle_rule_events(self):
+        """Show fired/released rules; run their profile switches unless the daemon did"""
+        while True:
+            try:
+                message = self.rule_events.get_nowait()
+            except queue.Empty:
+                return
+            action = message["action"] or {}
+            color = "#74c0fc" if message["event"] == "release" else "#f7b731"
+            if "alert" in action:
+                color = "#ff6b6b"
+                if shutil.which("notify-send"):
+                    subprocess.Popen(["notify-send", "-u", "critical", "Pangolin 11", action["alert"]])
+            self.view.set(self.action_label, text=f"📏 {message['message']}", text_color=color)
+            self.view.flush()
+            if "profile" in action and not isinstance(self.collector, daemon.DaemonClient):
+                self.submit_rule_profile(message["rule"], action["profile"])
+
+    def start_clevo_service(self):
+        self.submit_action("clevo", "Start Clevo service",
+                           lambda: self.service_action("clevo-fancontrol", "start"), self.clevo_start)
 
     def stop_clevo_service(self):
-        try:
-            subprocess.run(["pkexec", "systemctl", "stop", "clevo-fancontrol"])
-            messagebox.showinfo("Success", "Clevo service stopped")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to stop service: {e}")
+        self.submit_action("clevo", "Stop Clevo service",
+                           lambda: self.service_action("clevo-fancontrol", "stop"), self.clevo_stop)
 
     def start_cpufreq_service(self):
-        try:
-            subprocess.run(["pkexec", "systemctl", "start", "auto-cpufreq"])
-            messagebox.showinfo("Success", "Auto-CPUFreq service started")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to start service: {e}")
+        self.submit_action("cpufreq", "Start Auto-CPUFreq",
+                           lambda: self.service_action("auto-cpufreq", "start"), self.cpufreq_start)
 
     def stop_cpufreq_service(self):
-        try:
-            subprocess.run(["pkexec", "systemctl", "stop", "auto-cpufreq"])
-            messagebox.showinfo("Success", "Auto-CPUFreq service stopped")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to stop service: {e}")
+        self.submit_action("cpufreq", "Stop Auto-CPUFreq",
+                           lambda: self.service_action("auto-cpufreq", "stop"), self.cpufreq_stop)
 
     def apply_battery_mode(self):
-        try:
-            subprocess.run(["pkexec", "/usr/bin/ryzenadj", "--slow-limit=8000",
-                          "--fast-limit=12000", "--tctl-temp=80"])
-            messagebox.showinfo("Success", "Battery mode applied")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to apply mode: {e}")
+        self.submit_action("profile", "Battery mode",
+                           lambda: self.profile_action("battery"), self.battery_btn)
 
     def apply_quiet_mode(self):
-        try:
-            subprocess.run(["pkexec", "/usr/bin/ryzenadj", "--slow-limit=15000",
-                          "--fast-limit=20000", "--tctl-temp=90"])
-            messagebox.showinfo("Success", "Quiet mode applied")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to apply mode: {e}")
+        self.submit_action("profile", "Quiet mode",
+                           lambda: self.profile_action("quiet"), self.quiet_btn)
 
     def apply_ac_mode(self):
-        try:
-            subprocess.run(["pkexec", "/usr/bin/ryzenadj", "--slow-limit=20000",
-                          "--fast-limit=30000", "--tctl-temp=98"])
-            messagebox.showinfo("Success", "Performance mode applied")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to apply mode: {e}")
+        self.submit_action("profile", "Performance mode",
+                           lambda: self.profile_action("performance"), self.perf_btn)
 
 
 if __name__ == "__main__":
+    if "--daemon" in sys.argv[1:]:
+        daemon.main([arg for arg in sys.argv[1:] if arg != "--daemon"])
+        sys.exit(0)
+    if "--fleet" in sys.argv[1:]:
+        import fleet
+        sys.exit(fleet.main([arg for arg in sys.argv[1:] if arg != "--fleet"]))
+
+    parser = argparse.ArgumentParser(description="Pangolin 11 System Monitor")
+    parser.add_argument("--daemon", action="store_true",
+                        help="run the headless sampler daemon (see daemon.py --help)")
+    parser.add_argument("--fleet", action="store_true",
+                        help="show the fleet dashboard of many daemons (see fleet.py --help)")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print startup milestones as JSON and exit once data and graphs are shown")
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+
     app = ctk.CTk()
-    monitor = FanMonitorApp(app)
-    app.mainloop()
\ No newline at end of file
+    monitor = FanMonitorApp(app, backend=simulated_backend_from_args(args), record=args.record)
+    if args.startup_time:
+        def report(startup):
+            print(json.dumps(startup))
+            app.after(1, app.destroy)
+        monitor.on_startup_complete = report
+    app.mainloop()
+    if monitor.burst is not None and monitor.burst.is_alive():
+        monitor.burst.stop()  # write the last partial block
+    monitor.tray.stop()
+    monitor.history.close()  # release the file for the next monitor
+    if monitor.controller is not None:
+        monitor.controller.stop()  # do not leave the fan at the controller's last duty
\ No newline at end of file
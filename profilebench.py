@@ -0,0 +1,273 @@
+"""Power-profile benchmark: throughput vs watts vs temperature.
+
+Applies each RyzenAdj profile (and any custom limit sets) in turn, runs a
+reproducible CPU workload for a fixed time and samples package power,
+temperature and fan speed while it runs:
+
+    python3 profilebench.py                          # built-in profiles, 60 s each
+    python3 profilebench.py --limits 15/10 25/18/95  # plus custom fast/slow[/tctl] sets
+    python3 profilebench.py --fake --duration 5      # dry run without root or hardware
+
+The workload hashes a fixed 1 MiB block with SHA-256 on every CPU, so the
+work done is MiB hashed and comparable between runs on the same machine.
+Package power comes from the powercap package-0 energy counter when it is
+readable (root) and falls back to battery discharge power otherwise.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import threading
+import time
+
+import daemon
+from backends import LiveSensorBackend
+from fancontrol_helper import FakeBackend, HelperClient, HelperError, LocalHelper
+from sensors import RYZENADJ_PROFILES, check_ryzenadj_limits
+from sysfs import SysfsReader
+
+# Seconds of workload per limit set, and idle seconds before each run
+DEFAULT_DURATION = 60.0
+DEFAULT_COOLDOWN = 20.0
+
+# Seconds between power/temperature/fan samples during a run
+SAMPLE_PERIOD = 0.5
+
+# tctl temperature (°C) used for custom limit sets without one
+DEFAULT_TCTL = 95
+
+# The unit of work: one SHA-256 pass over this 1 MiB block
+WORK_BLOCK = hashlib.sha256(b"pang11-fancontrol").digest() * (1 << 15)
+
+
+def hash_worker(seconds):
+    """Hash WORK_BLOCK until `seconds` have passed; returns the blocks hashed"""
+    deadline = time.perf_counter() + seconds
+    blocks = 0
+    while time.perf_counter() < deadline:
+        hashlib.sha256(WORK_BLOCK).digest()
+        blocks += 1
+    return blocks
+
+
+def run_workload(seconds, workers):
+    """MiB hashed by `workers` processes in `seconds`"""
+    with multiprocessing.Pool(workers) as pool:
+        return sum(pool.map(hash_worker, [seconds] * workers))
+
+
+def parse_limits(text):
+    """"FAST/SLOW[/TCTL]" in watts and °C -> (name, fast mW, slow mW, tctl)"""
+    parts = text.split("/")
+    if len(parts) not in (2, 3):
+        raise argparse.ArgumentTypeError(f"expected FAST/SLOW[/TCTL], got {text!r}")
+    try:
+        fast = round(float(parts[0]) * 1000)
+        slow = round(float(parts[1]) * 1000)
+        tctl = int(parts[2]) if len(parts) == 3 else DEFAULT_TCTL
+        check_ryzenadj_limits(fast, slow, tctl)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return (f"{fast / 1000:g}/{slow / 1000:g} W", fast, slow, tctl)
+
+
+def apply_limits(helper, limit_set):
+    name, fast, slow, tctl = limit_set
+    if name in RYZENADJ_PROFILES:
+        return helper.request("profile", name=name)
+    return helper.request("limits", fast=fast, slow=slow, tctl=tctl)
+
+
+class RunSampler(threading.Thread):
+    """Samples temperature, fan and power while the workload runs"""
+
+    def __init__(self, backend, sysfs, period=SAMPLE_PERIOD):
+        super().__init__(name="bench-sampler", daemon=True)
+        self.backend = backend
+        self.sysfs = sysfs
+        self.period = period
+        self.samples = []  # (time, temp, rpm, battery W, package µJ or None)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            fields = self.backend.read(["ec", "battery"])
+            self.samples.append((time.perf_counter(), fields["temp"], fields["rpm"],
+                                 fields["power"], self.sysfs.read_package_energy()))
+            self._stop_event.wait(self.period)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def package_power(samples, energy_range):
+    """Per-interval package watts from energy counter samples, or None"""
+    watts = []
+    for (t0, *_, e0), (t1, *_, e1) in zip(samples, samples[1:]):
+        if e0 is None or e1 is None or t1 <= t0:
+            return None
+        delta = e1 - e0 if e1 >= e0 else e1 + energy_range - e0
+        watts.append(delta / 1e6 / (t1 - t0))
+    return watts or None
+
+
+def summarize_run(limit_set, blocks, duration, samples, energy_range):
+    name, fast, slow, tctl = limit_set
+    temps = [s[1] for s in samples]
+    rpms = [s[2] for s in samples]
+    watts = package_power(samples, energy_range)
+    source = "package"
+    if watts is None:
+        watts = [s[3] for s in samples]
+        source = "battery"
+    avg_power = statistics.fmean(watts) if watts else 0.0
+    return {
+        "name": name,
+        "fast_w": fast / 1000,
+        "slow_w": slow / 1000,
+        "tctl": tctl,
+        "work_mib": blocks,
+        "mib_per_s": blocks / duration,
+        "power_source": source,
+        "avg_power_w": avg_power,
+        "peak_power_w": max(watts) if watts else 0.0,
+        "mib_per_j": blocks / (avg_power * duration) if avg_power > 0 else None,
+        "avg_temp": statistics.fmean(temps) if temps else None,
+        "peak_temp": max(temps) if temps else None,
+        "avg_rpm": statistics.fmean(rpms) if rpms else None,
+        "peak_rpm": max(rpms) if rpms else None,
+    }
+
+
+def benchmark(helper, limit_sets, duration, cooldown, workers, sysfs):
+    backend = LiveSensorBackend(helper, sysfs_reader=sysfs)
+    results = []
+    for limit_set in limit_sets:
+        print(f"{limit_set[0]}: applying limits, cooling down {cooldown:.0f} s", file=sys.stderr)
+        apply_limits(helper, limit_set)
+        time.sleep(cooldown)
+
+        print(f"{limit_set[0]}: running workload for {duration:.0f} s on {workers} CPUs",
+              file=sys.stderr)
+        sampler = RunSampler(backend, sysfs)
+        sampler.start()
+        started = time.perf_counter()
+        blocks = run_workload(duration, workers)
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        results.append(summarize_run(limit_set, blocks, elapsed, sampler.samples,
+                                     sysfs.package_energy_range))
+    return results
+
+
+def format_table(results):
+    def cell(value, fmt):
+        return "-" if value is None else format(value, fmt)
+
+    lines = [f"{'limits':<14}{'MiB/s':>9}{'avg W':>8}{'peak W':>8}{'MiB/J':>8}"
+             f"{'avg °C':>8}{'max °C':>8}{'avg RPM':>9}{'max RPM':>9}"]
+    for r in results:
+        lines.append(f"{r['name']:<14}{r['mib_per_s']:>9.1f}{r['avg_power_w']:>8.1f}"
+                     f"{r['peak_power_w']:>8.1f}{cell(r['mib_per_j'], '.2f'):>8}"
+                     f"{cell(r['avg_temp'], '.1f'):>8}{cell(r['peak_temp'], '.0f'):>8}"
+                     f"{cell(r['avg_rpm'], '.0f'):>9}{cell(r['peak_rpm'], '.0f'):>9}")
+    sources = {r["power_source"] for r in results}
+    if "battery" in sources:
+        lines.append("power: battery discharge (package energy counter not readable; "
+                     "run as root and on battery for meaningful watts)")
+    return "\n".join(lines)
+
+
+def may_change_limits(helper):
+    """Whether the helper accepts limit changes, checked by applying the current limits again"""
+    try:
+        limits = helper.request("ryzenadj_limits")
+        if limits is None:
+            return False  # nothing to restore through this helper either
+        restore_limits(helper, limits)
+    except HelperError:
+        return False
+    return True
+
+
+def restore_limits(helper, limits):
+    fast, slow, tctl = limits
+    return helper.request("limits", fast=fast, slow=slow, tctl=tctl)
+
+
+def open_helper(fake, ec):
+    """Simulated helper, the sampler daemon if it lets us change limits, or a pkexec'd helper"""
+    if fake:
+        return LocalHelper(FakeBackend())
+    if os.path.exists(daemon.SOCKET_PATH):
+        try:
+            client = daemon.DaemonClient(daemon.SOCKET_PATH)
+        except OSError:
+            client = None
+        if client is not None:
+            client.start()
+            if may_change_limits(client):
+                return client
+            print("The sampler daemon does not let this user change limits, using pkexec",
+                  file=sys.stderr)
+            client.close()
+    helper = HelperClient(ec=ec)
+    helper.start()
+    return helper
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark RyzenAdj power profiles")
+    parser.add_argument("--profiles", nargs="*", choices=sorted(RYZENADJ_PROFILES),
+                        default=list(RYZENADJ_PROFILES), help="built-in profiles to run")
+    parser.add_argument("--limits", nargs="*", type=parse_limits, default=[],
+                        metavar="FAST/SLOW[/TCTL]", help="custom limit sets in watts (and °C)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help="seconds of workload per limit set")
+    parser.add_argument("--cooldown", type=float, default=DEFAULT_COOLDOWN,
+                        help="idle seconds before each run")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--fake", action="store_true", help="use simulated hardware")
+    parser.add_argument("--ec", action="store_true", help="read the EC in-process via ec_sys")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    limit_sets = [(name,) + RYZENADJ_PROFILES[name] for name in args.profiles] + args.limits
+    if not limit_sets:
+        parser.error("nothing to benchmark")
+
+    helper = open_helper(args.fake, args.ec)
+    sysfs = SysfsReader()
+    try:
+        original = helper.request("ryzenadj_limits")
+        if not original:
+            print("Cannot read the current limits; they will not be restored", file=sys.stderr)
+        try:
+            results = benchmark(helper, limit_sets, args.duration, args.cooldown, args.workers,
+                                sysfs)
+        finally:
+            if original:
+                fast, slow, tctl = original
+                print(f"restoring {fast / 1000:g}/{slow / 1000:g} W, tctl {tctl} °C", file=sys.stderr)
+                restore_limits(helper, original)
+    except HelperError as e:
+        print(f"Benchmark failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        sysfs.close()
+        helper.close()
+
+    print(format_table(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"time": time.time(), "duration": args.duration, "workers": args.workers,
+                       "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
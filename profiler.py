@@ -0,0 +1,116 @@
+"""Self-profiling of the monitor's own update loops.
+
+A Profiler keeps rolling latency samples per named stage (EC read,
+systemctl, ryzenadj, label updates, graph drawing, ...) and the skew
+between when each periodic loop was scheduled to run and when it actually
+ran. The GUI shows the summary in a debug panel (F12) and can dump it to a
+JSON file; the daemon serves it with the "timings" command.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Samples kept per stage
+PROFILE_SAMPLES = 500
+
+# Percentiles reported for every stage
+PERCENTILES = (50, 95, 99)
+
+
+def default_dump_path():
+    state = os.environ.get("XDG_STATE_HOME", os.path.expanduser("~/.local/state"))
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(state, "pang11-fancontrol", f"profile-{stamp}.json")
+
+
+def summarize(samples):
+    """count/last/pXX/max in milliseconds for a sequence of second durations"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    summary = {"count": len(ordered), "last_ms": samples[-1] * 1000}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = ordered[min(len(ordered) - 1, len(ordered) * p // 100)] * 1000
+    summary["max_ms"] = ordered[-1] * 1000
+    return summary
+
+
+class Profiler:
+    """Thread-safe rolling stage latencies and tick skews"""
+
+    def __init__(self, size=PROFILE_SAMPLES):
+        self.size = size
+        self.stages = {}
+        self.skews = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self.lock:
+            samples = self.stages.get(name)
+            if samples is None:
+                samples = self.stages[name] = deque(maxlen=self.size)
+            samples.append(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of a with-block as one sample of a stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def tick(self, name, scheduled):
+        """Record how late a loop ran relative to its perf_counter() deadline"""
+        skew = time.perf_counter() - scheduled
+        with self.lock:
+            samples = self.skews.get(name)
+            if samples is None:
+                samples = self.skews[name] = deque(maxlen=self.size)
+            samples.append(skew)
+
+    def summary(self):
+        with self.lock:
+            stages = {name: list(samples) for name, samples in self.stages.items()}
+            skews = {name: list(samples) for name, samples in self.skews.items()}
+        return {
+            "stages": {name: summarize(samples) for name, samples in sorted(stages.items())},
+            "skew": {name: summarize(samples) for name, samples in sorted(skews.items())},
+        }
+
+    def format(self):
+        """Fixed-width table of the summary for the debug panel"""
+        summary = self.summary()
+        lines = [f"{'stage':<18}{'n':>5}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}  (ms)"]
+        for section, title in (("stages", None), ("skew", "tick skew")):
+            if title:
+                lines.append(title)
+            for name, s in summary[section].items():
+                if s["count"]:
+                    lines.append(f"{name:<18}{s['count']:>5}{s['p50_ms']:>8.2f}{s['p95_ms']:>8.2f}"
+                                 f"{s['p99_ms']:>8.2f}{s['max_ms']:>8.2f}")
+        return "\n".join(lines)
+
+    def dump(self, path=None, extra=None):
+        """Write the summary and raw samples as JSON; returns the path"""
+        path = path or default_dump_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self.lock:
+            raw = {
+                "stages": {name: list(samples) for name, samples in self.stages.items()},
+                "skew": {name: list(samples) for name, samples in self.skews.items()},
+            }
+        data = {"time": time.time(), "summary": self.summary(), "samples": raw}
+        if extra:
+            data.update(extra)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+        return path
+
+
+def timed(profiler, name):
+    """profiler.stage(name), or a no-op when there is no profiler"""
+    return profiler.stage(name) if profiler is not None else nullcontext()
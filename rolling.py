@@ -0,0 +1,162 @@
+"""Array-backed ring buffers and incremental rolling statistics.
+
+RingBuffer stores every row twice (at i and i + capacity), so the newest n
+rows are always one contiguous slice and can be handed to the graphs as a
+zero-copy view. RollingStats keeps min/max/mean/percentiles of a sliding
+time window up to date in amortized O(1) per sample, and EnergyMeter
+integrates power into watt-hours, so the UI never rescans history.
+"""
+from collections import deque
+
+import numpy as np
+
+# Samples further apart than this are treated as a gap (suspend, restart)
+# and not integrated
+MAX_ENERGY_GAP = 60.0
+
+
+class RingBuffer:
+    """Fixed-capacity ring of float rows with contiguous views of the newest rows"""
+
+    def __init__(self, capacity, width=1):
+        self.capacity = capacity
+        self.data = np.zeros((2 * capacity, width))
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, row):
+        self.data[self.head] = row
+        self.data[self.head + self.capacity] = row
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def view(self, n=None):
+        """The newest n rows (all by default), oldest first, without copying"""
+        n = self.count if n is None else min(n, self.count)
+        end = self.head + self.capacity
+        return self.data[end - n:end]
+
+    def oldest(self):
+        return self.data[self.head + self.capacity - self.count]
+
+
+class RollingStats:
+    """Min/max/mean/percentiles of the samples of the last `window` seconds.
+
+    Samples live in a RingBuffer; the sum, a value histogram and monotonic
+    deques of min/max candidates are updated as samples enter and expire.
+    Percentiles are read from the histogram, so they are exact to bin_width.
+    """
+
+    def __init__(self, window, bin_width=1.0, low=0.0, high=200.0, capacity=4096):
+        self.window = window
+        self.bin_width = bin_width
+        self.low = low
+        self.bins = np.zeros(int((high - low) / bin_width) + 1, dtype=np.int64)
+        self.samples = RingBuffer(capacity, 2)
+        self.total = 0.0
+        self.added = 0  # sequence number of the next sample
+        self.minima = deque()  # (sequence, value), values increasing
+        self.maxima = deque()  # (sequence, value), values decreasing
+        self.peak = None  # largest value ever added
+
+    def bin(self, value):
+        return min(len(self.bins) - 1, max(0, int((value - self.low) / self.bin_width)))
+
+    def add(self, timestamp, value):
+        if len(self.samples) == self.samples.capacity:
+            self.remove_oldest()
+        self.samples.append((timestamp, value))
+        self.total += value
+        self.bins[self.bin(value)] += 1
+
+        sequence = self.added
+        self.added += 1
+        while self.minima and self.minima[-1][1] >= value:
+            self.minima.pop()
+        self.minima.append((sequence, value))
+        while self.maxima and self.maxima[-1][1] <= value:
+            self.maxima.pop()
+        self.maxima.append((sequence, value))
+        self.peak = value if self.peak is None else max(self.peak, value)
+
+        self.expire(timestamp - self.window)
+
+    def extend(self, times, values):
+        for timestamp, value in zip(times, values):
+            self.add(float(timestamp), float(value))
+
+    def remove_oldest(self):
+        value = self.samples.oldest()[1]
+        sequence = self.added - len(self.samples)
+        self.samples.count -= 1
+        self.total -= value
+        self.bins[self.bin(value)] -= 1
+        if self.minima and self.minima[0][0] <= sequence:
+            self.minima.popleft()
+        if self.maxima and self.maxima[0][0] <= sequence:
+            self.maxima.popleft()
+
+    def expire(self, cutoff):
+        while len(self.samples) and self.samples.oldest()[0] < cutoff:
+            self.remove_oldest()
+
+    def __len__(self):
+        return len(self.samples)
+
+    def mean(self):
+        return self.total / len(self.samples) if len(self.samples) else None
+
+    def min(self):
+        return self.minima[0][1] if self.minima else None
+
+    def max(self):
+        return self.maxima[0][1] if self.maxima else None
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100), to bin_width"""
+        if not len(self.samples):
+            return None
+        rank = q / 100 * (len(self.samples) - 1)
+        index = int(np.searchsorted(np.cumsum(self.bins), rank, side="right"))
+        return self.low + (index + 0.5) * self.bin_width
+
+
+def integrate(times, values, max_gap=MAX_ENERGY_GAP):
+    """Trapezoidal integral of values over times (seconds), skipping gaps"""
+    if len(times) < 2:
+        return 0.0
+    dt = np.diff(times)
+    areas = dt * (values[1:] + values[:-1]) / 2
+    return float(areas[(dt > 0) & (dt <= max_gap)].sum())
+
+
+class EnergyMeter:
+    """Running integral of power samples in watt-hours"""
+
+    def __init__(self, wh=0.0, max_gap=MAX_ENERGY_GAP):
+        self.wh = wh
+        self.max_gap = max_gap
+        self.last = None
+
+    def add(self, timestamp, watts):
+        if self.last is not None:
+            then, before = self.last
+            if 0 < timestamp - then <= self.max_gap:
+                self.wh += (timestamp - then) * (watts + before) / 2 / 3600
+        self.last = (timestamp, watts)
+
+
+def boot_time():
+    """Unix time the system booted, or None"""
+    try:
+        with open("/proc/stat") as f:
+            for line in f:
+                if line.startswith("btime "):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return None
@@ -0,0 +1,220 @@
+"""Declarative rules evaluated on every sample.
+
+Rules are read from a JSON list (~/.config/pang11-fancontrol/rules.json,
+or PANG11_RULES / daemon --rules) and switch power profiles or raise
+alerts:
+
+    [
+      {"name": "hot", "metric": "temp", "above": 90, "for": 10, "clear": 85,
+       "cooldown": 300, "action": {"profile": "quiet"}},
+      {"name": "unplugged", "metric": "battery_status", "equals": "Discharging",
+       "action": {"profile": "battery"}, "release": {"profile": "performance"}},
+      {"name": "fan", "metric": "rpm", "below": 1, "window": 30, "aggregate": "max",
+       "action": {"alert": "Fan stopped for 30 s"}}
+    ]
+
+- metric: temp, rpm, duty, power, battery_status, clevo_active,
+  cpufreq_active, or "hwmon.<sensor>" for an extra temperature
+- above / below / equals: the condition; above and below only on numbers
+- window + aggregate (mean, min or max): test the aggregate of the last
+  window seconds instead of the latest value
+- for: seconds the condition must hold before the rule fires
+- clear: hysteresis threshold the value must cross back before the rule
+  releases (defaults to the condition's own threshold)
+- cooldown: minimum seconds between two firings
+- action / release: {"profile": NAME} or {"alert": TEXT}, run when the
+  rule fires and (optionally) when it releases
+
+A rule is only updated on the samples that re-read its metric's source,
+so windows and hold times are not weighted by unrelated wakeups. Each
+sample costs O(1) per rule: conditions keep the time they started holding,
+and windowed aggregates come from a RollingStats. A rule that raises is
+reported and dropped; the others keep running.
+"""
+import json
+import os
+import sys
+
+from rolling import RollingStats
+from scheduler import SOURCE_FIELDS, SOURCES
+from sensors import RYZENADJ_PROFILES
+
+# Rules file of the GUI's own collector, overridable with PANG11_RULES
+RULES_PATH = os.environ.get("PANG11_RULES", os.path.join(
+    os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config")),
+    "pang11-fancontrol", "rules.json"))
+
+# Snapshot fields a rule can test: numeric ones take any condition, the others only equals
+NUMERIC_METRICS = ("temp", "rpm", "duty", "power")
+STATE_METRICS = ("battery_status", "clevo_active", "cpufreq_active")
+
+# Aggregates a windowed condition can test
+AGGREGATES = ("mean", "min", "max")
+
+# Samples kept per windowed rule
+RULE_WINDOW_SAMPLES = 4096
+
+
+def check_action(action, name):
+    if action is None:
+        return None
+    if not isinstance(action, dict) or len(action) != 1 or not action.keys() <= {"profile", "alert"}:
+        raise ValueError(f"rule {name!r}: an action is {{\"profile\": NAME}} or {{\"alert\": TEXT}}")
+    if "profile" in action and action["profile"] not in RYZENADJ_PROFILES:
+        raise ValueError(f"rule {name!r}: unknown profile {action['profile']!r}")
+    return action
+
+
+def describe_action(action):
+    if "profile" in action:
+        return f"{action['profile']} profile"
+    return action["alert"]
+
+
+class Rule:
+    """One condition with its hysteresis, duration and cooldown state"""
+
+    def __init__(self, spec):
+        self.name = spec.get("name") or spec.get("metric", "rule")
+        self.metric = spec.get("metric")
+        if not isinstance(self.metric, str):
+            raise ValueError(f"rule {self.name!r}: metric is required")
+        numeric = self.metric in NUMERIC_METRICS or self.metric.startswith("hwmon.")
+        if not numeric and self.metric not in STATE_METRICS:
+            raise ValueError(f"rule {self.name!r}: unknown metric {self.metric!r}")
+        # Source whose reads update the metric
+        self.source = "battery" if self.metric.startswith("hwmon.") else next(
+            source for source, fields in SOURCE_FIELDS.items() if self.metric in fields)
+        kinds = [kind for kind in ("above", "below", "equals") if kind in spec]
+        if len(kinds) != 1:
+            raise ValueError(f"rule {self.name!r}: needs exactly one of above, below or equals")
+        self.kind = kinds[0]
+        if self.kind != "equals" and not numeric:
+            raise ValueError(f"rule {self.name!r}: {self.metric} is not numeric, use equals")
+        self.threshold = spec[self.kind]
+        self.clear = spec.get("clear", self.threshold)
+        if self.kind != "equals" and not all(isinstance(v, (int, float)) for v in (self.threshold, self.clear)):
+            raise ValueError(f"rule {self.name!r}: {self.kind} and clear must be numbers")
+
+        self.duration = float(spec.get("for", 0))
+        self.cooldown = float(spec.get("cooldown", 0))
+        self.action = check_action(spec.get("action"), self.name)
+        self.release = check_action(spec.get("release"), self.name)
+        if self.action is None:
+            raise ValueError(f"rule {self.name!r}: action is required")
+
+        self.aggregate = spec.get("aggregate")
+        self.stats = None
+        if "window" in spec:
+            if self.aggregate not in AGGREGATES or self.kind == "equals":
+                raise ValueError(f"rule {self.name!r}: a window needs a numeric condition and "
+                                 f"an aggregate ({', '.join(AGGREGATES)})")
+            self.stats = RollingStats(float(spec["window"]), capacity=RULE_WINDOW_SAMPLES)
+
+        self.first = None  # time of the first sample; windows are only tested once full
+        self.active = False
+        self.since = None  # time the condition started holding
+        self.last_fired = None
+
+    def read(self, snapshot):
+        if self.metric.startswith("hwmon."):
+            return (snapshot.get("hwmon") or {}).get(self.metric[len("hwmon."):])
+        return snapshot.get(self.metric)
+
+    def holds(self, value):
+        if self.kind == "above":
+            return value > self.threshold
+        if self.kind == "below":
+            return value < self.threshold
+        return value == self.threshold
+
+    def cleared(self, value):
+        if self.kind == "above":
+            return value <= self.clear
+        if self.kind == "below":
+            return value >= self.clear
+        return value != self.threshold
+
+    def update(self, now, snapshot):
+        """"fire", "release" or None for the next sample"""
+        value = self.read(snapshot)
+        if value is None:
+            return None
+        if self.stats is not None:
+            self.stats.add(now, float(value))
+            if self.first is None:
+                self.first = now
+            if now - self.first < self.stats.window:
+                return None
+            value = getattr(self.stats, self.aggregate)()
+
+        if self.active:
+            if self.cleared(value):
+                self.active = False
+                self.since = None
+                return "release"
+            return None
+
+        if not self.holds(value):
+            self.since = None
+            return None
+        if self.since is None:
+            self.since = now
+        if now - self.since < self.duration:
+            return None
+        if self.last_fired is not None and now - self.last_fired < self.cooldown:
+            return None
+        self.active = True
+        self.last_fired = now
+        return "fire"
+
+    def condition(self):
+        window = f" ({self.aggregate} over {self.stats.window:g} s)" if self.stats is not None else ""
+        held = f" for {self.duration:g} s" if self.duration else ""
+        symbol = {"above": ">", "below": "<", "equals": "="}[self.kind]
+        return f"{self.metric}{window} {symbol} {self.threshold}{held}"
+
+
+class RuleEngine:
+    """Evaluates every rule on each snapshot and reports fired/released rules.
+
+    on_event(message) is called on the sampling thread, so it must only
+    queue work. message is a JSON-friendly dict with the rule name, the
+    event ("fire" or "release"), a description and the action to run
+    (None for a release without one).
+    """
+
+    def __init__(self, rules, on_event):
+        self.rules = list(rules)
+        self.on_event = on_event
+
+    def evaluate(self, snapshot, sources=SOURCES):
+        """Update the rules whose metric was re-read from one of `sources`"""
+        now = snapshot["time"]
+        for rule in list(self.rules):
+            if rule.source not in sources:
+                continue
+            try:
+                event = rule.update(now, snapshot)
+            except Exception as e:
+                print(f"Rule {rule.name!r} failed and is disabled: {e}", file=sys.stderr)
+                self.rules.remove(rule)
+                continue
+            if event is None:
+                continue
+            action = rule.action if event == "fire" else rule.release
+            if event == "fire":
+                text = f"{rule.name}: {rule.condition()} → {describe_action(action)}"
+            else:
+                text = f"{rule.name}: cleared" + (f" → {describe_action(action)}" if action else "")
+            self.on_event({"rule": rule.name, "event": event, "time": now, "message": text,
+                           "action": action})
+
+
+def load_rules(path):
+    """Rules from a JSON file; raises OSError or ValueError"""
+    with open(path) as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected a list of rules")
+    return [Rule(spec) for spec in specs]
@@ -0,0 +1,141 @@
+import queue
+import sys
+import threading
+import time
+
+from profiler import timed
+from scheduler import SOURCES, AdaptiveScheduler
+from sysfs import PowerSupplyWatcher
+
+# Starting interval of each source, and the fixed interval when not adaptive (seconds)
+SAMPLE_INTERVAL = 1.0
+
+# Number of snapshots kept for the UI before the oldest are dropped
+SNAPSHOT_QUEUE_SIZE = 4
+
+# Sources re-read right away when the UI becomes visible again
+FOREGROUND_SOURCES = ("ec", "battery", "cpus")
+
+
+class SensorCollector(threading.Thread):
+    """Background thread that samples a sensor backend into a snapshot queue.
+
+    Every process spawn (clevo-fancontrol, systemctl, ryzenadj) happens on
+    this thread, so the Tk main loop never waits on a slow EC or PAM stack.
+    An AdaptiveScheduler decides which sources are read on each wakeup;
+    backends with a fixed interval of their own (trace replay) are sampled
+    whole, at the time their next_due() asks for.
+
+    For live backends, power_supply uevents (AC plugged or unplugged)
+    trigger an immediate battery read. An optional RuleEngine is evaluated
+    on every merged snapshot, for the sources that were just read.
+    """
+
+    def __init__(self, backend, interval=SAMPLE_INTERVAL, on_snapshot=None, recorder=None,
+                 profiler=None, adaptive=True, rules=None):
+        super().__init__(name="sensor-collector", daemon=True)
+        self.backend = backend
+        self.interval = backend.interval or interval
+        self.scheduler = AdaptiveScheduler(self.interval,
+                                           adaptive=adaptive and backend.interval is None)
+        self.current = None  # latest merged snapshot
+        self.on_snapshot = on_snapshot  # called from this thread after each publish
+        self.recorder = recorder  # optional TraceRecorder
+        self.profiler = profiler  # optional Profiler, also handed to the backend
+        self.rules = rules  # optional RuleEngine
+        backend.profiler = profiler
+        self.snapshots = queue.Queue(maxsize=SNAPSHOT_QUEUE_SIZE)
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    def sample(self, sources):
+        """Read the due sources and merge them into the latest snapshot, or None at the end"""
+        fields = self.backend.read(sources)
+        if fields is None:
+            return None
+        snapshot = dict(self.current or {})
+        snapshot.update(fields)
+        snapshot["time"] = fields.get("time", time.time())  # replayed records keep their own
+        self.current = snapshot
+        return snapshot
+
+    def refresh(self, sources=SOURCES):
+        """Read these sources now instead of at their next scheduled time"""
+        self.scheduler.refresh(sources)
+        self._wake_event.set()
+
+    def set_background(self, background):
+        """Sample at the low-power cadence while nothing shows the data"""
+        self.scheduler.background = background
+        if not background:
+            self.refresh(FOREGROUND_SOURCES)
+
+    def publish(self, snapshot):
+        """Queue a snapshot, dropping the oldest one if the UI fell behind"""
+        while True:
+            try:
+                self.snapshots.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self.snapshots.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def notify(self):
+        if self.on_snapshot is not None:
+            self.on_snapshot()
+
+    def latest(self):
+        """Drain the queue and return the newest snapshot, or None"""
+        snapshot = None
+        while True:
+            try:
+                snapshot = self.snapshots.get_nowait()
+            except queue.Empty:
+                return snapshot
+
+    def run(self):
+        watcher = None
+        if self.backend.live:
+            watcher = PowerSupplyWatcher.start_watching(lambda: self.refresh(["battery"]))
+        try:
+            self.sample_loop()
+        finally:
+            if watcher is not None:
+                watcher.close()
+
+    def sample_loop(self):
+        scheduled = None
+        while not self._stop_event.is_set():
+            now = time.perf_counter()
+            sources = self.scheduler.due(now)
+            if sources:
+                if scheduled is not None and self.profiler is not None:
+                    self.profiler.tick("sample", scheduled)
+                with timed(self.profiler, "sample"):
+                    snapshot = self.sample(sources)
+                if snapshot is None:
+                    break  # a finite backend (replay without loop) ran out
+                self.scheduler.update(now, sources, snapshot)
+                due = self.backend.next_due()
+                if due is not None:
+                    self.scheduler.schedule(due)
+                if self.rules is not None:
+                    with timed(self.profiler, "rules"):
+                        try:
+                            self.rules.evaluate(snapshot, sources)
+                        except Exception as e:  # a rule must never stop sampling
+                            print(f"Rule evaluation failed: {e}", file=sys.stderr)
+                if self.recorder is not None:
+                    self.recorder.write(snapshot)
+                self.publish(snapshot)
+                self.notify()
+
+            scheduled = self.scheduler.next_wakeup()
+            self._wake_event.wait(max(0.0, scheduled - time.perf_counter()))
+            self._wake_event.clear()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
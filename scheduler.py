@@ -0,0 +1,134 @@
+"""Per-source adaptive sampling cadence for the SensorCollector.
+
+Each source of a snapshot is polled on its own timer:
+
+- "ec" (temp, rpm, duty) and "battery" (power, status, hwmon) drop to their
+  fastest interval when the temperature slope or the power step crosses a
+  threshold, and back off exponentially towards their slowest interval
+  while readings stay flat
+- "cpus" (per-core utilization, frequency, governor) runs every second
+- "services" (systemctl) and "ryzenadj" (PPT limits) run on slow fixed
+  cadences, refreshed early only when requested after an action
+
+While the battery is discharging the fastest rate is capped and the slow
+ceilings are stretched further, so a quiet machine on battery is barely
+polled. While no window shows the data (background) the fastest rate is
+capped further and the discharging ceilings apply.
+"""
+
+# Snapshot fields read by each source
+SOURCE_FIELDS = {
+    "ec": ("temp", "rpm", "duty"),
+    "battery": ("power", "battery_status", "hwmon"),
+    "cpus": ("cpus",),
+    "services": ("clevo_active", "cpufreq_active"),
+    "ryzenadj": ("ppt_limits",),
+}
+
+SOURCES = tuple(SOURCE_FIELDS)
+
+# Per-source (fastest, slowest, slowest while discharging) intervals in seconds
+SOURCE_INTERVALS = {
+    "ec": (0.25, 4.0, 8.0),
+    "battery": (0.5, 4.0, 8.0),
+    "cpus": (1.0, 1.0, 4.0),
+    "services": (10.0, 10.0, 30.0),
+    "ryzenadj": (15.0, 15.0, 60.0),
+}
+
+# Fastest interval of any source while discharging
+BATTERY_MIN_INTERVAL = 1.0
+
+# Fastest interval of any source while in the background (GUI hidden)
+BACKGROUND_MIN_INTERVAL = 2.0
+
+# Readings that switch a source to its fastest interval: |dT/dt| in °C/s
+# for the EC and |ΔP| in W between two battery reads
+TEMP_SLOPE_THRESHOLD = 1.0
+POWER_DELTA_THRESHOLD = 3.0
+
+
+class AdaptiveScheduler:
+    """Decides which sources are due and when to sample next.
+
+    Times are time.perf_counter() values. With adaptive=False every source
+    is read together every base_interval seconds.
+    """
+
+    def __init__(self, base_interval=1.0, adaptive=True, intervals=SOURCE_INTERVALS):
+        self.adaptive = adaptive
+        self.limits = intervals
+        self.base_interval = base_interval
+        self.intervals = {}
+        for source in SOURCES:
+            fastest, slowest, _ = intervals[source]
+            self.intervals[source] = min(max(base_interval, fastest), slowest)
+        self.next_due = {source: 0.0 for source in SOURCES}
+        self.last = {}  # source -> (time, value) of the previous adaptive reading
+        self.discharging = False
+        self.background = False  # set while nothing is drawn from the samples
+
+    def due(self, now):
+        """Sources whose next read time has come"""
+        return [source for source, due in self.next_due.items() if due <= now]
+
+    def next_wakeup(self):
+        return min(self.next_due.values())
+
+    def schedule(self, at):
+        """Read every source together at `at`, for backends that pace themselves"""
+        for source in self.next_due:
+            self.next_due[source] = at
+
+    def refresh(self, sources=SOURCES):
+        """Read these sources on the next wakeup"""
+        for source in sources:
+            if source in self.next_due:
+                self.next_due[source] = 0.0
+
+    def bounds(self, source):
+        fastest, slowest, battery_slowest = self.limits[source]
+        if self.background:
+            return max(fastest, BACKGROUND_MIN_INTERVAL), battery_slowest
+        if self.discharging:
+            return max(fastest, BATTERY_MIN_INTERVAL), battery_slowest
+        return fastest, slowest
+
+    def changed_fast(self, source, now, snapshot):
+        """Whether the latest reading of a source crossed its threshold"""
+        if source == "ec":
+            value, threshold = snapshot["temp"], TEMP_SLOPE_THRESHOLD
+        elif source == "battery":
+            value, threshold = snapshot["power"], POWER_DELTA_THRESHOLD
+        else:
+            return False
+
+        previous = self.last.get(source)
+        self.last[source] = (now, value)
+        if previous is None:
+            return False
+        then, old = previous
+        if source == "ec":
+            return now > then and abs(value - old) / (now - then) >= threshold
+        return abs(value - old) >= threshold
+
+    def update(self, now, sources, snapshot):
+        """Adjust the cadence of the sources just read from the merged snapshot"""
+        if not self.adaptive:
+            for source in sources:
+                self.next_due[source] = now + self.base_interval
+            return
+
+        self.discharging = snapshot.get("battery_status") == "Discharging"
+        for source in sources:
+            fastest, slowest = self.bounds(source)
+            if self.changed_fast(source, now, snapshot):
+                interval = fastest
+            else:
+                interval = self.intervals[source] * 2
+            self.intervals[source] = interval = min(max(interval, fastest), slowest)
+            self.next_due[source] = now + interval
+
+    def summary(self):
+        """Current interval of every source"""
+        return dict(self.intervals) if self.adaptive else {s: self.base_interval for s in SOURCES}
@@ -0,0 +1,226 @@
+import subprocess
+import json
+import os
+import errno
+import re
+import time
+
+# Path to the clevo-fancontrol binary
+CLEVO_FANCONTROL = "/usr/local/bin/clevo-fancontrol"
+
+# ec_sys debugfs interface (load with `modprobe ec_sys`)
+EC_IO_PATH = "/sys/kernel/debug/ec/ec0/io"
+
+# Clevo EC registers, as used by clevo-fancontrol
+EC_REG_CPU_TEMP = 0x07
+EC_REG_FAN_DUTY = 0xCE
+EC_REG_FAN_RPMS_HI = 0xD0
+EC_REG_FAN_RPMS_LO = 0xD1
+EC_RPM_CONSTANT = 2156220
+
+# Errors that mean the EC was busy and the read is worth retrying
+EC_RETRY_ERRNOS = (errno.EBUSY, errno.EAGAIN, errno.EIO, errno.ETIMEDOUT)
+
+# Battery sysfs directory
+BATTERY_PATH = "/sys/class/power_supply/BAT0"
+
+# Path to the ryzenadj binary used for applying profiles
+RYZENADJ = "/usr/bin/ryzenadj"
+
+# RyzenAdj power profiles: (fast limit mW, slow limit mW, tctl temperature °C)
+RYZENADJ_PROFILES = {
+    "battery": (12000, 8000, 80),
+    "quiet": (20000, 15000, 90),
+    "performance": (30000, 20000, 98),
+}
+
+# Accepted ranges for custom limits: PPT limits in mW, tctl temperature in °C
+RYZENADJ_LIMIT_RANGE = (5000, 54000)
+RYZENADJ_TCTL_RANGE = (60, 100)
+
+# Services the GUI is allowed to start and stop
+MANAGED_SERVICES = ("clevo-fancontrol", "auto-cpufreq")
+
+
+def get_sensor_values():
+    """Get sensor values from clevo-fancontrol"""
+    try:
+        output = subprocess.check_output(
+            ["sudo", CLEVO_FANCONTROL],
+            text=True,
+            stderr=subprocess.DEVNULL
+        ).strip()
+        return parse_sensor_output(output)
+    except:
+        return 0, 0, 0
+
+
+def parse_sensor_output(output):
+    """Parse clevo-fancontrol output into (temp, rpm, duty)"""
+    lines = output.split('\n')
+    cleaned_lines = [line for line in lines if 'wait_ec error' not in line]
+    cleaned_output = '\n'.join(cleaned_lines)
+
+    try:
+        data = json.loads(cleaned_output)
+    except json.JSONDecodeError:
+        duty_match = re.search(r'"duty":\s*(\d+)', output)
+        rpms_match = re.search(r'"rpms":\s*(\d+)', output)
+        temp_match = re.search(r'"cpu_temp_cels":\s*(\d+)', output)
+
+        duty = int(duty_match.group(1)) if duty_match else 0
+        rpms = int(rpms_match.group(1)) if rpms_match else 0
+        temp = int(temp_match.group(1)) if temp_match else 0
+
+        return temp, rpms, duty
+
+    return data.get("cpu_temp_cels", 0), data.get("rpms", 0), data.get("duty", 0)
+
+
+class ECReader:
+    """Reads fan and temperature registers straight from the embedded controller.
+
+    The EC file is opened once and only the needed registers are fetched
+    with os.pread, so a sample costs a few syscalls instead of a sudo and
+    clevo-fancontrol spawn. Works against any 256-byte EC image, such as a
+    file written with make_ec_image().
+    """
+
+    def __init__(self, path=EC_IO_PATH, retries=3, backoff=0.002):
+        self.path = path
+        self.retries = retries
+        self.backoff = backoff
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def read_registers(self, offset, count):
+        """Read count bytes at offset, retrying with exponential backoff while the EC is busy"""
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                data = os.pread(self.fd, count, offset)
+                if len(data) == count:
+                    return data
+                error = OSError(errno.EIO, f"short EC read at 0x{offset:02x}")
+            except OSError as e:
+                if e.errno not in EC_RETRY_ERRNOS:
+                    raise
+                error = e
+            if attempt < self.retries:
+                time.sleep(delay)
+                delay *= 2
+        raise error
+
+    def read(self):
+        """Return (temp, rpm, duty) like get_sensor_values"""
+        temp = self.read_registers(EC_REG_CPU_TEMP, 1)[0]
+        # Duty and both RPM bytes sit in one 4-byte window (0xCE-0xD1)
+        fan = self.read_registers(EC_REG_FAN_DUTY, EC_REG_FAN_RPMS_LO - EC_REG_FAN_DUTY + 1)
+        duty = round(fan[0] * 100 / 255)
+        raw_rpm = (fan[EC_REG_FAN_RPMS_HI - EC_REG_FAN_DUTY] << 8) | fan[EC_REG_FAN_RPMS_LO - EC_REG_FAN_DUTY]
+        rpm = EC_RPM_CONSTANT // raw_rpm if raw_rpm > 0 else 0
+        return temp, rpm, duty
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def make_ec_image(temp, rpm, duty):
+    """Build a 256-byte EC image with the given readings, for testing ECReader"""
+    image = bytearray(256)
+    image[EC_REG_CPU_TEMP] = temp
+    image[EC_REG_FAN_DUTY] = round(duty * 255 / 100)
+    raw_rpm = EC_RPM_CONSTANT // rpm if rpm > 0 else 0
+    image[EC_REG_FAN_RPMS_HI] = raw_rpm >> 8
+    image[EC_REG_FAN_RPMS_LO] = raw_rpm & 0xFF
+    return bytes(image)
+
+
+def get_battery_power():
+    """Get battery power consumption"""
+    try:
+        with open(f'{BATTERY_PATH}/status', 'r') as f:
+            status = f.read().strip()
+
+        try:
+            with open(f'{BATTERY_PATH}/current_now', 'r') as f:
+                current_ua = int(f.read().strip())
+        except:
+            current_ua = 0
+
+        try:
+            with open(f'{BATTERY_PATH}/voltage_now', 'r') as f:
+                voltage_uv = int(f.read().strip())
+        except:
+            voltage_uv = 0
+
+        power_w = (current_ua / 1000000.0) * (voltage_uv / 1000000.0)
+        return power_w, status
+    except:
+        return 0, "Unknown"
+
+
+def get_service_active(service):
+    """Return True if the systemd service is active, None if unknown"""
+    try:
+        result = subprocess.run(["systemctl", "is-active", service],
+                                capture_output=True, text=True)
+        return result.stdout.strip() == "active"
+    except:
+        return None
+
+
+def parse_ryzenadj_info(output):
+    """Parse PPT FAST/SLOW limits from `ryzenadj --info` output"""
+    fast_match = re.search(r'PPT LIMIT FAST\s+\|\s+(\d+\.\d+)', output)
+    slow_match = re.search(r'PPT LIMIT SLOW\s+\|\s+(\d+\.\d+)', output)
+
+    if fast_match and slow_match:
+        return float(fast_match.group(1)), float(slow_match.group(1))
+    return None
+
+
+def parse_ryzenadj_limits(output):
+    """(fast mW, slow mW, tctl °C) from `ryzenadj --info` output, as the limits command takes them"""
+    limits = parse_ryzenadj_info(output)
+    tctl_match = re.search(r'THM LIMIT CORE\s+\|\s+(\d+\.\d+)', output)
+    if limits is None or tctl_match is None:
+        return None
+    fast, slow = limits
+    return round(fast * 1000), round(slow * 1000), round(float(tctl_match.group(1)))
+
+
+def get_ryzenadj_limits():
+    """Get the current (fast, slow) PPT limits in watts, or None"""
+    try:
+        result = subprocess.run(["sudo", "ryzenadj", "--info"],
+                                capture_output=True, text=True)
+        if result.returncode == 0:
+            return parse_ryzenadj_info(result.stdout)
+    except:
+        pass
+    return None
+
+
+def ryzenadj_profile_args(profile):
+    """ryzenadj arguments that apply one of RYZENADJ_PROFILES"""
+    return ryzenadj_limit_args(*RYZENADJ_PROFILES[profile])
+
+
+def ryzenadj_limit_args(fast, slow, tctl):
+    """ryzenadj arguments for PPT limits in mW and a tctl temperature in °C"""
+    return [f"--slow-limit={slow}", f"--fast-limit={fast}", f"--tctl-temp={tctl}"]
+
+
+def check_ryzenadj_limits(fast, slow, tctl):
+    """Raise ValueError unless the limits are integers inside the accepted ranges"""
+    low, high = RYZENADJ_LIMIT_RANGE
+    for name, value in (("fast", fast), ("slow", slow)):
+        if not isinstance(value, int) or not low <= value <= high:
+            raise ValueError(f"{name} limit must be an integer {low}-{high} mW: {value}")
+    if slow > fast:
+        raise ValueError(f"slow limit {slow} mW is above the fast limit {fast} mW")
+    low, high = RYZENADJ_TCTL_RANGE
+    if not isinstance(tctl, int) or not low <= tctl <= high:
+        raise ValueError(f"tctl must be an integer {low}-{high} °C: {tctl}")
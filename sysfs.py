@@ -0,0 +1,347 @@
+import os
+import socket
+import threading
+
+import numpy as np
+
+# hwmon drivers whose temperatures are shown as extra metrics
+HWMON_DRIVERS = ("k10temp", "amdgpu", "nvme", "acpitz")
+
+# Largest value we expect from a single sysfs attribute
+READ_SIZE = 64
+
+# Initial /proc/stat read buffer in bytes; doubled whenever a read fills it
+PROC_STAT_SIZE = 16384
+
+# Kernel uevent netlink protocol and its multicast group (what udev listens to)
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+
+
+class SysfsReader:
+    """Batched reader for battery and hwmon attributes.
+
+    Sensors are discovered once at startup and their files kept open; each
+    sample re-reads every descriptor with os.pread(fd, n, 0) in one pass
+    instead of opening and closing files every tick. Pass a different
+    sysfs_root to run against a fake sysfs tree.
+    """
+
+    def __init__(self, sysfs_root="/sys"):
+        self.sysfs_root = sysfs_root
+        self.battery = None  # name of the discovered battery
+        self.battery_fds = {}  # attribute -> fd
+        self.hwmon_fds = {}  # metric label -> fd
+        self.package_energy_fd = None  # powercap package-0 energy_uj
+        self.package_energy_range = None  # µJ at which the counter wraps
+        self.discover_battery()
+        self.discover_hwmon()
+        self.discover_powercap()
+
+    def open_attribute(self, path):
+        try:
+            return os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+
+    def read_attribute(self, fd):
+        try:
+            return os.pread(fd, READ_SIZE, 0).decode(errors="replace").strip()
+        except OSError:
+            return None
+
+    def discover_battery(self):
+        """Find the first power_supply of type Battery (not necessarily BAT0)"""
+        root = os.path.join(self.sysfs_root, "class", "power_supply")
+        try:
+            supplies = sorted(os.listdir(root))
+        except OSError:
+            return
+
+        for supply in supplies:
+            path = os.path.join(root, supply)
+            try:
+                with open(os.path.join(path, "type")) as f:
+                    if f.read().strip() != "Battery":
+                        continue
+            except OSError:
+                continue
+
+            # Some firmware exposes power_now instead of current_now/voltage_now
+            for attribute in ("status", "power_now", "current_now", "voltage_now"):
+                fd = self.open_attribute(os.path.join(path, attribute))
+                if fd is not None:
+                    self.battery_fds[attribute] = fd
+            self.battery = supply
+            return
+
+    def discover_hwmon(self):
+        """Find temperature inputs of the known hwmon drivers"""
+        root = os.path.join(self.sysfs_root, "class", "hwmon")
+        try:
+            devices = sorted(os.listdir(root), key=lambda d: (len(d), d))
+        except OSError:
+            return
+
+        for device in devices:
+            path = os.path.join(root, device)
+            try:
+                with open(os.path.join(path, "name")) as f:
+                    name = f.read().strip()
+            except OSError:
+                continue
+            if name not in HWMON_DRIVERS:
+                continue
+
+            inputs = sorted(f for f in os.listdir(path)
+                            if f.startswith("temp") and f.endswith("_input"))
+            for temp_input in inputs:
+                channel = temp_input[:-len("_input")]
+                try:
+                    with open(os.path.join(path, f"{channel}_label")) as f:
+                        label = f.read().strip()
+                except OSError:
+                    label = channel
+
+                metric = f"{name} {label}"
+                if metric in self.hwmon_fds:
+                    metric = f"{name} {label} ({device})"
+                fd = self.open_attribute(os.path.join(path, temp_input))
+                if fd is not None:
+                    self.hwmon_fds[metric] = fd
+
+    def discover_powercap(self):
+        """Find the CPU package energy counter (RAPL, also exposed for AMD Ryzen)"""
+        root = os.path.join(self.sysfs_root, "class", "powercap")
+        try:
+            zones = sorted(os.listdir(root))
+        except OSError:
+            return
+
+        for zone in zones:
+            path = os.path.join(root, zone)
+            try:
+                with open(os.path.join(path, "name")) as f:
+                    if f.read().strip() != "package-0":
+                        continue
+                with open(os.path.join(path, "max_energy_range_uj")) as f:
+                    energy_range = int(f.read().strip())
+            except (OSError, ValueError):
+                continue
+            fd = self.open_attribute(os.path.join(path, "energy_uj"))
+            if fd is None:
+                continue
+            # energy_uj is root-only on most kernels
+            if not self.read_attribute(fd):
+                os.close(fd)
+                continue
+            self.package_energy_fd = fd
+            self.package_energy_range = energy_range
+            return
+
+    def sensor_names(self):
+        return list(self.hwmon_fds)
+
+    def read_battery(self):
+        """Return (power_w, status) like get_battery_power"""
+        if self.battery is None:
+            return 0, "Unknown"
+
+        values = {attribute: self.read_attribute(fd) for attribute, fd in self.battery_fds.items()}
+        status = values.get("status") or "Unknown"
+        try:
+            if values.get("power_now"):
+                power_w = int(values["power_now"]) / 1000000.0
+            else:
+                current_ua = int(values.get("current_now") or 0)
+                voltage_uv = int(values.get("voltage_now") or 0)
+                power_w = (current_ua / 1000000.0) * (voltage_uv / 1000000.0)
+        except ValueError:
+            power_w = 0
+        return power_w, status
+
+    def read_battery_power(self):
+        """Battery power in W, without reading status; for high-rate sampling"""
+        fds = self.battery_fds
+        try:
+            if "power_now" in fds:
+                return int(self.read_attribute(fds["power_now"]) or 0) / 1000000.0
+            if "current_now" in fds and "voltage_now" in fds:
+                current_ua = int(self.read_attribute(fds["current_now"]) or 0)
+                voltage_uv = int(self.read_attribute(fds["voltage_now"]) or 0)
+                return (current_ua / 1000000.0) * (voltage_uv / 1000000.0)
+        except ValueError:
+            pass
+        return 0.0
+
+    def read_hwmon(self):
+        """Return {metric: °C} for every discovered temperature"""
+        temps = {}
+        for metric, fd in self.hwmon_fds.items():
+            value = self.read_attribute(fd)
+            try:
+                temps[metric] = int(value) / 1000.0
+            except (TypeError, ValueError):
+                temps[metric] = None
+        return temps
+
+    def read_package_energy(self):
+        """CPU package energy counter in µJ, or None if unavailable"""
+        if self.package_energy_fd is None:
+            return None
+        try:
+            return int(self.read_attribute(self.package_energy_fd))
+        except (TypeError, ValueError):
+            return None
+
+    def close(self):
+        for fd in list(self.battery_fds.values()) + list(self.hwmon_fds.values()):
+            os.close(fd)
+        if self.package_energy_fd is not None:
+            os.close(self.package_energy_fd)
+            self.package_energy_fd = None
+        self.battery_fds = {}
+        self.hwmon_fds = {}
+
+
+class CpuReader:
+    """Per-core utilization, current frequency and cpufreq governor.
+
+    Utilization is the busy share of the /proc/stat jiffies since the
+    previous read. /proc/stat and every core's scaling_cur_freq and
+    scaling_governor stay open; each read is one pread per file into
+    reused buffers, so a refresh costs the same on the 100th tick as on
+    the first.
+    """
+
+    def __init__(self, sysfs_root="/sys", proc_root="/proc"):
+        self.stat_fd = None
+        self.buffer = bytearray(PROC_STAT_SIZE)
+        self.cores = []  # core numbers, in /proc/stat order
+        self.freq_fds = []  # per core, or None without cpufreq
+        self.governor_fds = []
+        try:
+            self.stat_fd = os.open(os.path.join(proc_root, "stat"), os.O_RDONLY)
+        except OSError:
+            return
+
+        self.cores = [core for core, _ in self.read_stat()]
+        self.index = {core: i for i, core in enumerate(self.cores)}
+        cpu_root = os.path.join(sysfs_root, "devices", "system", "cpu")
+        for core in self.cores:
+            path = os.path.join(cpu_root, f"cpu{core}", "cpufreq")
+            self.freq_fds.append(self.open_attribute(os.path.join(path, "scaling_cur_freq")))
+            self.governor_fds.append(self.open_attribute(os.path.join(path, "scaling_governor")))
+
+        # Busy and total jiffies per core at the previous read
+        self.busy = np.zeros(len(self.cores))
+        self.total = np.zeros(len(self.cores))
+        self.counters = np.zeros((len(self.cores), 2))
+        self.read()  # prime the counters; the first utilization is since boot
+
+    open_attribute = SysfsReader.open_attribute
+    read_attribute = SysfsReader.read_attribute
+
+    def read_stat(self):
+        """(core, fields) for every "cpuN" line of /proc/stat"""
+        while True:
+            size = os.preadv(self.stat_fd, [self.buffer], 0)
+            if size < len(self.buffer):
+                break
+            self.buffer = bytearray(2 * len(self.buffer))
+        lines = []
+        for line in bytes(memoryview(self.buffer)[:size]).split(b"\n"):
+            if line.startswith(b"cpu") and line[3:4].isdigit():
+                fields = line.split()
+                lines.append((int(fields[0][3:]), fields[1:]))
+        return lines
+
+    def read(self):
+        """{"util": [%], "mhz": [MHz], "governor": [name]} per core; None entries when unknown"""
+        if self.stat_fd is None:
+            return None
+        seen = np.zeros(len(self.cores), dtype=bool)
+        for core, fields in self.read_stat():
+            i = self.index.get(core)
+            if i is None:
+                continue
+            # user nice system idle iowait irq softirq steal
+            values = [int(v) for v in fields[:8]]
+            idle = values[3] + values[4]
+            total = sum(values)
+            self.counters[i] = (total - idle, total)
+            seen[i] = True
+
+        delta_busy = self.counters[:, 0] - self.busy
+        delta_total = self.counters[:, 1] - self.total
+        self.busy[:] = self.counters[:, 0]
+        self.total[:] = self.counters[:, 1]
+        util = np.divide(100.0 * delta_busy, delta_total, out=np.zeros(len(self.cores)),
+                         where=delta_total > 0)
+
+        mhz = []
+        governors = []
+        for fd, governor_fd in zip(self.freq_fds, self.governor_fds):
+            value = self.read_attribute(fd) if fd is not None else None
+            mhz.append(int(value) // 1000 if value and value.isdigit() else None)
+            governors.append(self.read_attribute(governor_fd) if governor_fd is not None else None)
+        return {
+            "util": [round(float(u), 1) if ok else None for u, ok in zip(util, seen)],
+            "mhz": mhz,
+            "governor": governors,
+        }
+
+    def close(self):
+        for fd in self.freq_fds + self.governor_fds + [self.stat_fd]:
+            if fd is not None:
+                os.close(fd)
+        self.stat_fd = None
+        self.freq_fds = []
+        self.governor_fds = []
+
+
+class PowerSupplyWatcher(threading.Thread):
+    """Calls on_change() whenever the kernel sends a power_supply uevent.
+
+    AC adapters and batteries announce plug/unplug and charging state
+    changes over the kobject uevent netlink socket, so listening there
+    notices them immediately instead of at the next battery poll. sysfs
+    attributes do not raise inotify events, so there is nothing to watch
+    on the files themselves.
+    """
+
+    def __init__(self, on_change):
+        super().__init__(name="power-supply-watcher", daemon=True)
+        self.on_change = on_change
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        try:
+            self.sock.bind((0, UEVENT_KERNEL_GROUP))
+        except OSError:
+            self.sock.close()
+            raise
+
+    @classmethod
+    def start_watching(cls, on_change):
+        """A running watcher, or None where uevents are not available"""
+        try:
+            watcher = cls(on_change)
+        except (OSError, AttributeError):  # AttributeError: no AF_NETLINK on this platform
+            return None
+        watcher.start()
+        return watcher
+
+    def run(self):
+        while True:
+            try:
+                message = self.sock.recv(16384)
+            except OSError:
+                return  # closed
+            if b"SUBSYSTEM=power_supply" in message.split(b"\0"):
+                self.on_change()
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
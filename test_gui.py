@@ -0,0 +1,18 @@
+"""Run the monitor with simulated sensor values (no root or Clevo hardware needed)
+
+Usage: python3 test_gui.py [idle|build|gaming|spiky] [speed]
+"""
+import sys
+
+import customtkinter as ctk
+
+from backends import SyntheticSensorBackend
+from main import FanMonitorApp
+
+if __name__ == "__main__":
+    profile = sys.argv[1] if len(sys.argv) > 1 else "build"
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    app = ctk.CTk()
+    monitor = FanMonitorApp(app, backend=SyntheticSensorBackend(profile, time_scale=speed))
+    app.mainloop()
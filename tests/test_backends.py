@@ -0,0 +1,59 @@
+import json
+import time
+
+import pytest
+
+from backends import ReplaySensorBackend, make_snapshot
+from sampler import SensorCollector
+
+# Irregular trace: a burst, a 2 s gap, then regular samples
+TRACE_TIMES = (100.0, 100.1, 100.2, 102.2, 103.2, 104.2)
+
+
+@pytest.fixture
+def trace(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    with open(path, "w") as f:
+        for i, t in enumerate(TRACE_TIMES):
+            f.write(json.dumps(make_snapshot(t, 40 + i, 2000, 30, 10.0, "Discharging")) + "\n")
+    return str(path)
+
+
+def test_replay_keeps_each_record_offset(trace):
+    backend = ReplaySensorBackend(trace, speed=2, loop=False)
+    assert backend.next_due() is None  # the first record is due right away
+    times = []
+    offsets = []
+    while (record := backend.sample()) is not None:
+        times.append(record["time"])
+        if backend.index < len(TRACE_TIMES):
+            offsets.append(backend.next_due() - backend.started[1])
+    expected = [(t - TRACE_TIMES[0]) / 2 for t in TRACE_TIMES]
+    assert [t - times[0] for t in times] == pytest.approx(expected)
+    assert offsets == pytest.approx(expected[1:])
+
+
+def test_looping_replay_restarts_one_spacing_after_the_last_record(trace):
+    backend = ReplaySensorBackend(trace, speed=2)
+    for _ in TRACE_TIMES:
+        backend.sample()
+    last = (TRACE_TIMES[-1] - TRACE_TIMES[0]) / 2
+    assert backend.next_due() - backend.started[1] == pytest.approx(last + backend.interval)
+    assert backend.sample()["temp"] == 40
+
+
+def test_collector_plays_records_at_their_own_times(trace):
+    speed = 20
+    backend = ReplaySensorBackend(trace, speed=speed, loop=False)
+    arrivals = []
+    collector = SensorCollector(backend)
+    collector.on_snapshot = lambda: arrivals.append(time.perf_counter())
+    collector.start()
+    collector.join(timeout=5)
+    assert not collector.is_alive()
+    assert len(arrivals) == len(TRACE_TIMES)
+    gaps = [b - a for a, b in zip(arrivals, arrivals[1:])]
+    wanted = [(b - a) / speed for a, b in zip(TRACE_TIMES, TRACE_TIMES[1:])]
+    # the 2 s gap takes 100 ms, not one median spacing (50 ms)
+    assert gaps[2] == pytest.approx(wanted[2], abs=0.03)
+    assert sum(gaps) == pytest.approx(sum(wanted), abs=0.05)
@@ -0,0 +1,48 @@
+import time
+
+from controller import FAILSAFE_DUTY, FAILSAFE_FAILURES, FanController, FanCurve, simulate
+
+
+class FlakySensor:
+    def __init__(self, temps):
+        self.temps = list(temps)
+
+    def __call__(self):
+        value = self.temps.pop(0) if self.temps else None
+        if value is None:
+            raise OSError("EC read failed")
+        return value
+
+
+def test_repeated_failures_force_full_duty():
+    writes = []
+    controller = FanController(FlakySensor([45]), writes.append, FanCurve(), interval=0.01)
+    controller.start()
+    deadline = time.monotonic() + 2
+    while controller.failures < FAILSAFE_FAILURES + 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    controller.stop()
+    assert writes[0] < FAILSAFE_DUTY
+    assert writes[-1] == FAILSAFE_DUTY
+    assert controller.duty == FAILSAFE_DUTY
+
+
+def test_stop_hands_the_fan_back_at_full_duty():
+    writes = []
+    controller = FanController(lambda: 50, writes.append, FanCurve(), interval=0.01)
+    controller.step(0.01)
+    controller.stop()
+    assert writes == [25, FAILSAFE_DUTY]
+
+
+def test_curve_keeps_simulated_plant_cool():
+    assert simulate(FanCurve(), duration=120)["max_temp"] < 95
+
+
+def test_latency_includes_the_sampling_interval():
+    temps = iter([40, 60])
+    controller = FanController(lambda: next(temps), lambda duty: None, FanCurve(), interval=0.05)
+    controller.step(0.05)
+    time.sleep(0.05)  # the temperature changes somewhere in this interval
+    controller.step(0.05)
+    assert controller.latency.summary()["last_ms"] >= 50
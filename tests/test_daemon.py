@@ -0,0 +1,190 @@
+import json
+import selectors
+import socket
+import threading
+import time
+
+import pytest
+
+import daemon
+from daemon import SnapshotServer, Subscriber
+from fancontrol_helper import FakeBackend, HelperError, HelperServer, LocalHelper
+
+ACTION_BATCH = {"cmd": "batch", "args": {"requests": [
+    {"cmd": "service", "args": {"service": "clevo-fancontrol", "action": "stop"}},
+    {"cmd": "set_duty", "args": {"duty": 0}},
+    {"cmd": "profile", "args": {"name": "battery"}},
+]}}
+
+
+class StubCollector:
+    profiler = None
+    on_snapshot = None
+
+    def refresh(self, sources):
+        pass
+
+    def latest(self):
+        return None
+
+
+@pytest.fixture
+def server():
+    backend = FakeBackend()
+    server = SnapshotServer(StubCollector(), LocalHelper(backend), path="/nonexistent")
+    server.backend = backend
+    yield server
+    server.wakeup_r.close()
+    server.wakeup_w.close()
+
+
+@pytest.fixture
+def local_user(server):
+    """A subscriber connected over a socketpair, seen as an unprivileged local user"""
+    ours, theirs = socket.socketpair()
+    ours.setblocking(False)
+    subscriber = Subscriber(ours)
+    subscriber.uid = 1000
+    server.subscribers[ours.fileno()] = subscriber
+    server.selector.register(ours, selectors.EVENT_READ, subscriber)
+    yield subscriber, theirs
+    ours.close()
+    theirs.close()
+
+
+def response(peer):
+    return json.loads(peer.makefile("r").readline())
+
+
+def test_unprivileged_batch_with_actions_is_refused(server, local_user):
+    subscriber, peer = local_user
+    server.handle(subscriber, json.dumps(dict(ACTION_BATCH, id=7)).encode())
+    reply = response(peer)
+    assert reply["id"] == 7 and not reply["ok"]
+    assert "read commands" in reply["error"]
+    assert server.backend.services["clevo-fancontrol"]
+    assert server.backend.duty is None
+
+
+def test_unprivileged_direct_action_is_refused(server, local_user):
+    subscriber, peer = local_user
+    server.handle(subscriber, b'{"id": 1, "cmd": "set_duty", "args": {"duty": 0}}')
+    assert response(peer)["error"] == "actions not permitted for this user"
+    assert server.backend.duty is None
+
+
+def test_read_batch_is_allowed():
+    subscriber = Subscriber.__new__(Subscriber)
+    subscriber.remote, subscriber.uid = False, 1000
+    server = SnapshotServer.__new__(SnapshotServer)
+    server.allow_actions = False
+    request = {"cmd": "batch", "args": {"requests": [{"cmd": "sensors"}, {"cmd": "ryzenadj_info"}]}}
+    assert server.refusal(subscriber, request) is None
+
+
+def test_root_may_not_batch_actions_either():
+    subscriber = Subscriber.__new__(Subscriber)
+    subscriber.remote, subscriber.uid = False, 0
+    server = SnapshotServer.__new__(SnapshotServer)
+    server.allow_actions = False
+    assert server.refusal(subscriber, ACTION_BATCH) is not None
+    assert server.refusal(subscriber, {"cmd": "profile", "args": {"name": "quiet"}}) is None
+
+
+def test_helper_batch_only_runs_reads():
+    backend = FakeBackend()
+    reply = HelperServer(backend).handle(dict(ACTION_BATCH, id=3))
+    assert not reply["ok"]
+    assert backend.services["clevo-fancontrol"] and backend.duty is None
+    reply = HelperServer(backend).handle({"id": 4, "cmd": "batch", "args": {"requests": [{"cmd": "ping"}]}})
+    assert reply["ok"] and reply["result"][0]["result"] == "pong"
+
+
+def test_nested_batch_is_refused():
+    reply = HelperServer(FakeBackend()).handle(
+        {"cmd": "batch", "args": {"requests": [dict(ACTION_BATCH)]}})
+    assert not reply["ok"]
+
+
+@pytest.mark.parametrize("request_", [
+    ACTION_BATCH,
+    {"cmd": "batch", "args": {"requests": [{"cmd": "sensors"}]}},
+    {"cmd": "set_duty", "args": {"duty": 0}},
+    {"cmd": "refresh"},
+    {"cmd": "no_such_command"},
+])
+def test_remote_subscribers_are_limited_to_reads(request_):
+    subscriber = Subscriber.__new__(Subscriber)
+    subscriber.remote, subscriber.uid = True, None
+    server = SnapshotServer.__new__(SnapshotServer)
+    server.allow_actions = True  # never extends to TCP peers
+    assert server.refusal(subscriber, request_) is not None
+    for cmd in ("snapshot", "ping", "sensors"):
+        assert server.refusal(subscriber, {"cmd": cmd}) is None
+
+
+def test_client_reconnects_after_the_daemon_restarts(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "RECONNECT_MIN", 0.01)
+    path = str(tmp_path / "daemon.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+    client = daemon.DaemonClient(path)
+    client.start()
+    first, _ = listener.accept()
+    first.sendall(b'{"type": "snapshot", "snapshot": {"temp": 50}}\nnot json\n')
+    first.close()
+
+    second, _ = listener.accept()  # the client came back on its own
+    second.sendall(b'{"type": "snapshot", "snapshot": {"temp": 60}}\n')
+    temps = []
+    deadline = time.monotonic() + 5
+    while 60 not in temps and time.monotonic() < deadline:
+        snapshot = client.snapshots.get(timeout=5)
+        temps.append(snapshot["temp"])
+    assert temps == [50, 60]  # the bad line was skipped
+    assert client.connected
+    client.stop()
+    second.close()
+    listener.close()
+
+
+def test_requests_fail_while_disconnected(tmp_path):
+    path = str(tmp_path / "daemon.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+    client = daemon.DaemonClient(path)
+    client.start()
+    peer, _ = listener.accept()
+    listener.close()
+    peer.close()
+    deadline = time.monotonic() + 5
+    while client.connected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not client.connected
+    with pytest.raises(HelperError, match="connection lost"):
+        client.request("ping")
+    client.stop()
+
+
+def test_requests_over_the_in_flight_limit_are_refused(server, local_user):
+    subscriber, peer = local_user
+    threads = threading.active_count()
+    for i in range(daemon.MAX_IN_FLIGHT + 1):
+        server.handle(subscriber, json.dumps({"id": i, "cmd": "sensors"}).encode())
+    reply = response(peer)  # workers are not running yet, so only the refusal is sent
+    assert reply["id"] == daemon.MAX_IN_FLIGHT and "too many requests" in reply["error"]
+    assert threading.active_count() == threads
+
+    for worker in server.workers:
+        worker.start()
+    lines = peer.makefile("r")
+    deadline = time.monotonic() + 5
+    while subscriber.in_flight and time.monotonic() < deadline:
+        server.drain_wakeup()
+        time.sleep(0.01)
+    assert subscriber.in_flight == 0
+    replies = [json.loads(lines.readline()) for _ in range(daemon.MAX_IN_FLIGHT)]
+    assert sorted(r["id"] for r in replies) == list(range(daemon.MAX_IN_FLIGHT))
+    assert all(r["ok"] for r in replies)
@@ -0,0 +1,55 @@
+import json
+import socket
+import time
+
+import fleet
+from fleet import FleetMonitor, FleetSource, parse_source
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_unresolvable_host_fails_without_stopping_the_loop(monkeypatch, tmp_path):
+    def unknown(host, port, *args, **kwargs):
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+
+    monkeypatch.setattr(fleet.socket, "getaddrinfo", unknown)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(tmp_path / "good.sock"))
+    listener.listen()
+    bad = FleetSource(*parse_source("bad=nonexistent.invalid:9878"))
+    good = FleetSource("good", str(tmp_path / "good.sock"))
+    monitor = FleetMonitor([bad, good])
+    monitor.start()
+    try:
+        assert wait_for(lambda: bad.error is not None)
+        assert "not known" in bad.error and not bad.connected
+        peer, _ = listener.accept()
+        peer.sendall((json.dumps({"type": "snapshot", "snapshot": {"temp": 50, "power": 9.0}})
+                      + "\n").encode())
+        assert wait_for(lambda: good.latest is not None)
+        assert monitor.is_alive()
+        peer.close()
+    finally:
+        monitor.stop()
+        listener.close()
+
+
+def test_tcp_hosts_are_resolved_before_connecting():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+    source = FleetSource(*parse_source(f"local=localhost:{port}"))
+    monitor = FleetMonitor([source])
+    monitor.start()
+    try:
+        assert wait_for(lambda: source.connected)
+        assert source.resolved[1][1] == port
+    finally:
+        monitor.stop()
+        listener.close()
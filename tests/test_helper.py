@@ -0,0 +1,66 @@
+import io
+import json
+import os
+import threading
+
+from fancontrol_helper import FakeBackend, HelperClient, HelperServer, LocalHelper
+
+
+class BlockingBackend(FakeBackend):
+    """FakeBackend whose service actions wait until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def service(self, service, action):
+        self.release.wait(5)
+        return super().service(service, action)
+
+
+def test_reads_are_answered_while_an_action_runs():
+    backend = BlockingBackend()
+    read_fd, write_fd = os.pipe()
+    requests = io.StringIO(
+        json.dumps({"id": 1, "cmd": "service", "args": {"service": "clevo-fancontrol", "action": "stop"}}) + "\n"
+        + json.dumps({"id": 2, "cmd": "sensors"}) + "\n"
+        + json.dumps({"id": 3, "cmd": "batch", "args": {"requests": [{"cmd": "ping"}]}}) + "\n")
+    with os.fdopen(write_fd, "w") as outfile, os.fdopen(read_fd) as responses:
+        server = threading.Thread(target=HelperServer(backend).serve, args=(requests, outfile))
+        server.start()
+        first = {json.loads(responses.readline())["id"], json.loads(responses.readline())["id"]}
+        assert first == {2, 3}
+        backend.release.set()
+        assert json.loads(responses.readline())["id"] == 1
+        server.join(5)
+
+
+def test_local_helper_reads_do_not_wait_for_actions():
+    backend = BlockingBackend()
+    helper = LocalHelper(backend)
+    action = threading.Thread(target=helper.request, args=("service",),
+                              kwargs={"service": "clevo-fancontrol", "action": "stop"})
+    action.start()
+    try:
+        assert helper.request("ping") == "pong"
+        assert helper.request("set_duty", duty=50) == 0
+    finally:
+        backend.release.set()
+        action.join(5)
+
+
+def test_client_matches_concurrent_responses():
+    client = HelperClient(fake=True)
+    client.start()
+    try:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.request("ping")))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert results == ["pong"] * 8
+        assert client.batch(("sensors", {}), ("ping", {}))[1] == "pong"
+    finally:
+        client.close()
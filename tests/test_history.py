@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from history import TIERS, HistoryStore
+
+START = 1_700_000_000.0  # a multiple of every tier resolution
+
+
+def fill(history, seconds, rate=4, value=lambda t: t):
+    """`rate` samples per second for `seconds`, the temperature following value(t)"""
+    for i in range(int(seconds * rate)):
+        t = START + i / rate
+        history.append(t, (value(t - START), 2000, 40, 10))
+
+
+def test_tier0_buckets_fast_samples_to_one_second():
+    history = HistoryStore()
+    fill(history, 10, rate=4)
+    records = history.records(0)
+    assert len(records) == 10
+    np.testing.assert_array_equal(records["time"], START + np.arange(10))
+    # 4 samples per bucket at t, t+0.25, t+0.5, t+0.75
+    np.testing.assert_allclose(records["min"][:, 0], np.arange(10))
+    np.testing.assert_allclose(records["max"][:, 0], np.arange(10) + 0.75)
+    np.testing.assert_allclose(records["mean"][:, 0], np.arange(10) + 0.375)
+
+
+def test_tier0_covers_an_hour_at_any_sample_rate():
+    history = HistoryStore()
+    fill(history, 3600, rate=4)
+    oldest, newest = history.span(0)
+    assert newest - oldest == pytest.approx(3598)  # the last second is still pending
+    assert history.tier_for_window(300) == 0
+
+
+def test_rollup_tiers_and_ring_wraparound():
+    history = HistoryStore()
+    seconds = TIERS[0][1] + 600  # tier 0 wraps after an hour
+    fill(history, seconds, rate=1)
+    assert int(history.header["count"][0][0]) == TIERS[0][1]
+    records = history.records(0)
+    assert np.all(np.diff(records["time"]) == 1)
+    assert records["time"][-1] == START + seconds - 1
+
+    tens = history.records(1)
+    assert np.all(np.diff(tens["time"]) == 10)
+    np.testing.assert_allclose(tens["mean"][0, 0], 4.5)  # mean of 0..9
+    np.testing.assert_allclose(tens["max"][0, 0], 9)
+
+
+def test_between_uses_the_finest_tier_holding_the_start():
+    history = HistoryStore()
+    fill(history, TIERS[0][1] + 600, rate=1)
+    newest = history.span(0)[1]
+    tier, records = history.between(newest - 60, newest)
+    assert tier == 0 and len(records) >= 60
+    tier, records = history.between(START + 10, newest)
+    assert tier == 1
+
+
+def test_file_is_locked_to_one_store(tmp_path):
+    path = tmp_path / "history.bin"
+    first = HistoryStore(str(path))
+    with pytest.raises(OSError):
+        HistoryStore(str(path))
+    first.append(START, (50, 2000, 40, 10))
+    first.close()
+    second = HistoryStore(str(path))
+    assert len(second.records(0)) == 1
+    second.close()
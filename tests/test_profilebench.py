@@ -0,0 +1,41 @@
+from fancontrol_helper import FakeBackend, HelperError, LocalHelper
+from profilebench import apply_limits, may_change_limits, restore_limits
+from sensors import parse_ryzenadj_limits
+
+RYZENADJ_INFO = """\
+|        Name         |   Value   |     Parameter      |
+|---------------------|-----------|--------------------|
+| STAPM LIMIT         |    25.000 | stapm-limit        |
+| PPT LIMIT FAST      |    27.500 | fast-limit         |
+| PPT LIMIT SLOW      |    21.000 | slow-limit         |
+| THM LIMIT CORE      |    93.000 | tctl-temp          |
+"""
+
+
+class RefusingHelper(LocalHelper):
+    """A daemon that serves reads but refuses actions to this user"""
+
+    def request(self, cmd, **args):
+        if cmd in ("limits", "profile"):
+            raise HelperError("actions not permitted for this user")
+        return super().request(cmd, **args)
+
+
+def test_parse_ryzenadj_limits():
+    assert parse_ryzenadj_limits(RYZENADJ_INFO) == (27500, 21000, 93)
+    assert parse_ryzenadj_limits("PPT LIMIT FAST | 27.500 |") is None
+
+
+def test_original_limits_are_restored_exactly():
+    helper = LocalHelper(FakeBackend())
+    restore_limits(helper, (27500, 21000, 93))
+    original = helper.request("ryzenadj_limits")
+    apply_limits(helper, ("battery", 12000, 8000, 80))
+    assert helper.request("ryzenadj_limits") == (12000, 8000, 80)
+    restore_limits(helper, original)
+    assert helper.request("ryzenadj_limits") == (27500, 21000, 93)
+
+
+def test_permission_is_checked_before_the_benchmark():
+    assert may_change_limits(LocalHelper(FakeBackend()))
+    assert not may_change_limits(RefusingHelper(FakeBackend()))
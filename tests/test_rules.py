@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from rules import Rule, RuleEngine, load_rules
+
+
+def snapshot(t, **fields):
+    return dict({"time": float(t), "temp": 50, "rpm": 2000, "battery_status": "Charging",
+                 "hwmon": {}}, **fields)
+
+
+def run(engine, samples):
+    """Feed (time, fields) samples and return the (time, event) of every message"""
+    events = []
+    engine.on_event = lambda message: events.append((message["time"], message["event"]))
+    for t, fields in samples:
+        engine.evaluate(snapshot(t, **fields))
+    return events
+
+
+def test_fires_after_holding_and_releases_at_the_clear_threshold():
+    engine = RuleEngine([Rule({"name": "hot", "metric": "temp", "above": 90, "for": 3, "clear": 85,
+                               "action": {"profile": "quiet"}})], None)
+    temps = [91, 92, 93, 94, 88, 86, 85, 95]
+    events = run(engine, [(t, {"temp": temp}) for t, temp in enumerate(temps)])
+    # holds from t=0, fires at t=3, stays active above the clear threshold, releases at 85
+    assert events == [(3.0, "fire"), (6.0, "release")]
+
+
+def test_a_dip_restarts_the_hold_time():
+    engine = RuleEngine([Rule({"metric": "temp", "above": 90, "for": 2,
+                               "action": {"alert": "hot"}})], None)
+    temps = [91, 92, 80, 91, 92, 93]
+    events = run(engine, [(t, {"temp": temp}) for t, temp in enumerate(temps)])
+    assert events == [(5.0, "fire")]
+
+
+def test_cooldown_suppresses_refiring():
+    engine = RuleEngine([Rule({"metric": "temp", "above": 90, "cooldown": 10,
+                               "action": {"alert": "hot"}})], None)
+    temps = {0: 95, 1: 80, 2: 95, 3: 80, 12: 95}
+    events = run(engine, [(t, {"temp": temp}) for t, temp in temps.items()])
+    assert events == [(0.0, "fire"), (1.0, "release"), (12.0, "fire")]
+
+
+def test_equals_rule_fires_with_release_action():
+    rule = Rule({"name": "unplugged", "metric": "battery_status", "equals": "Discharging",
+                 "action": {"profile": "battery"}, "release": {"profile": "performance"}})
+    messages = []
+    engine = RuleEngine([rule], messages.append)
+    for t, status in enumerate(["Charging", "Discharging", "Discharging", "Charging"]):
+        engine.evaluate(snapshot(t, battery_status=status))
+    assert [(m["event"], m["action"]) for m in messages] == [
+        ("fire", {"profile": "battery"}), ("release", {"profile": "performance"})]
+
+
+def test_window_waits_until_full_and_tests_the_aggregate():
+    engine = RuleEngine([Rule({"metric": "rpm", "below": 1, "window": 5, "aggregate": "max",
+                               "action": {"alert": "Fan stopped"}})], None)
+    rpms = [0, 0, 0, 0, 0, 0, 0, 1200, 0, 0]
+    events = run(engine, [(t, {"rpm": rpm}) for t, rpm in enumerate(rpms)])
+    # first tested at t=5; the 1200 RPM spike keeps the window max up while it is inside
+    assert events[0] == (5.0, "fire")
+    assert events[1] == (7.0, "release")
+
+
+def test_hwmon_metric_and_missing_values():
+    engine = RuleEngine([Rule({"metric": "hwmon.k10temp Tctl", "above": 95,
+                               "action": {"alert": "Tctl"}})], None)
+    events = run(engine, [(0, {}), (1, {"hwmon": {"k10temp Tctl": 97.0}})])
+    assert events == [(1.0, "fire")]
+
+
+@pytest.mark.parametrize("spec", [
+    {"metric": "temp", "action": {"alert": "x"}},
+    {"metric": "temp", "above": 1, "below": 2, "action": {"alert": "x"}},
+    {"metric": "temp", "above": 90},
+    {"metric": "temp", "above": 90, "action": {"profile": "turbo"}},
+    {"metric": "temp", "equals": 90, "window": 5, "aggregate": "mean", "action": {"alert": "x"}},
+    {"metric": "temp", "above": 90, "window": 5, "aggregate": "median", "action": {"alert": "x"}},
+    {"metric": "battery_status", "above": 5, "action": {"alert": "x"}},
+    {"metric": "cpus", "above": 5, "action": {"alert": "x"}},
+    {"metric": "hwmon", "above": 5, "action": {"alert": "x"}},
+    {"metric": "fan_speed", "above": 5, "action": {"alert": "x"}},
+])
+def test_invalid_rules_are_rejected(spec):
+    with pytest.raises(ValueError):
+        Rule(spec)
+
+
+def test_load_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([{"name": "hot", "metric": "temp", "above": 90,
+                                 "action": {"profile": "quiet"}}]))
+    assert [rule.name for rule in load_rules(str(path))] == ["hot"]
+    path.write_text(json.dumps({"name": "hot"}))
+    with pytest.raises(ValueError):
+        load_rules(str(path))
+
+
+def test_rules_only_see_samples_that_reread_their_metric():
+    rule = Rule({"metric": "temp", "above": 90, "window": 10, "aggregate": "mean",
+                 "action": {"alert": "hot"}})
+    engine = RuleEngine([rule], lambda message: None)
+    for t in range(8):
+        engine.evaluate(snapshot(t, temp=95), ["ec"] if t % 2 == 0 else ["cpus", "battery"])
+    assert len(rule.stats) == 4  # t = 0, 2, 4, 6
+
+
+def test_a_failing_rule_is_dropped_and_the_others_keep_running(capsys):
+    broken = Rule({"name": "broken", "metric": "hwmon.k10temp Tctl", "above": 95,
+                   "action": {"alert": "x"}})
+    hot = Rule({"name": "hot", "metric": "temp", "above": 90, "action": {"alert": "hot"}})
+    engine = RuleEngine([broken, hot], None)
+    events = run(engine, [(0, {"temp": 95, "hwmon": {"k10temp Tctl": "n/a"}})])
+    assert events == [(0.0, "fire")]
+    assert engine.rules == [hot]
+    assert "broken" in capsys.readouterr().err
@@ -0,0 +1,68 @@
+import errno
+import os
+
+import pytest
+
+import sensors
+from sensors import ECReader, make_ec_image, parse_sensor_output
+
+
+@pytest.fixture
+def ec_file(tmp_path):
+    def write(image):
+        path = tmp_path / "io"
+        path.write_bytes(image)
+        return str(path)
+    return write
+
+
+@pytest.mark.parametrize("temp, rpm, duty", [(52, 2156, 40), (87, 4312, 100), (35, 0, 0)])
+def test_reads_the_registers_of_an_ec_image(ec_file, temp, rpm, duty):
+    reader = ECReader(ec_file(make_ec_image(temp, rpm, duty)))
+    assert reader.read() == (temp, rpm, duty)
+    reader.close()
+    assert reader.fd is None
+
+
+def test_short_image_fails_after_retries(ec_file):
+    reader = ECReader(ec_file(bytes(0xCF)), retries=2, backoff=0)
+    with pytest.raises(OSError) as e:
+        reader.read()
+    assert e.value.errno == errno.EIO
+    reader.close()
+
+
+def test_busy_ec_is_retried(ec_file, monkeypatch):
+    reader = ECReader(ec_file(make_ec_image(60, 2156, 50)), retries=3, backoff=0)
+    pread = os.pread
+    failures = [OSError(errno.EBUSY, "busy"), OSError(errno.EAGAIN, "again")]
+
+    def flaky(fd, count, offset):
+        if failures:
+            raise failures.pop(0)
+        return pread(fd, count, offset)
+
+    monkeypatch.setattr(sensors.os, "pread", flaky)
+    assert reader.read() == (60, 2156, 50)
+    reader.close()
+
+
+def test_other_errors_are_not_retried(ec_file, monkeypatch):
+    reader = ECReader(ec_file(make_ec_image(60, 2156, 50)), retries=3, backoff=0)
+    calls = []
+
+    def denied(fd, count, offset):
+        calls.append(offset)
+        raise OSError(errno.EACCES, "denied")
+
+    monkeypatch.setattr(sensors.os, "pread", denied)
+    with pytest.raises(PermissionError):
+        reader.read()
+    assert len(calls) == 1
+    reader.close()
+
+
+def test_parse_sensor_output_skips_ec_wait_errors():
+    output = 'wait_ec error\n{"cpu_temp_cels": 61, "rpms": 2300, "duty": 45}'
+    assert parse_sensor_output(output) == (61, 2300, 45)
+    assert parse_sensor_output('"duty": 30, "rpms": 1800, "cpu_temp_cels": 55 garbage') == (55, 1800, 30)
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from sysfs import SysfsReader
+
+
+def write(root, relative, text):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text + "\n")
+    return path
+
+
+@pytest.fixture
+def sysfs_root(tmp_path):
+    root = str(tmp_path)
+    write(root, "class/power_supply/AC/type", "Mains")
+    write(root, "class/power_supply/BATT/type", "Battery")
+    write(root, "class/power_supply/BATT/status", "Discharging")
+    write(root, "class/power_supply/BATT/current_now", "1500000")
+    write(root, "class/power_supply/BATT/voltage_now", "12000000")
+    write(root, "class/hwmon/hwmon0/name", "k10temp")
+    write(root, "class/hwmon/hwmon0/temp1_input", "61250")
+    write(root, "class/hwmon/hwmon0/temp1_label", "Tctl")
+    write(root, "class/hwmon/hwmon1/name", "nvme")
+    write(root, "class/hwmon/hwmon1/temp1_input", "38850")
+    write(root, "class/hwmon/hwmon2/name", "coretemp")  # not in HWMON_DRIVERS
+    write(root, "class/hwmon/hwmon2/temp1_input", "50000")
+    return root
+
+
+def test_discovers_battery_and_known_hwmon_drivers(sysfs_root):
+    reader = SysfsReader(sysfs_root)
+    assert reader.battery == "BATT"
+    assert reader.sensor_names() == ["k10temp Tctl", "nvme temp1"]
+    assert reader.read_battery() == (pytest.approx(18.0), "Discharging")
+    assert reader.read_hwmon() == {"k10temp Tctl": 61.25, "nvme temp1": 38.85}
+    reader.close()
+
+
+def test_rereads_the_open_files(sysfs_root):
+    reader = SysfsReader(sysfs_root)
+    write(sysfs_root, "class/hwmon/hwmon0/temp1_input", "70000")
+    write(sysfs_root, "class/power_supply/BATT/status", "Charging")
+    assert reader.read_hwmon()["k10temp Tctl"] == 70.0
+    assert reader.read_battery()[1] == "Charging"
+    reader.close()
+
+
+def test_power_now_is_preferred(sysfs_root):
+    write(sysfs_root, "class/power_supply/BATT/power_now", "9500000")
+    reader = SysfsReader(sysfs_root)
+    assert reader.read_battery_power() == pytest.approx(9.5)
+    assert reader.read_battery()[0] == pytest.approx(9.5)
+    reader.close()
+
+
+def test_missing_tree_reads_as_unknown(tmp_path):
+    reader = SysfsReader(str(tmp_path))
+    assert reader.read_battery() == (0, "Unknown")
+    assert reader.read_hwmon() == {}
+    assert reader.read_package_energy() is None
+    reader.close()
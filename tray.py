@@ -0,0 +1,91 @@
+"""Temperature/RPM indicator shown while the monitor window is hidden.
+
+With pystray installed the indicator is a tray icon showing the rounded
+temperature, with the full text as its tooltip. The window title always
+carries the same text, so taskbars and docks show it for a minimized
+window even without a tray.
+"""
+import queue
+
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    import pystray
+except ImportError:  # optional; the window title is the indicator then
+    pystray = None
+
+# Tray icon size in pixels
+TRAY_ICON_SIZE = 64
+
+# Icon colors: (°C threshold, color), the first threshold not exceeded wins
+TRAY_COLORS = ((60, "#51cf66"), (80, "#f7b731"), (float("inf"), "#ff6b6b"))
+
+
+def indicator_text(snapshot):
+    return f"{snapshot['temp']:.0f}°C · {snapshot['rpm']} RPM"
+
+
+def render_icon(temp):
+    """Square icon with the temperature on a colored background"""
+    color = next(color for limit, color in TRAY_COLORS if temp <= limit)
+    image = Image.new("RGBA", (TRAY_ICON_SIZE, TRAY_ICON_SIZE), color)
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=TRAY_ICON_SIZE // 2)
+    except TypeError:  # Pillow < 10.1 has no sized default font
+        font = ImageFont.load_default()
+    text = f"{temp:.0f}"
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    draw.text(((TRAY_ICON_SIZE - right - left) / 2, (TRAY_ICON_SIZE - bottom - top) / 2), text,
+              fill="black", font=font)
+    return image
+
+
+class TrayIndicator:
+    """Window title and optional tray icon updated only when their text changes.
+
+    Clicking the tray icon puts "show" on the requests queue; the Tk thread
+    polls it, since Tk must not be called from the tray thread.
+    """
+
+    def __init__(self, root, title):
+        self.root = root
+        self.title = title
+        self.requests = queue.Queue()
+        self.text = None
+        self.temp = None
+        self.icon = None
+
+    def show(self, snapshot):
+        """Show or update the indicator for a snapshot"""
+        text = indicator_text(snapshot)
+        if text == self.text:
+            return
+        self.text = text
+        self.root.title(f"{text} — {self.title}")
+        if pystray is None:
+            return
+        temp = round(snapshot["temp"])
+        if self.icon is None:
+            self.icon = pystray.Icon("pang11-fancontrol", render_icon(temp), text,
+                                     menu=pystray.Menu(pystray.MenuItem(
+                                         "Show monitor", lambda: self.requests.put("show"),
+                                         default=True)))
+            self.icon.run_detached()
+        else:
+            self.icon.title = text
+            if temp != self.temp:
+                self.icon.icon = render_icon(temp)
+        self.temp = temp
+        self.icon.visible = True
+
+    def hide(self):
+        self.root.title(self.title)
+        self.text = None
+        if self.icon is not None:
+            self.icon.visible = False
+
+    def stop(self):
+        if self.icon is not None:
+            self.icon.stop()
+            self.icon = None
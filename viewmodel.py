@@ -0,0 +1,49 @@
+"""Diff-based widget updates.
+
+Every configure() on a CustomTkinter widget redraws it, even when the new
+options equal the old ones. The ViewModel remembers the options last
+rendered for each widget; update code calls set() with the wanted state on
+every tick, and flush() applies only the options that changed, in one batch
+at the end of the tick.
+"""
+
+# Marks options that were never rendered
+UNSET = object()
+
+
+class ViewModel:
+    """Last rendered options per widget and the pending changes of this tick"""
+
+    def __init__(self):
+        self.rendered = {}  # widget -> {option: value}
+        self.pending = {}  # widget -> {option: value} differing from rendered
+        self.flushed = 0  # widgets configured by the last flush()
+
+    def set(self, widget, **options):
+        """Queue the wanted options of a widget; unchanged ones are dropped"""
+        rendered = self.rendered.get(widget, {})
+        changed = {name: value for name, value in options.items() if rendered.get(name, UNSET) != value}
+        pending = self.pending.get(widget)
+        if pending is not None:
+            for name in options.keys() - changed.keys():
+                pending.pop(name, None)  # set back to the rendered value within the tick
+            pending.update(changed)
+        elif changed:
+            self.pending[widget] = changed
+
+    def flush(self):
+        """configure() every widget with pending changes; returns how many"""
+        count = 0
+        for widget, options in self.pending.items():
+            if options:
+                widget.configure(**options)
+                self.rendered.setdefault(widget, {}).update(options)
+                count += 1
+        self.pending.clear()
+        self.flushed = count
+        return count
+
+    def forget(self, widget):
+        """Drop the cached state of a widget configured elsewhere"""
+        self.rendered.pop(widget, None)
+        self.pending.pop(widget, None)